@@ -1,6 +1,14 @@
 """IrisAtlas Engine public API."""
 
 from engine.app.analysis_types import AnalysisResult
-from engine.app.api import get_last_extension_telemetry, run_analysis
+from engine.app.api import get_last_extension_telemetry, run_analysis, run_analysis_batch, run_analysis_frames
+from engine.app.session import AnalysisSession
 
-__all__ = ["AnalysisResult", "get_last_extension_telemetry", "run_analysis"]
+__all__ = [
+    "AnalysisResult",
+    "AnalysisSession",
+    "get_last_extension_telemetry",
+    "run_analysis",
+    "run_analysis_batch",
+    "run_analysis_frames",
+]
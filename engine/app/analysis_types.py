@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator, Mapping
 from dataclasses import asdict, dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -27,6 +28,38 @@ class RunState(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    REJECTED = "rejected"
+
+
+class FrozenDict(Mapping[str, Any]):
+    """Immutable mapping shared with extensions instead of per-extension deep copies."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping[str, Any] | None = None) -> None:
+        self._data = dict(data or {})
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({self._data!r})"
+
+
+def freeze_jsonable(payload: Any) -> Any:
+    """Recursively convert JSON-like data to ``FrozenDict`` and tuples."""
+
+    if isinstance(payload, Mapping):
+        return FrozenDict({str(key): freeze_jsonable(value) for key, value in payload.items()})
+    if isinstance(payload, (list, tuple)):
+        return tuple(freeze_jsonable(value) for value in payload)
+    return payload
 
 
 @dataclass(frozen=True)
@@ -40,6 +73,7 @@ class ExtensionTelemetry:
     peak_memory_mb: float | None
     model_version: str | None = None
     warning: str | None = None
+    timings_ms: dict[str, float] = field(default_factory=dict)
 
     def to_manifest(self) -> dict[str, Any]:
         payload = asdict(self)
@@ -55,6 +89,7 @@ class ExtensionResult:
     payload: dict[str, Any] = field(default_factory=dict)
     warning: str | None = None
     model_version: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
 
 
 @dataclass(frozen=True)
@@ -67,11 +102,11 @@ class ExtensionContext:
     original_bgr: np.ndarray
     segmentation_mask: np.ndarray
     iris_mask: np.ndarray
-    metrics: dict[str, float | int]
+    metrics: Mapping[str, float | int]
     device: str
     model_version: str
-    config: dict[str, Any]
-    extension_outputs: dict[str, dict[str, Any]]
+    config: Mapping[str, Any]
+    extension_outputs: Mapping[str, Mapping[str, Any]]
 
 
 class ExtensionSpec(Protocol):
@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Any
 
 from engine.app.analysis_types import AnalysisResult, ExtensionTelemetry
 from engine.app.runtime import run_runtime
+from engine.app.session import AnalysisSession
 
 
 def run_analysis(input_path: str | Path, device: str, config: dict[str, Any]) -> AnalysisResult:
@@ -28,6 +30,61 @@ def run_analysis(input_path: str | Path, device: str, config: dict[str, Any]) ->
     return runtime_output.analysis_result
 
 
+def run_analysis_batch(
+    inputs: Iterable[str | Path],
+    device: str,
+    config: dict[str, Any],
+) -> Iterator[AnalysisResult]:
+    """Analyze many images with one loaded predictor and stream the results.
+
+    Parameters
+    ----------
+    inputs:
+        Iterable of input image paths, processed in order.
+    device:
+        One of ``auto``, ``cpu``, or ``cuda``.
+    config:
+        Runtime configuration dictionary. Each input gets its own output
+        directory below ``config["output_dir"]``, named after the input stem.
+        When ``config["pipeline"]`` is set (``decode_workers``,
+        ``writer_workers``, ``queue_size``), decoding, inference, and artifact
+        writing run as overlapped stages.
+    """
+
+    with AnalysisSession(device=device, config=config) as session:
+        results = session.analyze_pipelined(inputs) if config.get("pipeline") else session.analyze_many(inputs)
+        for result in results:
+            config["_extension_telemetry"] = [entry.to_manifest() for entry in session.last_extension_telemetry]
+            yield result
+
+
+def run_analysis_frames(
+    input_path: str | Path,
+    device: str,
+    config: dict[str, Any],
+) -> Iterator[AnalysisResult]:
+    """Analyze each page of a multi-page TIFF or each frame of a video file.
+
+    Parameters
+    ----------
+    input_path:
+        Path to a ``.tif``/``.tiff`` or video file.
+    device:
+        One of ``auto``, ``cpu``, or ``cuda``.
+    config:
+        Runtime configuration dictionary. ``config["frame_source"]``
+        (``batch_size``, ``frame_stride``, ``max_frames``) selects and batches
+        frames. After the last frame, the aggregate summary is written to
+        ``frames_summary.json`` and stored in ``config["_frame_summary"]``.
+    """
+
+    with AnalysisSession(device=device, config=config) as session:
+        for result in session.analyze_frames(input_path):
+            config["_extension_telemetry"] = [entry.to_manifest() for entry in session.last_extension_telemetry]
+            yield result
+        config["_frame_summary"] = session.last_frame_summary
+
+
 def get_last_extension_telemetry(config: dict[str, Any]) -> list[ExtensionTelemetry] | list[dict[str, Any]]:
     """Return extension telemetry captured during the latest ``run_analysis`` call."""
 
@@ -0,0 +1,202 @@
+"""Artifact encoding policy for per-run image outputs."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+
+INPUT_COPY_MODES = ("encode", "hardlink", "skip")
+OVERLAY_FORMATS = ("png", "webp")
+MASK_FORMATS = ("png", "packed3")
+
+# Canonical labels 0..5 fit in three bits per pixel.
+_MASK_BITS = 3
+
+
+@dataclass(frozen=True)
+class ArtifactPolicy:
+    """How ``mask``, ``input`` and ``overlay`` artifacts are written.
+
+    * ``png_compression``: zlib level 0-9 for PNG artifacts; ``None`` keeps the
+      OpenCV default.
+    * ``input_copy``: ``"encode"`` re-encodes the decoded input as
+      ``input.png``; ``"hardlink"`` links (or copies, across devices) a PNG
+      source instead, and ``"skip"`` writes nothing for a PNG source. Non-PNG
+      sources are always encoded.
+    * ``overlay_format``: ``"png"`` or lossless ``"webp"``.
+    * ``mask_format``: ``"png"`` or ``"packed3"``, a ``mask.npz`` holding the
+      labels bit-packed at three bits per pixel (see :func:`unpack_mask`).
+    """
+
+    png_compression: int | None = None
+    input_copy: str = "encode"
+    overlay_format: str = "png"
+    mask_format: str = "png"
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> ArtifactPolicy:
+        raw = config.get("artifacts") or {}
+        if not isinstance(raw, dict):
+            raw = {}
+        compression = raw.get("png_compression")
+        policy = cls(
+            png_compression=None if compression is None else min(max(int(compression), 0), 9),
+            input_copy=str(raw.get("input_copy", cls.input_copy)),
+            overlay_format=str(raw.get("overlay_format", cls.overlay_format)).lower(),
+            mask_format=str(raw.get("mask_format", cls.mask_format)).lower(),
+        )
+        if policy.input_copy not in INPUT_COPY_MODES:
+            raise ValueError(f"Unsupported artifacts.input_copy: {policy.input_copy}")
+        if policy.overlay_format not in OVERLAY_FORMATS:
+            raise ValueError(f"Unsupported artifacts.overlay_format: {policy.overlay_format}")
+        if policy.mask_format not in MASK_FORMATS:
+            raise ValueError(f"Unsupported artifacts.mask_format: {policy.mask_format}")
+        return policy
+
+    @property
+    def overlay_filename(self) -> str:
+        return f"overlay.{self.overlay_format}"
+
+    def png_params(self) -> list[int]:
+        if self.png_compression is None:
+            return []
+        return [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+
+    def overlay_params(self) -> list[int]:
+        if self.overlay_format == "webp":
+            # Quality above 100 selects lossless WebP.
+            return [cv2.IMWRITE_WEBP_QUALITY, 101]
+        return self.png_params()
+
+
+class ArtifactStats:
+    """Per-artifact encode time and size, reported in the run manifest."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, dict[str, Any]] = {}
+
+    def record(self, name: str, path: Path | None, started: float, mode: str) -> None:
+        size = None
+        if path is not None:
+            try:
+                size = path.stat().st_size
+            except OSError:
+                size = None
+        self._entries[name] = {
+            "path": str(path) if path is not None else None,
+            "mode": mode,
+            "bytes": size,
+            "encode_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        }
+
+    def to_manifest(self) -> dict[str, dict[str, Any]]:
+        return {name: dict(entry) for name, entry in self._entries.items()}
+
+
+def write_mask(policy: ArtifactPolicy, mask: np.ndarray, output_dir: Path, stats: ArtifactStats) -> Path:
+    started = time.perf_counter()
+    if policy.mask_format == "packed3":
+        path = output_dir / "mask.npz"
+        with path.open("wb") as handle:
+            np.savez(handle, packed=pack_mask(mask), shape=np.asarray(mask.shape, dtype=np.int64))
+    else:
+        path = output_dir / "mask.png"
+        write_image(path, mask, policy.png_params())
+    stats.record("mask", path, started, policy.mask_format)
+    return path
+
+
+def write_input_copy(
+    policy: ArtifactPolicy,
+    source_path: Path,
+    original_bgr: np.ndarray,
+    output_dir: Path,
+    stats: ArtifactStats,
+) -> Path | None:
+    """Write ``input.png`` per ``policy.input_copy``; returns ``None`` when skipped."""
+
+    started = time.perf_counter()
+    path = output_dir / "input.png"
+    source_is_png = source_path.suffix.lower() == ".png"
+
+    if source_is_png and policy.input_copy == "skip":
+        stats.record("input_copy", None, started, "skipped")
+        return None
+
+    if source_is_png and policy.input_copy == "hardlink":
+        path.unlink(missing_ok=True)
+        try:
+            os.link(source_path, path)
+            mode = "hardlink"
+        except OSError:
+            shutil.copyfile(source_path, path)
+            mode = "copy"
+        stats.record("input_copy", path, started, mode)
+        return path
+
+    write_image(path, original_bgr, policy.png_params())
+    stats.record("input_copy", path, started, "encode")
+    return path
+
+
+def write_image(path: Path, image: np.ndarray, params: list[int] | None = None) -> None:
+    if not cv2.imwrite(str(path), image, list(params or [])):
+        raise RuntimeError(f"Failed to write image: {path}")
+
+
+def pack_mask(mask: np.ndarray) -> np.ndarray:
+    """Pack uint8 labels below 8 into a flat bitstream of three bits per pixel.
+
+    Labels are taken in groups of eight (24 bits, three bytes), most significant
+    bit first, and combined with shifts and ORs on the uint8 labels, so no
+    per-bit intermediate array is built.
+    """
+
+    labels = np.asarray(mask, dtype=np.uint8).reshape(-1)
+    if labels.size and int(labels.max()) >= 1 << _MASK_BITS:
+        raise ValueError("Mask labels do not fit in three bits")
+    count = labels.size
+    if count % 8:
+        labels = np.concatenate([labels, np.zeros(8 - count % 8, dtype=np.uint8)])
+    l0, l1, l2, l3, l4, l5, l6, l7 = labels.reshape(-1, 8).T
+
+    packed = np.empty((labels.size // 8, 3), dtype=np.uint8)
+    packed[:, 0] = (l0 << 5) | (l1 << 2) | (l2 >> 1)
+    packed[:, 1] = ((l2 & 1) << 7) | (l3 << 4) | (l4 << 1) | (l5 >> 2)
+    packed[:, 2] = ((l5 & 3) << 6) | (l6 << 3) | l7
+    return packed.reshape(-1)[: (count * _MASK_BITS + 7) // 8]
+
+
+def unpack_mask(packed: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+    """Inverse of :func:`pack_mask`."""
+
+    count = int(np.prod(shape))
+    groups = -(-count // 8)
+    data = np.zeros(groups * 3, dtype=np.uint8)
+    source = np.asarray(packed, dtype=np.uint8).reshape(-1)[: groups * 3]
+    data[: source.size] = source
+    b0, b1, b2 = data.reshape(-1, 3).T
+
+    labels = np.empty((groups, 8), dtype=np.uint8)
+    labels[:, 0] = b0 >> 5
+    labels[:, 1] = (b0 >> 2) & 7
+    labels[:, 2] = ((b0 & 3) << 1) | (b1 >> 7)
+    labels[:, 3] = (b1 >> 4) & 7
+    labels[:, 4] = (b1 >> 1) & 7
+    labels[:, 5] = ((b1 & 1) << 2) | (b2 >> 6)
+    labels[:, 6] = (b2 >> 3) & 7
+    labels[:, 7] = b2 & 7
+    return labels.reshape(-1)[:count].reshape(shape)
+
+
+def load_packed_mask(path: str | Path) -> np.ndarray:
+    with np.load(Path(path)) as data:
+        return unpack_mask(data["packed"], tuple(int(value) for value in data["shape"]))
@@ -0,0 +1,121 @@
+"""Durability modes for per-run JSON artifacts (state, results, manifest)."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from engine.utils.file_utils import atomic_write_json, fsync_file
+
+
+STRICT = "strict"
+BATCHED = "batched"
+ASYNC = "async"
+DURABILITY_MODES = (STRICT, BATCHED, ASYNC)
+
+
+class RunJsonWriter:
+    """Writes one run's JSON files according to a durability mode.
+
+    * ``strict``: every write is atomic and fsynced before returning.
+    * ``batched``: writes are atomic but not fsynced; :meth:`flush` fsyncs each
+      touched file once at the end of the run.
+    * ``async``: writes are handed to a shared background thread that coalesces
+      successive payloads for the same path (QUEUED -> RUNNING -> COMPLETED
+      becomes one write when the thread is behind); :meth:`flush` waits for the
+      run's paths and then fsyncs them like ``batched``.
+
+    In every mode, each file on disk is always a complete JSON document, and after
+    :meth:`flush` it holds the last payload written to it.
+    """
+
+    def __init__(self, mode: str = STRICT) -> None:
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Unsupported durability mode: {mode}")
+        self.mode = mode
+        self._pending_sync: list[Path] = []
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> RunJsonWriter:
+        return cls(str(config.get("durability", STRICT) or STRICT).lower())
+
+    def write(self, path: Path, payload: dict[str, Any]) -> None:
+        if self.mode == STRICT:
+            atomic_write_json(path, payload, fsync=True)
+            return
+        if path not in self._pending_sync:
+            self._pending_sync.append(path)
+        if self.mode == BATCHED:
+            atomic_write_json(path, payload, fsync=False)
+        else:
+            _async_worker().submit(path, payload)
+
+    def flush(self) -> None:
+        """Make every file written so far durable. Re-raises background write errors."""
+
+        paths, self._pending_sync = self._pending_sync, []
+        if not paths:
+            return
+        if self.mode == ASYNC:
+            _async_worker().wait_for(paths)
+        for path in paths:
+            fsync_file(path)
+
+
+class _AsyncJsonWorker:
+    """Single background thread writing the latest payload queued for each path."""
+
+    def __init__(self) -> None:
+        self._pending: OrderedDict[Path, dict[str, Any]] = OrderedDict()
+        self._in_flight: set[Path] = set()
+        self._errors: dict[Path, BaseException] = {}
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name="iris-json-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, payload: dict[str, Any]) -> None:
+        with self._condition:
+            # Replacing the entry keeps its queue position and drops the stale payload.
+            self._pending[path] = payload
+            self._condition.notify_all()
+
+    def wait_for(self, paths: list[Path]) -> None:
+        wanted = set(paths)
+        with self._condition:
+            self._condition.wait_for(lambda: not (wanted & (set(self._pending) | self._in_flight)))
+            errors = [self._errors.pop(path) for path in paths if path in self._errors]
+        if errors:
+            raise errors[0]
+
+    def _loop(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._pending))
+                path, payload = self._pending.popitem(last=False)
+                self._in_flight.add(path)
+            try:
+                atomic_write_json(path, payload, fsync=False)
+                error = None
+            except BaseException as exc:  # surfaced by wait_for
+                error = exc
+            with self._condition:
+                self._in_flight.discard(path)
+                if error is not None:
+                    self._errors[path] = error
+                else:
+                    self._errors.pop(path, None)
+                self._condition.notify_all()
+
+
+_ASYNC_WORKER: _AsyncJsonWorker | None = None
+_ASYNC_WORKER_LOCK = threading.Lock()
+
+
+def _async_worker() -> _AsyncJsonWorker:
+    global _ASYNC_WORKER
+    with _ASYNC_WORKER_LOCK:
+        if _ASYNC_WORKER is None:
+            _ASYNC_WORKER = _AsyncJsonWorker()
+        return _ASYNC_WORKER
@@ -0,0 +1,155 @@
+"""Long-lived executor for extension calls with releasable timeouts."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable
+
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+
+
+class ExtensionExecutor:
+    """Worker pool reused across extension calls, images, and runs.
+
+    ``mode="thread"`` (default) keeps one ``ThreadPoolExecutor``. Python threads
+    cannot be killed, so :meth:`abandon` retires the whole pool without waiting
+    and lazily starts a fresh one: the caller is released at the deadline and
+    later extensions never queue behind the runaway call, which finishes in the
+    background.
+
+    ``mode="process"`` runs each call in a single-worker process slot. Idle slots
+    are reused; :meth:`abandon` terminates the slot's process, so runaway work is
+    actually stopped. Extensions and their contexts must be picklable, and
+    ``tracemalloc`` in the parent does not see child allocations.
+
+    ``max_workers`` bounds the thread pool and the number of idle process slots
+    kept warm. Timeouts are measured from submission, so a saturated thread pool
+    counts queueing time against the extension.
+    """
+
+    def __init__(self, mode: str = THREAD_MODE, max_workers: int = 0, mp_start_method: str = "spawn") -> None:
+        if mode not in (THREAD_MODE, PROCESS_MODE):
+            raise ValueError(f"Unsupported extension executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = int(max_workers) if int(max_workers) > 0 else max(8, os.cpu_count() or 1)
+        self._mp_context = multiprocessing.get_context(mp_start_method) if mode == PROCESS_MODE else None
+        self._lock = threading.Lock()
+        self._thread_pool: concurrent.futures.ThreadPoolExecutor | None = None
+        self._idle_slots: list[concurrent.futures.ProcessPoolExecutor] = []
+        self._busy_slots: dict[concurrent.futures.Future, concurrent.futures.ProcessPoolExecutor] = {}
+        self._closed = False
+        self._counters = {"submitted": 0, "abandoned": 0, "terminated": 0, "pools_started": 0}
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> ExtensionExecutor:
+        """Build an executor from ``config["extension_executor"]``."""
+
+        raw = config.get("extension_executor") or {}
+        if not isinstance(raw, dict):
+            raw = {}
+        return cls(
+            mode=str(raw.get("mode", THREAD_MODE)),
+            max_workers=int(raw.get("max_workers", 0) or 0),
+            mp_start_method=str(raw.get("mp_start_method", "spawn")),
+        )
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> concurrent.futures.Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ExtensionExecutor is shut down")
+            self._counters["submitted"] += 1
+            if self.mode == THREAD_MODE:
+                return self._thread_pool_locked().submit(fn, *args)
+
+            slot = self._idle_slots.pop() if self._idle_slots else self._new_slot_locked()
+            future = slot.submit(fn, *args)
+            self._busy_slots[future] = slot
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def abandon(self, future: concurrent.futures.Future) -> None:
+        """Stop waiting for ``future``; terminate its worker when running in process mode."""
+
+        if future.done():
+            return
+        with self._lock:
+            self._counters["abandoned"] += 1
+            if self.mode == THREAD_MODE:
+                pool, self._thread_pool = self._thread_pool, None
+                slot = None
+            else:
+                pool = None
+                slot = self._busy_slots.pop(future, None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+        if slot is not None:
+            self._terminate_slot(slot)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Release every worker. Running process-mode calls are terminated."""
+
+        with self._lock:
+            self._closed = True
+            pool, self._thread_pool = self._thread_pool, None
+            idle_slots, busy_slots = list(self._idle_slots), list(self._busy_slots.values())
+            self._idle_slots.clear()
+            self._busy_slots.clear()
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        for slot in idle_slots:
+            slot.shutdown(wait=wait)
+        for slot in busy_slots:
+            self._terminate_slot(slot)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "idle_process_slots": len(self._idle_slots),
+                **self._counters,
+            }
+
+    def _thread_pool_locked(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="iris-ext",
+            )
+            self._counters["pools_started"] += 1
+        return self._thread_pool
+
+    def _new_slot_locked(self) -> concurrent.futures.ProcessPoolExecutor:
+        self._counters["pools_started"] += 1
+        return concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=self._mp_context)
+
+    def _release_slot(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            slot = self._busy_slots.pop(future, None)
+            if slot is None:
+                return
+            if not self._closed and _slot_alive(slot) and len(self._idle_slots) < self.max_workers:
+                self._idle_slots.append(slot)
+                return
+        slot.shutdown(wait=False)
+
+    def _terminate_slot(self, slot: concurrent.futures.ProcessPoolExecutor) -> None:
+        processes = list((getattr(slot, "_processes", None) or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                with self._lock:
+                    self._counters["terminated"] += 1
+        slot.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join(timeout=1.0)
+
+
+def _slot_alive(slot: concurrent.futures.ProcessPoolExecutor) -> bool:
+    # A worker killed from outside leaves the pool broken; do not reuse it.
+    return not getattr(slot, "_broken", False)
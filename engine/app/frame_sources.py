@@ -0,0 +1,392 @@
+"""Per-frame analysis of multi-page TIFF files and video streams."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+from engine.app.preprocessing import (
+    FrameQuality,
+    LoadedImage,
+    LoaderSettings,
+    QualityGateSettings,
+    assess_frame_quality,
+    image_from_array,
+    select_best_of_burst,
+)
+from engine.app.result_cache import ResultCache
+from engine.app.runtime import (
+    RunPlan,
+    RuntimeOutput,
+    RuntimeResources,
+    begin_run,
+    fail_run,
+    finalize_batch,
+    reject_run,
+    segment_batch,
+)
+from engine.utils.file_utils import atomic_write_json
+
+
+MULTIPAGE_SUFFIXES = {".tif", ".tiff"}
+VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv", ".m4v"}
+
+
+@dataclass(frozen=True)
+class FrameSourceSettings:
+    """Frame selection and batching, from ``config["frame_source"]``.
+
+    ``frame_stride`` keeps every n-th page or frame and ``max_frames`` stops
+    after that many analyzed frames (``0`` = no limit). At most ``batch_size``
+    decoded frames are held at once, independent of stream length and stride:
+    a TIFF decoder call spans at most ``batch_size`` pages, so pages skipped
+    by the stride are decoded only when they sit between two kept pages.
+    """
+
+    batch_size: int = 8
+    frame_stride: int = 1
+    max_frames: int = 0
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> FrameSourceSettings:
+        raw = config.get("frame_source") or {}
+        if not isinstance(raw, dict):
+            raw = {}
+        return cls(
+            batch_size=max(int(raw.get("batch_size", cls.batch_size)), 1),
+            frame_stride=max(int(raw.get("frame_stride", cls.frame_stride)), 1),
+            max_frames=max(int(raw.get("max_frames", cls.max_frames) or 0), 0),
+        )
+
+
+@dataclass
+class Frame:
+    """One page or video frame; ``image`` is ``None`` when it failed to decode."""
+
+    index: int
+    name: str
+    timestamp_ms: float | None
+    image: LoadedImage | None
+    error: Exception | None = None
+    quality: FrameQuality | None = None
+
+
+class FrameRejected(Exception):
+    """Outcome of a frame the quality gate kept away from segmentation."""
+
+    def __init__(self, quality: FrameQuality) -> None:
+        super().__init__(f"{quality.reason}: {quality.detail}")
+        self.quality = quality
+
+
+def is_frame_source(path: str | Path) -> bool:
+    """Whether ``path`` is a video or a TIFF holding more than one page."""
+
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in VIDEO_SUFFIXES:
+        return True
+    if suffix in MULTIPAGE_SUFFIXES and path.is_file():
+        try:
+            return cv2.imcount(str(path)) > 1
+        except cv2.error:
+            return False
+    return False
+
+
+def iter_frames(
+    path: str | Path,
+    settings: FrameSourceSettings | None = None,
+    loader_settings: LoaderSettings | None = None,
+) -> Iterator[Frame]:
+    """Lazily decode the pages of a TIFF or the frames of a video, one at a time."""
+
+    path = Path(path)
+    settings = settings or FrameSourceSettings()
+    if not path.is_file():
+        raise ValueError(f"Input frame source does not exist: {path}")
+    if path.suffix.lower() in MULTIPAGE_SUFFIXES:
+        frames = _iter_tiff_pages(path, settings, loader_settings)
+    else:
+        frames = _iter_video_frames(path, settings, loader_settings)
+    for count, frame in enumerate(frames, start=1):
+        yield frame
+        if settings.max_frames and count >= settings.max_frames:
+            return
+
+
+def run_frame_source(
+    path: str | Path,
+    resources: RuntimeResources,
+    run_config_for: Callable[[Frame], dict[str, Any]],
+    settings: FrameSourceSettings,
+    loader_settings: LoaderSettings | None = None,
+    quality_settings: QualityGateSettings | None = None,
+) -> Iterator[tuple[Frame, RuntimeOutput | Exception]]:
+    """Analyze every selected frame, segmenting ``batch_size`` frames per engine call.
+
+    ``run_config_for`` returns the per-frame run config (its ``output_dir``
+    receives that frame's artifacts). Outcomes are yielded in frame order.
+    When ``quality_settings`` is enabled, frames failing the quality gate are
+    recorded as REJECTED and yielded with a ``FrameRejected`` outcome without
+    reaching the segmentation engine.
+    """
+
+    frames = iter_frames(path, settings, loader_settings)
+    if quality_settings is not None and quality_settings.enabled:
+        frames = _gate_frames(frames, quality_settings)
+    batch: list[Frame] = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) >= settings.batch_size:
+            yield from _run_batch(Path(path), batch, resources, run_config_for)
+            batch = []
+    if batch:
+        yield from _run_batch(Path(path), batch, resources, run_config_for)
+
+
+class FrameSummary:
+    """Running aggregate over per-frame results; memory does not grow with frame count."""
+
+    def __init__(self, source: Path) -> None:
+        self.source = source
+        self._started = time.perf_counter()
+        self._frames = 0
+        self._failed: list[int] = []
+        self._rejected: dict[str, int] = {}
+        self._metrics: dict[str, dict[str, float]] = {}
+
+    def add(self, frame: Frame, outcome: RuntimeOutput | Exception) -> None:
+        self._frames += 1
+        if isinstance(outcome, FrameRejected):
+            reason = str(outcome.quality.reason)
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+            return
+        if isinstance(outcome, Exception):
+            self._failed.append(frame.index)
+            return
+        for name, value in outcome.analysis_result.metrics.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+                continue
+            entry = self._metrics.setdefault(name, {"count": 0, "sum": 0.0, "min": value, "max": value})
+            entry["count"] += 1
+            entry["sum"] += float(value)
+            entry["min"] = min(entry["min"], value)
+            entry["max"] = max(entry["max"], value)
+
+    def to_dict(self) -> dict[str, Any]:
+        seconds = time.perf_counter() - self._started
+        return {
+            "source": str(self.source),
+            "frames": self._frames,
+            "succeeded": self._frames - len(self._failed) - sum(self._rejected.values()),
+            "failed_frames": list(self._failed),
+            "rejected": dict(sorted(self._rejected.items())),
+            "seconds": round(seconds, 6),
+            "frames_per_second": round(self._frames / seconds, 3) if seconds > 0 else None,
+            "metrics": {
+                name: {
+                    "mean": entry["sum"] / entry["count"],
+                    "min": entry["min"],
+                    "max": entry["max"],
+                }
+                for name, entry in sorted(self._metrics.items())
+            },
+        }
+
+    def write(self, path: Path) -> dict[str, Any]:
+        payload = self.to_dict()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(path, payload)
+        return payload
+
+
+def _run_batch(
+    source: Path,
+    batch: list[Frame],
+    resources: RuntimeResources,
+    run_config_for: Callable[[Frame], dict[str, Any]],
+) -> Iterator[tuple[Frame, RuntimeOutput | Exception]]:
+    plans: dict[int, RunPlan] = {}
+    outcomes: dict[int, RuntimeOutput | Exception] = {}
+    for frame in batch:
+        try:
+            plan = begin_run(source, run_config_for(frame))
+        except Exception as exc:
+            # Same as a failed input in a session chunk: no run was started to record it in.
+            outcomes[frame.index] = exc
+            continue
+        plans[frame.index] = plan
+        if frame.error is not None:
+            fail_run(plan, frame.error)
+            outcomes[frame.index] = frame.error
+        elif frame.quality is not None and not frame.quality.passed:
+            rejection = FrameRejected(frame.quality)
+            reject_run(plan, str(rejection))
+            outcomes[frame.index] = rejection
+
+    decoded = [frame for frame in batch if frame.index not in outcomes]
+    # Frames differ only in their output directory, so one lookup covers the batch.
+    cached = bool(decoded) and ResultCache.from_config(plans[decoded[0].index].config) is not None
+    segmented = segment_batch(
+        [plans[frame.index] for frame in decoded],
+        resources,
+        [frame.image.segmentation_gray for frame in decoded],
+        # Frames share the container file, so the result cache keys on frame pixels instead.
+        [_frame_sha256(frame) if cached else None for frame in decoded],
+        [frame.image.shape for frame in decoded],
+        [frame.image.input_variant() for frame in decoded],
+    )
+    segmented_frames = []
+    for frame, outcome in zip(decoded, segmented):
+        if isinstance(outcome, Exception):
+            fail_run(plans[frame.index], outcome)
+            outcomes[frame.index] = outcome
+        else:
+            segmented_frames.append((frame, outcome))
+
+    finalized = finalize_batch(
+        [plans[frame.index] for frame, _ in segmented_frames],
+        resources,
+        [frame.image for frame, _ in segmented_frames],
+        [outcome for _, outcome in segmented_frames],
+        [_input_decode(frame) for frame, _ in segmented_frames],
+    )
+    for (frame, _), output in zip(segmented_frames, finalized):
+        outcomes[frame.index] = output
+
+    for frame in batch:
+        yield frame, outcomes[frame.index]
+
+
+def _gate_frames(frames: Iterator[Frame], settings: QualityGateSettings) -> Iterator[Frame]:
+    """Attach quality verdicts; in best-of mode, hold one burst at a time to rank it."""
+
+    burst: list[Frame] = []
+    for frame in frames:
+        if frame.image is not None:
+            frame.quality = assess_frame_quality(frame.image.segmentation_gray, settings)
+            if not frame.quality.passed:
+                # Rejected frames never reach segmentation; release their pixels early.
+                frame.image = None
+        if not settings.best_of:
+            yield frame
+            continue
+        burst.append(frame)
+        if len(burst) >= settings.burst_size:
+            yield from _rank_burst(burst, settings.best_of)
+            burst = []
+    if burst:
+        yield from _rank_burst(burst, settings.best_of)
+
+
+def _rank_burst(burst: list[Frame], best_of: int) -> list[Frame]:
+    rated = [frame for frame in burst if frame.quality is not None]
+    for frame, quality in zip(rated, select_best_of_burst([frame.quality for frame in rated], best_of)):
+        frame.quality = quality
+        if not quality.passed:
+            frame.image = None
+    return burst
+
+
+def _input_decode(frame: Frame) -> dict[str, Any]:
+    stats = frame.image.stats()
+    if frame.quality is not None:
+        stats["quality"] = frame.quality.to_dict()
+    return stats
+
+
+def _iter_tiff_pages(
+    path: Path,
+    settings: FrameSourceSettings,
+    loader_settings: LoaderSettings | None,
+) -> Iterator[Frame]:
+    kept = range(0, cv2.imcount(str(path)), settings.frame_stride)
+    if settings.max_frames:
+        kept = kept[: settings.max_frames]
+    # imreadmulti re-walks the page directory up to ``start`` on every call, so
+    # each call reads a run of kept pages spanning at most ``batch_size`` pages.
+    per_call = (settings.batch_size - 1) // settings.frame_stride + 1
+    for offset in range(0, len(kept), per_call):
+        indices = kept[offset : offset + per_call]
+        start, count = indices[0], indices[-1] - indices[0] + 1
+        started = time.perf_counter()
+        ok, mats = cv2.imreadmulti(str(path), start, count, flags=cv2.IMREAD_ANYCOLOR)
+        if not ok or len(mats) != count:
+            # One damaged page fails the whole read; decode the kept pages one by one.
+            for index in indices:
+                yield _read_tiff_page(path, index, loader_settings)
+            continue
+        decode_ms = (time.perf_counter() - started) * 1000.0 / len(indices)
+        # Drop skipped pages now and hand each kept page over without keeping a reference.
+        images = [mats[index - start] for index in indices]
+        del mats
+        for index in indices:
+            yield _decoded_frame(path, index, f"page_{index:05d}", None, images.pop(0), loader_settings, decode_ms)
+
+
+def _read_tiff_page(path: Path, index: int, loader_settings: LoaderSettings | None) -> Frame:
+    name = f"page_{index:05d}"
+    started = time.perf_counter()
+    ok, mats = cv2.imreadmulti(str(path), index, 1, flags=cv2.IMREAD_ANYCOLOR)
+    decode_ms = (time.perf_counter() - started) * 1000.0
+    if not ok or not mats:
+        return Frame(index, name, None, None, ValueError(f"Unable to decode page {index} of {path}"))
+    return _decoded_frame(path, index, name, None, mats[0], loader_settings, decode_ms)
+
+
+def _iter_video_frames(
+    path: Path,
+    settings: FrameSourceSettings,
+    loader_settings: LoaderSettings | None,
+) -> Iterator[Frame]:
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open video file: {path}")
+    try:
+        index = 0
+        while True:
+            if index % settings.frame_stride:
+                # grab() advances without decoding the skipped frame.
+                if not capture.grab():
+                    return
+                index += 1
+                continue
+            started = time.perf_counter()
+            ok, image = capture.read()
+            if not ok:
+                return
+            decode_ms = (time.perf_counter() - started) * 1000.0
+            timestamp_ms = float(capture.get(cv2.CAP_PROP_POS_MSEC))
+            yield _decoded_frame(path, index, f"frame_{index:06d}", timestamp_ms, image, loader_settings, decode_ms)
+            index += 1
+    finally:
+        capture.release()
+
+
+def _decoded_frame(
+    path: Path,
+    index: int,
+    name: str,
+    timestamp_ms: float | None,
+    image: np.ndarray,
+    loader_settings: LoaderSettings | None,
+    decode_ms: float,
+) -> Frame:
+    try:
+        loaded = image_from_array(image, path, loader_settings, frame_index=index, decode_ms=decode_ms)
+    except Exception as exc:
+        return Frame(index, name, timestamp_ms, None, exc)
+    return Frame(index, name, timestamp_ms, loaded)
+
+
+def _frame_sha256(frame: Frame) -> str:
+    return hashlib.sha256(np.ascontiguousarray(frame.image.gray)).hexdigest()
@@ -0,0 +1,219 @@
+"""Staged multi-image pipeline overlapping decode, inference, and artifact writing."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from engine.app.preprocessing import LoadedImage, LoaderSettings, load_image
+from engine.app.result_cache import ResultCache
+from engine.app.runtime import (
+    RunPlan,
+    RuntimeOutput,
+    RuntimeResources,
+    SegmentationOutcome,
+    begin_run,
+    fail_run,
+    finalize_run,
+    segment_input,
+)
+from engine.utils.file_utils import sha256_file
+
+
+_END = object()
+_POLL_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    """Stage widths and queue bound for the staged pipeline.
+
+    ``queue_size`` bounds both hand-off queues, so at most roughly
+    ``queue_size + decode_workers`` decoded images and ``queue_size +
+    writer_workers`` segmented images are held in memory at any time.
+    """
+
+    decode_workers: int = 2
+    writer_workers: int = 2
+    queue_size: int = 4
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> PipelineSettings:
+        raw = config.get("pipeline") or {}
+        if not isinstance(raw, dict):
+            raw = {}
+        return cls(
+            decode_workers=max(int(raw.get("decode_workers", cls.decode_workers)), 1),
+            writer_workers=max(int(raw.get("writer_workers", cls.writer_workers)), 1),
+            queue_size=max(int(raw.get("queue_size", cls.queue_size)), 1),
+        )
+
+
+@dataclass
+class _DecodedInput:
+    plan: RunPlan
+    image: LoadedImage
+    input_sha256: str | None = None
+
+
+def run_staged_pipeline(
+    jobs: Iterable[tuple[Path, dict[str, Any]]],
+    resources: RuntimeResources,
+    settings: PipelineSettings,
+) -> Iterator[tuple[Path, RuntimeOutput | Exception]]:
+    """Process ``(input_path, run_config)`` jobs through three overlapped stages.
+
+    * a decode pool loads images and records QUEUED/RUNNING states,
+    * a single inference thread owns the segmentation engine,
+    * a writer pool encodes PNG artifacts, runs extensions, and writes JSON.
+
+    Bounded queues between the stages provide backpressure. Outcomes are yielded
+    in job order as either a ``RuntimeOutput`` or the exception that failed the
+    job; failed jobs still get a FAILED ``session_state.json``.
+    """
+
+    stop = threading.Event()
+    decoded: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+    finalized: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+    feeder_errors: list[BaseException] = []
+    decode_pool = concurrent.futures.ThreadPoolExecutor(settings.decode_workers, thread_name_prefix="iris-decode")
+    writer_pool = concurrent.futures.ThreadPoolExecutor(settings.writer_workers, thread_name_prefix="iris-writer")
+
+    def feed() -> None:
+        try:
+            for input_file, run_config in jobs:
+                future = decode_pool.submit(_decode_stage, input_file, run_config)
+                if not _put(decoded, (input_file, future), stop):
+                    return
+        except BaseException as exc:  # pragma: no cover - surfaced to the consumer
+            feeder_errors.append(exc)
+        finally:
+            _put(decoded, _END, stop)
+
+    def infer() -> None:
+        try:
+            while True:
+                entry = _get(decoded, stop)
+                if entry is _END:
+                    return
+                input_file, decode_future = entry
+                if not _put(finalized, (input_file, _infer_stage(decode_future, resources, writer_pool)), stop):
+                    return
+        finally:
+            _put(finalized, _END, stop)
+
+    threads = [
+        threading.Thread(target=feed, name="iris-feed", daemon=True),
+        threading.Thread(target=infer, name="iris-infer", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            entry = _get(finalized, stop)
+            if entry is _END:
+                break
+            input_file, write_future = entry
+            try:
+                yield input_file, write_future.result()
+            except Exception as exc:
+                yield input_file, exc
+        if feeder_errors:
+            raise feeder_errors[0]
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        decode_pool.shutdown(wait=True, cancel_futures=True)
+        writer_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _decode_stage(input_file: Path, run_config: dict[str, Any]) -> _DecodedInput:
+    plan = begin_run(input_file, run_config)
+    try:
+        image = load_image(input_file, LoaderSettings.from_config(run_config))
+        # Hash here so the inference thread never reads input files.
+        input_sha256 = None
+        if ResultCache.from_config(run_config) is not None:
+            input_sha256 = plan.input_sha256 or sha256_file(plan.input_file)
+    except Exception as exc:
+        fail_run(plan, exc)
+        raise
+    return _DecodedInput(plan=plan, image=image, input_sha256=input_sha256)
+
+
+def _infer_stage(
+    decode_future: concurrent.futures.Future,
+    resources: RuntimeResources,
+    writer_pool: concurrent.futures.ThreadPoolExecutor,
+) -> concurrent.futures.Future:
+    try:
+        item = decode_future.result()
+    except Exception as exc:
+        return _failed_future(exc)
+
+    try:
+        outcome = segment_input(
+            item.plan,
+            resources,
+            item.image.segmentation_gray,
+            input_sha256=item.input_sha256,
+            mask_shape=item.image.shape,
+            input_variant=item.image.input_variant(),
+        )
+    except Exception as exc:
+        fail_run(item.plan, exc)
+        return _failed_future(exc)
+    return writer_pool.submit(_write_stage, item, outcome, resources)
+
+
+def _write_stage(item: _DecodedInput, outcome: SegmentationOutcome, resources: RuntimeResources) -> RuntimeOutput:
+    try:
+        # Deferred full-resolution decodes (``image_loader.mode = "reduced"``) happen here, off the
+        # decode and inference threads.
+        return finalize_run(
+            plan=item.plan,
+            resources=resources,
+            original_bgr=item.image.original_bgr,
+            gray=item.image.gray,
+            mask=outcome.mask,
+            warnings=item.image.warnings,
+            input_decode=item.image.stats(),
+            metrics=outcome.metrics,
+            result_cache=outcome.result_cache,
+            label_counts=outcome.label_counts,
+        )
+    except Exception as exc:
+        fail_run(item.plan, exc)
+        raise
+
+
+def _failed_future(exc: Exception) -> concurrent.futures.Future:
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    future.set_exception(exc)
+    return future
+
+
+def _put(target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source: queue.Queue, stop: threading.Event) -> Any:
+    while not stop.is_set():
+        try:
+            return source.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _END
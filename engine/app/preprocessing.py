@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 import cv2
 import numpy as np
 
+from engine.app.raw_frames import RawFrameFormat, is_raw_frame, load_raw_frame, raw_layout
+
 
 SUPPORTED_IMAGE_SUFFIXES = {
     ".png",
@@ -19,55 +26,592 @@ SUPPORTED_IMAGE_SUFFIXES = {
 }
 
 
+FULL_MODE = "full"
+DECODE_ONCE_MODE = "decode_once"
+REDUCED_MODE = "reduced"
+LOADER_MODES = (FULL_MODE, DECODE_ONCE_MODE, REDUCED_MODE)
+
+_NON_NIR_WARNING = (
+    "Input may not be a true NIR source (high inter-channel divergence detected). "
+    "Analysis continues with grayscale conversion."
+)
+_NON_NIR_SPREAD = 12.0
+_NON_NIR_MAX_DELTA = 40
+_NON_NIR_TILE_PIXELS = 1 << 16
+_REDUCED_FLAGS = {
+    2: (cv2.IMREAD_REDUCED_GRAYSCALE_2, cv2.IMREAD_REDUCED_COLOR_2),
+    4: (cv2.IMREAD_REDUCED_GRAYSCALE_4, cv2.IMREAD_REDUCED_COLOR_4),
+    8: (cv2.IMREAD_REDUCED_GRAYSCALE_8, cv2.IMREAD_REDUCED_COLOR_8),
+}
+# JPEG start-of-frame markers (excluding DHT, JPG and DAC, which share the range).
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+@dataclass(frozen=True)
+class LoaderSettings:
+    """How ``load_image`` decodes inputs, from ``config["image_loader"]``.
+
+    * ``full``: decode BGR eagerly and convert to grayscale (the original path).
+    * ``decode_once`` (default): single-channel PNG/JPEG sources are decoded
+      straight to grayscale and the BGR frame is derived only when an artifact
+      needs it. Output is identical to ``full``.
+    * ``reduced``: JPEG sources whose shorter side is at least
+      ``2 * reduced_min_side`` are decoded at 1/2, 1/4 or 1/8 scale for
+      segmentation; the full-resolution decode is deferred until the overlay,
+      input copy, or extensions ask for it. The segmentation input differs
+      slightly from ``full``, so this mode is opt-in.
+
+    ``non_nir_sample_budget`` caps the pixels the non-NIR check examines
+    (``0`` scans every pixel). ``.raw`` and ``.npy`` inputs are memory-mapped
+    in every mode using ``raw_format`` (see ``RawFrameFormat``).
+    """
+
+    mode: str = DECODE_ONCE_MODE
+    reduced_min_side: int = 512
+    non_nir_sample_budget: int = 0
+    raw_format: RawFrameFormat = field(default_factory=RawFrameFormat)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> LoaderSettings:
+        raw = config.get("image_loader") or {}
+        if isinstance(raw, str):
+            raw = {"mode": raw}
+        if not isinstance(raw, dict):
+            raw = {}
+        settings = cls(
+            mode=str(raw.get("mode", cls.mode)).lower(),
+            reduced_min_side=max(int(raw.get("reduced_min_side", cls.reduced_min_side)), 1),
+            non_nir_sample_budget=max(int(raw.get("non_nir_sample_budget", cls.non_nir_sample_budget) or 0), 0),
+            raw_format=RawFrameFormat.from_config(config),
+        )
+        if settings.mode not in LOADER_MODES:
+            raise ValueError(f"Unsupported image_loader.mode: {settings.mode}")
+        return settings
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    """Dimensions and channel count read from a PNG or JPEG header."""
+
+    format: str
+    width: int
+    height: int
+    channels: int
+
+
+class LoadedImage:
+    """A decoded input whose full-resolution frames are produced on first use.
+
+    ``segmentation_gray`` is what the segmenter sees; ``shape`` is the
+    full-resolution ``(height, width)`` the mask must match. ``gray`` and
+    ``original_bgr`` decode (or convert) lazily and are cached, so each is built
+    at most once per image.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str,
+        shape: tuple[int, int],
+        segmentation_gray: np.ndarray,
+        warnings: list[str],
+        gray: np.ndarray | None = None,
+        original_bgr: np.ndarray | None = None,
+        source_channels: int = 3,
+        source_bit_depth: int = 8,
+        reduction: int = 1,
+        decode_ms: float = 0.0,
+        frame_index: int | None = None,
+        source_layout: dict[str, Any] | None = None,
+    ) -> None:
+        self.path = path
+        self.mode = mode
+        self.shape = shape
+        self.segmentation_gray = segmentation_gray
+        self.warnings = warnings
+        self.reduction = reduction
+        self.frame_index = frame_index
+        self._source_channels = source_channels
+        self._source_bit_depth = source_bit_depth
+        self._source_layout = dict(source_layout or {})
+        self._gray = gray
+        self._original_bgr = original_bgr
+        self._decodes = 1
+        self._decode_ms = decode_ms
+        self._lock = threading.Lock()
+
+    @property
+    def gray(self) -> np.ndarray:
+        with self._lock:
+            if self._gray is None:
+                if self._original_bgr is None and self._source_channels == 1:
+                    self._gray = self._decode_locked(cv2.IMREAD_GRAYSCALE)
+                else:
+                    self._gray = cv2.cvtColor(self._bgr_locked(), cv2.COLOR_BGR2GRAY)
+            return self._gray
+
+    @property
+    def original_bgr(self) -> np.ndarray:
+        with self._lock:
+            return self._bgr_locked()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = {
+                "mode": self.mode,
+                "reduction": self.reduction,
+                "source_channels": self._source_channels,
+                "source_bit_depth": self._source_bit_depth,
+                "decodes": self._decodes,
+                "decode_ms": round(self._decode_ms, 3),
+            }
+        if self.frame_index is not None:
+            stats["frame_index"] = self.frame_index
+        return stats
+
+    def input_variant(self) -> dict[str, Any]:
+        """How ``segmentation_gray`` was derived from the file bytes, for result-cache keys."""
+
+        return {"mode": self.mode, "reduction": self.reduction, "layout": dict(self._source_layout)}
+
+    def _bgr_locked(self) -> np.ndarray:
+        if self._original_bgr is None:
+            if self._gray is not None and self._source_channels == 1:
+                self._original_bgr = cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR)
+            else:
+                self._original_bgr = self._decode_locked(cv2.IMREAD_COLOR)
+        return self._original_bgr
+
+    def _decode_locked(self, flag: int) -> np.ndarray:
+        started = time.perf_counter()
+        image = _imread(self.path, flag)
+        self._decodes += 1
+        self._decode_ms += (time.perf_counter() - started) * 1000.0
+        if image.shape[:2] != self.shape:
+            raise ValueError(f"Decoded image shape changed while loading: {self.path}")
+        return image
+
+
 def load_image_for_analysis(input_path: str | Path) -> tuple[np.ndarray, np.ndarray, list[str]]:
     """Load an image, always convert to grayscale, and emit non-blocking warnings."""
 
+    image = load_image(input_path, LoaderSettings(mode=FULL_MODE))
+    return image.original_bgr, image.gray, image.warnings
+
+
+def load_image(input_path: str | Path, settings: LoaderSettings | None = None) -> LoadedImage:
+    """Load an input for analysis according to ``settings`` (see ``LoaderSettings``)."""
+
+    settings = settings or LoaderSettings()
     path = Path(input_path)
     if not path.exists():
         raise ValueError(f"Input image does not exist: {path}")
     if not path.is_file():
         raise ValueError(f"Input path must be a file: {path}")
 
+    if is_raw_frame(path):
+        started = time.perf_counter()
+        gray, bit_depth = load_raw_frame(path, settings.raw_format)
+        return LoadedImage(
+            path=path,
+            mode="raw",
+            shape=gray.shape[:2],
+            segmentation_gray=gray,
+            warnings=[],
+            gray=gray,
+            source_channels=1,
+            source_bit_depth=bit_depth,
+            decode_ms=(time.perf_counter() - started) * 1000.0,
+            source_layout=raw_layout(path, settings.raw_format, bit_depth),
+        )
+
     suffix = path.suffix.lower()
+    warnings: list[str] = []
     if suffix and suffix not in SUPPORTED_IMAGE_SUFFIXES:
         # Extension check is advisory. OpenCV still attempts decode for unknown suffixes.
-        warning = f"Input extension '{suffix}' is uncommon for this workflow; attempting decode."
-    else:
-        warning = ""
+        warnings.append(f"Input extension '{suffix}' is uncommon for this workflow; attempting decode.")
 
-    image_bgr = cv2.imread(str(path), cv2.IMREAD_COLOR)
-    if image_bgr is None:
-        raise ValueError(f"Unable to decode image file: {path}")
+    header = probe_image_header(path) if settings.mode != FULL_MODE else None
+    channels = header.channels if header is not None else 3
+    started = time.perf_counter()
+
+    if settings.mode == REDUCED_MODE and header is not None and header.format == "jpeg":
+        reduction = _reduction_factor(header, settings.reduced_min_side)
+        if reduction > 1:
+            reduced = _imread(path, _REDUCED_FLAGS[reduction][0 if channels == 1 else 1])
+            decode_ms = (time.perf_counter() - started) * 1000.0
+            shape = _full_shape(header, reduced.shape[:2], reduction)
+            if shape is not None:
+                if channels == 1:
+                    segmentation_gray = reduced
+                else:
+                    segmentation_gray = cv2.cvtColor(reduced, cv2.COLOR_BGR2GRAY)
+                    # Screened at reduced scale, which can miss isolated divergent pixels.
+                    if likely_non_nir(reduced, settings.non_nir_sample_budget):
+                        warnings.append(_NON_NIR_WARNING)
+                return LoadedImage(
+                    path=path,
+                    mode=REDUCED_MODE,
+                    shape=shape,
+                    segmentation_gray=segmentation_gray,
+                    warnings=warnings,
+                    source_channels=channels,
+                    reduction=reduction,
+                    decode_ms=decode_ms,
+                )
+
+    if channels == 1:
+        # Identical channels can never trip the non-NIR heuristic.
+        gray = _imread(path, cv2.IMREAD_GRAYSCALE)
+        return LoadedImage(
+            path=path,
+            mode=settings.mode,
+            shape=gray.shape[:2],
+            segmentation_gray=gray,
+            warnings=warnings,
+            gray=gray,
+            source_channels=1,
+            decode_ms=(time.perf_counter() - started) * 1000.0,
+        )
 
+    image_bgr = _imread(path, cv2.IMREAD_COLOR)
+    decode_ms = (time.perf_counter() - started) * 1000.0
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    warnings: list[str] = []
-    if warning:
-        warnings.append(warning)
-    if likely_non_nir(image_bgr):
-        warnings.append(
-            "Input may not be a true NIR source (high inter-channel divergence detected). "
-            "Analysis continues with grayscale conversion."
+    if likely_non_nir(image_bgr, settings.non_nir_sample_budget):
+        warnings.append(_NON_NIR_WARNING)
+    return LoadedImage(
+        path=path,
+        mode=settings.mode,
+        shape=gray.shape[:2],
+        segmentation_gray=gray,
+        warnings=warnings,
+        gray=gray,
+        original_bgr=image_bgr,
+        source_channels=3,
+        decode_ms=decode_ms,
+    )
+
+
+def image_from_array(
+    image: np.ndarray,
+    path: str | Path,
+    settings: LoaderSettings | None = None,
+    frame_index: int | None = None,
+    decode_ms: float = 0.0,
+) -> LoadedImage:
+    """Wrap an already decoded gray or BGR(A) frame, e.g. a TIFF page or video frame."""
+
+    settings = settings or LoaderSettings()
+    array = np.asarray(image)
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    if array.ndim == 2:
+        return LoadedImage(
+            path=Path(path),
+            mode="frame",
+            shape=array.shape[:2],
+            segmentation_gray=array,
+            warnings=[],
+            gray=array,
+            source_channels=1,
+            decode_ms=decode_ms,
+            frame_index=frame_index,
         )
+    if array.ndim != 3 or array.shape[2] not in (3, 4):
+        raise ValueError(f"Unsupported frame shape: {array.shape}")
+    if array.shape[2] == 4:
+        array = cv2.cvtColor(array, cv2.COLOR_BGRA2BGR)
+    warnings = [_NON_NIR_WARNING] if likely_non_nir(array, settings.non_nir_sample_budget) else []
+    gray = cv2.cvtColor(array, cv2.COLOR_BGR2GRAY)
+    return LoadedImage(
+        path=Path(path),
+        mode="frame",
+        shape=gray.shape[:2],
+        segmentation_gray=gray,
+        warnings=warnings,
+        gray=gray,
+        original_bgr=array,
+        source_channels=3,
+        decode_ms=decode_ms,
+        frame_index=frame_index,
+    )
+
+
+def probe_image_header(path: str | Path) -> ImageHeader | None:
+    """Read size and channel count from a PNG or baseline/progressive JPEG header.
+
+    Returns ``None`` for other formats or headers that cannot be parsed; callers
+    then fall back to a full colour decode.
+    """
+
+    try:
+        with Path(path).open("rb") as handle:
+            head = handle.read(26)
+            if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+                width, height = struct.unpack(">II", head[16:24])
+                # Colour types 0 (gray) and 4 (gray + alpha) decode to one channel.
+                return ImageHeader("png", width, height, 1 if head[25] in (0, 4) else 3)
+            if head[:2] == b"\xff\xd8":
+                handle.seek(2)
+                return _probe_jpeg(handle)
+    except (OSError, IndexError, struct.error):
+        return None
+    return None
+
+
+def _probe_jpeg(handle) -> ImageHeader | None:
+    while True:
+        marker = handle.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            handle.seek(-1, 1)
+            continue
+        if code in (0x01, *range(0xD0, 0xD8)):
+            continue
+        length_bytes = handle.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in _JPEG_SOF_MARKERS:
+            frame = handle.read(6)
+            if len(frame) < 6:
+                return None
+            _, height, width, components = struct.unpack(">BHHB", frame)
+            return ImageHeader("jpeg", width, height, 1 if components == 1 else 3)
+        if code == 0xDA:
+            return None
+        handle.seek(length - 2, 1)
 
-    return image_bgr, gray, warnings
 
+def _reduction_factor(header: ImageHeader, min_side: int) -> int:
+    shorter = min(header.width, header.height)
+    for factor in (8, 4, 2):
+        if shorter // factor >= min_side:
+            return factor
+    return 1
 
-def likely_non_nir(image_bgr: np.ndarray) -> bool:
+
+def _full_shape(header: ImageHeader, reduced_shape: tuple[int, ...], factor: int) -> tuple[int, int] | None:
+    """Full ``(height, width)`` for a reduced decode, allowing for EXIF rotation."""
+
+    def scaled(value: int) -> int:
+        return -(-value // factor)
+
+    if reduced_shape == (scaled(header.height), scaled(header.width)):
+        return header.height, header.width
+    if reduced_shape == (scaled(header.width), scaled(header.height)):
+        return header.width, header.height
+    return None
+
+
+def _imread(path: Path, flag: int) -> np.ndarray:
+    image = cv2.imread(str(path), flag)
+    if image is None:
+        raise ValueError(f"Unable to decode image file: {path}")
+    return image
+
+
+def likely_non_nir(image_bgr: np.ndarray, sample_budget: int = 0) -> bool:
     """Heuristic check for non-NIR imagery.
 
     NIR captures are typically near-monochrome across channels. If channel divergence
     is high, we warn but do not fail.
+
+    8-bit BGR frames are scanned in row tiles of about ``_NON_NIR_TILE_PIXELS``
+    using integer channel differences, so memory stays bounded regardless of
+    image size, and the scan stops as soon as either threshold is crossed. With
+    ``sample_budget > 0`` only a regular grid of roughly that many pixels is
+    examined.
     """
 
+    image = np.asarray(image_bgr)
+    if image.dtype != np.uint8 or image.ndim != 3 or image.shape[2] < 3 or image.size == 0:
+        return _likely_non_nir_dense(image)
+
+    height, width = image.shape[:2]
+    if sample_budget > 0 and height * width > sample_budget:
+        step = int(np.ceil(np.sqrt(height * width / sample_budget)))
+        image = image[::step, ::step]
+        height, width = image.shape[:2]
+
+    # Per-pixel std over three channels is sqrt(3 * sum(x^2) - sum(x)^2) / 3, so
+    # mean std > 12 is sum(sqrt(q)) > 36 * pixels with q an exact integer.
+    spread_limit = _NON_NIR_SPREAD * 3.0 * height * width
+    spread_total = 0.0
+    rows = max(_NON_NIR_TILE_PIXELS // width, 1)
+    for top in range(0, height, rows):
+        tile = image[top : top + rows, :, :3].astype(np.int32)
+        blue, green, red = tile[..., 0], tile[..., 1], tile[..., 2]
+        if int(np.abs(blue - red).max()) > _NON_NIR_MAX_DELTA:
+            return True
+        total = blue + green + red
+        q = 3 * (blue * blue + green * green + red * red) - total * total
+        spread_total += float(np.sqrt(q, dtype=np.float64).sum())
+        if spread_total > spread_limit:
+            return True
+    return False
+
+
+def _likely_non_nir_dense(image_bgr: np.ndarray) -> bool:
     image_f32 = image_bgr.astype(np.float32)
     channel_spread = np.mean(np.std(image_f32, axis=2))
     max_delta = float(np.max(np.abs(image_f32[:, :, 0] - image_f32[:, :, 2])))
-    return bool(channel_spread > 12.0 or max_delta > 40.0)
+    return bool(channel_spread > _NON_NIR_SPREAD or max_delta > _NON_NIR_MAX_DELTA)
+
+
+@dataclass(frozen=True)
+class QualityGateSettings:
+    """Pre-segmentation frame quality thresholds, from ``config["quality_gate"]``.
+
+    All measures are taken on a copy downsampled so its longer side is
+    ``analysis_side``:
+
+    * ``min_sharpness``: variance of the Laplacian (motion blur, defocus).
+    * ``min_mean`` / ``max_mean`` and ``max_saturated_fraction``: exposure.
+    * ``min_pupil_contrast``: median level minus the darkest pupil-sized blob
+      in the central region; blinks and closed eyes have no dark blob.
+
+    With ``best_of > 0`` frames are grouped into bursts of ``burst_size`` and
+    only the ``best_of`` sharpest passing frames of each burst are kept.
+    """
+
+    enabled: bool = False
+    analysis_side: int = 256
+    min_sharpness: float = 20.0
+    min_mean: float = 25.0
+    max_mean: float = 230.0
+    max_saturated_fraction: float = 0.2
+    min_pupil_contrast: float = 25.0
+    best_of: int = 0
+    burst_size: int = 8
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> QualityGateSettings:
+        raw = config.get("quality_gate") or {}
+        if not isinstance(raw, dict):
+            raw = {}
+        return cls(
+            enabled=bool(raw.get("enabled", bool(raw))),
+            analysis_side=max(int(raw.get("analysis_side", cls.analysis_side)), 16),
+            min_sharpness=float(raw.get("min_sharpness", cls.min_sharpness)),
+            min_mean=float(raw.get("min_mean", cls.min_mean)),
+            max_mean=float(raw.get("max_mean", cls.max_mean)),
+            max_saturated_fraction=float(raw.get("max_saturated_fraction", cls.max_saturated_fraction)),
+            min_pupil_contrast=float(raw.get("min_pupil_contrast", cls.min_pupil_contrast)),
+            best_of=max(int(raw.get("best_of", cls.best_of) or 0), 0),
+            burst_size=max(int(raw.get("burst_size", cls.burst_size)), 1),
+        )
+
+
+@dataclass(frozen=True)
+class FrameQuality:
+    """Quality measures of one frame; ``reason`` is set when the gate rejects it."""
+
+    sharpness: float
+    mean_level: float
+    saturated_fraction: float
+    pupil_contrast: float
+    reason: str | None = None
+    detail: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        return self.reason is None
+
+    def rejected(self, reason: str, detail: str) -> FrameQuality:
+        return FrameQuality(
+            sharpness=self.sharpness,
+            mean_level=self.mean_level,
+            saturated_fraction=self.saturated_fraction,
+            pupil_contrast=self.pupil_contrast,
+            reason=reason,
+            detail=detail,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "sharpness": round(self.sharpness, 3),
+            "mean_level": round(self.mean_level, 3),
+            "saturated_fraction": round(self.saturated_fraction, 6),
+            "pupil_contrast": round(self.pupil_contrast, 3),
+            "passed": self.passed,
+            "reason": self.reason,
+            "detail": self.detail,
+        }
+
+
+def assess_frame_quality(gray: np.ndarray, settings: QualityGateSettings) -> FrameQuality:
+    """Measure sharpness, exposure and pupil darkness and apply ``settings`` thresholds."""
+
+    height, width = gray.shape[:2]
+    scale = min(settings.analysis_side / max(height, width, 1), 1.0)
+    small = np.asarray(gray)
+    if scale < 1.0:
+        size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+        small = cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+
+    sharpness = float(cv2.Laplacian(small, cv2.CV_64F).var())
+    mean_level = float(small.mean())
+    saturated_fraction = float(np.count_nonzero(small >= 250)) / small.size
+
+    # Darkest pupil-sized blob (about 1/12 of the frame) within the central 60%.
+    kernel = max(min(small.shape) // 12, 1)
+    blurred = cv2.blur(small, (kernel, kernel))
+    top, left = small.shape[0] // 5, small.shape[1] // 5
+    centre = blurred[top : small.shape[0] - top or None, left : small.shape[1] - left or None]
+    pupil_contrast = float(np.median(small)) - float(centre.min())
+
+    quality = FrameQuality(sharpness, mean_level, saturated_fraction, pupil_contrast)
+    if mean_level < settings.min_mean:
+        return quality.rejected("underexposed", f"mean level {mean_level:.1f} < {settings.min_mean:g}")
+    if mean_level > settings.max_mean or saturated_fraction > settings.max_saturated_fraction:
+        return quality.rejected(
+            "overexposed",
+            f"mean level {mean_level:.1f}, saturated fraction {saturated_fraction:.3f}",
+        )
+    if sharpness < settings.min_sharpness:
+        return quality.rejected("blur", f"sharpness {sharpness:.1f} < {settings.min_sharpness:g}")
+    if pupil_contrast < settings.min_pupil_contrast:
+        return quality.rejected("no_pupil", f"pupil contrast {pupil_contrast:.1f} < {settings.min_pupil_contrast:g}")
+    return quality
+
+
+def select_best_of_burst(qualities: list[FrameQuality], best_of: int) -> list[FrameQuality]:
+    """Reject passing frames of one burst that are not among its ``best_of`` sharpest."""
+
+    passing = sorted(
+        (index for index, quality in enumerate(qualities) if quality.passed),
+        key=lambda index: (-qualities[index].sharpness, index),
+    )
+    selected = list(qualities)
+    for rank, index in enumerate(passing[best_of:], start=best_of + 1):
+        selected[index] = qualities[index].rejected("burst_rank", f"sharpness rank {rank} of {len(passing)}")
+    return selected
+
+
+def resize_mask(mask: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+    """Scale a label mask to ``shape`` (height, width) without mixing labels."""
+
+    return cv2.resize(mask, (int(shape[1]), int(shape[0])), interpolation=cv2.INTER_NEAREST)
 
 
 def frozen_array_copy(array: np.ndarray) -> np.ndarray:
-    """Create a read-only copy used for extension isolation."""
+    """Create a read-only copy used for extension isolation.
+
+    The copy is backed by an immutable ``bytes`` buffer, so neither the array
+    nor any view of it can be made writeable again.
+    """
+
+    source = np.ascontiguousarray(array)
+    out = np.frombuffer(source.tobytes(), dtype=source.dtype).reshape(source.shape)
+    return out
+
+
+def frozen_view(array: np.ndarray) -> np.ndarray:
+    """Return a read-only view sharing memory with ``array`` (no pixel copy)."""
 
-    out = np.array(array, copy=True)
+    out = array.view()
     out.setflags(write=False)
     return out
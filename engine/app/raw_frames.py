@@ -0,0 +1,129 @@
+"""Memory-mapped raw and ``.npy`` NIR frames from capture rigs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+RAW_FRAME_SUFFIXES = {".raw", ".npy"}
+_DTYPES = {"uint8": np.uint8, "uint16": np.uint16}
+
+
+@dataclass(frozen=True)
+class RawFrameFormat:
+    """Layout of headerless ``.raw`` frames, from ``config["image_loader"]["raw"]``.
+
+    ``stride`` is the row pitch in bytes (defaults to ``width`` times the sample
+    size) and ``offset`` skips a fixed file header. ``bit_depth`` is the number
+    of significant bits in 16-bit samples (e.g. 10 or 12); 16-bit frames are
+    shifted down to 8 bits for segmentation. ``.npy`` files carry their own
+    shape and dtype and only use ``bit_depth``.
+    """
+
+    width: int = 0
+    height: int = 0
+    dtype: str = "uint8"
+    bit_depth: int | None = None
+    stride: int | None = None
+    offset: int = 0
+    byteorder: str = "little"
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> RawFrameFormat:
+        loader = config.get("image_loader")
+        raw = loader.get("raw") if isinstance(loader, dict) else None
+        if not isinstance(raw, dict):
+            raw = {}
+        frame_format = cls(
+            width=int(raw.get("width", 0) or 0),
+            height=int(raw.get("height", 0) or 0),
+            dtype=str(raw.get("dtype", cls.dtype)).lower(),
+            bit_depth=int(raw["bit_depth"]) if raw.get("bit_depth") is not None else None,
+            stride=int(raw["stride"]) if raw.get("stride") is not None else None,
+            offset=max(int(raw.get("offset", 0) or 0), 0),
+            byteorder=str(raw.get("byteorder", cls.byteorder)).lower(),
+        )
+        if frame_format.dtype not in _DTYPES:
+            raise ValueError(f"Unsupported image_loader.raw.dtype: {frame_format.dtype}")
+        if frame_format.byteorder not in ("little", "big"):
+            raise ValueError(f"Unsupported image_loader.raw.byteorder: {frame_format.byteorder}")
+        return frame_format
+
+
+def is_raw_frame(path: Path) -> bool:
+    return path.suffix.lower() in RAW_FRAME_SUFFIXES
+
+
+def load_raw_frame(path: Path, frame_format: RawFrameFormat) -> tuple[np.ndarray, int]:
+    """Map ``path`` read-only and return ``(gray_uint8, source_bit_depth)``.
+
+    8-bit frames come back as a view of the mapping, so no pixel is copied
+    before segmentation; row padding (``stride``) is skipped through strides.
+    16-bit frames are shifted to 8 bits in one pass.
+    """
+
+    if path.suffix.lower() == ".npy":
+        frame = np.load(path, mmap_mode="r", allow_pickle=False)
+        if frame.ndim == 3 and frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        if frame.ndim != 2 or frame.dtype.kind != "u" or frame.dtype.itemsize not in (1, 2):
+            raise ValueError(f"Expected a 2-D uint8 or uint16 frame in {path}, got {frame.dtype} {frame.shape}")
+    else:
+        frame = _map_raw(path, frame_format)
+
+    if frame.dtype.itemsize == 1:
+        return frame, 8
+
+    bit_depth = frame_format.bit_depth or 16
+    if not 8 < bit_depth <= 16:
+        raise ValueError(f"bit_depth must be between 9 and 16 for 16-bit frames, got {bit_depth}")
+    gray = np.empty(frame.shape, dtype=np.uint8)
+    np.right_shift(frame, bit_depth - 8, out=gray, casting="unsafe")
+    return gray, bit_depth
+
+
+def raw_layout(path: Path, frame_format: RawFrameFormat, bit_depth: int) -> dict[str, Any]:
+    """Settings that decide how ``path``'s bytes become pixels, for cache keys.
+
+    ``.npy`` files carry their own shape and dtype, so only the effective
+    ``bit_depth`` applies to them.
+    """
+
+    if path.suffix.lower() == ".npy":
+        return {"bit_depth": bit_depth}
+    return {
+        "width": frame_format.width,
+        "height": frame_format.height,
+        "dtype": frame_format.dtype,
+        "bit_depth": bit_depth,
+        "stride": frame_format.stride,
+        "offset": frame_format.offset,
+        "byteorder": frame_format.byteorder,
+    }
+
+
+def _map_raw(path: Path, frame_format: RawFrameFormat) -> np.ndarray:
+    if frame_format.width <= 0 or frame_format.height <= 0:
+        raise ValueError("Raw input requires image_loader.raw.width and image_loader.raw.height")
+
+    dtype = np.dtype(_DTYPES[frame_format.dtype]).newbyteorder("<" if frame_format.byteorder == "little" else ">")
+    stride = frame_format.stride or frame_format.width * dtype.itemsize
+    if stride % dtype.itemsize or stride < frame_format.width * dtype.itemsize:
+        raise ValueError(f"Raw stride {stride} does not fit {frame_format.width} {frame_format.dtype} samples")
+    needed = frame_format.offset + stride * frame_format.height
+    size = path.stat().st_size
+    if size < needed:
+        raise ValueError(f"Raw frame {path} has {size} bytes; layout needs {needed}")
+
+    rows = np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=frame_format.offset,
+        shape=(frame_format.height, stride // dtype.itemsize),
+    )
+    return rows[:, : frame_format.width]
@@ -0,0 +1,200 @@
+"""Content-addressed on-disk cache of segmentation masks and measurements."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".irisatlasai" / "result_cache"
+DEFAULT_MAX_MB = 1024
+
+_MASK_FILENAME = "mask.png"
+_MEASUREMENTS_FILENAME = "measurements.json"
+
+
+class _CacheRootState:
+    """Eviction lock and running byte total shared by every cache on one directory."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # ``None`` until the first put scans the directory.
+        self.total_bytes: int | None = None
+
+
+_ROOT_STATES: dict[Path, _CacheRootState] = {}
+_ROOT_STATES_LOCK = threading.Lock()
+
+
+def _root_state(cache_dir: Path) -> _CacheRootState:
+    with _ROOT_STATES_LOCK:
+        state = _ROOT_STATES.get(cache_dir)
+        if state is None:
+            state = _CacheRootState()
+            _ROOT_STATES[cache_dir] = state
+        return state
+
+
+@dataclass(frozen=True)
+class CachedSegmentation:
+    """Canonical mask and ``compute_measurements`` output for one cache key."""
+
+    mask: np.ndarray
+    metrics: dict[str, float | int]
+
+
+class ResultCache:
+    """Cache keyed by input bytes, decode variant, model, input size, and engine version.
+
+    Each entry is a directory holding ``mask.png`` and ``measurements.json``.
+    Entries are published with an atomic rename, so concurrent writers never
+    expose partial files. A hit refreshes the entry mtime; when the total size
+    exceeds ``max_bytes``, least-recently-used entries are deleted. The size
+    total is kept in memory per cache directory, so a put only rescans the
+    directory when it pushes the total over the limit.
+    """
+
+    def __init__(self, cache_dir: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        self.cache_dir = Path(cache_dir).expanduser().resolve()
+        self.max_bytes = max(int(max_bytes), 0)
+        self._state = _root_state(self.cache_dir)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> ResultCache | None:
+        """Build a cache from ``config["result_cache"]``; ``None`` when disabled."""
+
+        raw = config.get("result_cache")
+        if not isinstance(raw, dict) or not bool(raw.get("enabled", False)):
+            return None
+        cache_dir = str(raw.get("cache_dir", "")).strip() or DEFAULT_CACHE_DIR
+        max_mb = float(raw.get("max_mb", DEFAULT_MAX_MB))
+        return cls(cache_dir=cache_dir, max_bytes=int(max_mb * 1024 * 1024))
+
+    @staticmethod
+    def make_key(
+        input_sha256: str,
+        model_hash: str,
+        input_size: Any,
+        engine_version: str,
+        input_variant: dict[str, Any] | None = None,
+    ) -> str:
+        """Key for one segmentation; ``input_variant`` describes how the file was decoded.
+
+        The same file bytes segment differently under a reduced-scale decode or
+        another raw layout, so those settings (``LoadedImage.input_variant()``)
+        are part of the key.
+        """
+
+        payload = {
+            "input_sha256": str(input_sha256),
+            "input_variant": input_variant or {},
+            "model_hash": str(model_hash),
+            "input_size": [int(value) for value in input_size],
+            "engine_version": str(engine_version),
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> CachedSegmentation | None:
+        entry_dir = self._entry_dir(key)
+        mask_path = entry_dir / _MASK_FILENAME
+        measurements_path = entry_dir / _MEASUREMENTS_FILENAME
+        try:
+            metrics = json.loads(measurements_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        mask = cv2.imread(str(mask_path), cv2.IMREAD_UNCHANGED)
+        if mask is None or mask.ndim != 2:
+            return None
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+        return CachedSegmentation(mask=mask.astype(np.uint8, copy=False), metrics=metrics)
+
+    def put(self, key: str, mask: np.ndarray, metrics: dict[str, float | int]) -> None:
+        """Publish ``mask`` and ``metrics`` under ``key``.
+
+        Raises ``OSError`` when the entry cannot be stored (e.g. a full or
+        read-only cache directory); losing the race to another writer that
+        published the same key is not an error.
+        """
+
+        entry_dir = self._entry_dir(key)
+        if entry_dir.exists():
+            return
+        staging_dir = entry_dir.parent / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            staging_dir.mkdir(parents=True)
+            if not cv2.imwrite(str(staging_dir / _MASK_FILENAME), np.asarray(mask, dtype=np.uint8)):
+                raise OSError(f"Failed to write cached mask for {key}")
+            (staging_dir / _MEASUREMENTS_FILENAME).write_text(
+                json.dumps(metrics, sort_keys=True), encoding="utf-8"
+            )
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        try:
+            os.replace(staging_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            if entry_dir.is_dir():
+                # Another writer published the same key first.
+                return
+            raise
+
+        size = _entry_size(entry_dir)
+        with self._state.lock:
+            if self._state.total_bytes is None:
+                self._evict_locked()
+                return
+            self._state.total_bytes += size
+            if self._state.total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def evict_to_limit(self) -> int:
+        """Delete least-recently-used entries until under ``max_bytes``. Returns count removed."""
+
+        with self._state.lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        entries = []
+        for entry_dir in self.cache_dir.glob("*/*"):
+            if not entry_dir.is_dir() or entry_dir.name.startswith("."):
+                continue
+            try:
+                entries.append((entry_dir.stat().st_mtime_ns, _entry_size(entry_dir), entry_dir))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry_dir in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            removed += 1
+        self._state.total_bytes = total
+        return removed
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+
+def _entry_size(entry_dir: Path) -> int:
+    try:
+        return sum(path.stat().st_size for path in entry_dir.iterdir())
+    except OSError:
+        return 0
@@ -0,0 +1,212 @@
+"""Append-only SQLite ledger consolidating run states, results, and manifests."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    input_sha256 TEXT,
+    output_dir TEXT NOT NULL,
+    run_state TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS run_events_input_sha256 ON run_events (input_sha256);
+CREATE INDEX IF NOT EXISTS run_events_run_id ON run_events (run_id);
+
+CREATE TABLE IF NOT EXISTS run_documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS run_documents_run_id ON run_documents (run_id, kind);
+
+CREATE TABLE IF NOT EXISTS environments (
+    fingerprint TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS run_latest (
+    run_id TEXT PRIMARY KEY,
+    input_path TEXT NOT NULL,
+    input_sha256 TEXT,
+    output_dir TEXT NOT NULL,
+    run_state TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    error TEXT,
+    superseded_by TEXT
+);
+CREATE INDEX IF NOT EXISTS run_latest_state ON run_latest (run_state);
+CREATE INDEX IF NOT EXISTS run_latest_input_sha256 ON run_latest (input_sha256);
+"""
+
+# Created after the column check so ledgers written before ``superseded_by`` existed still open.
+_INPUT_INDEX = "CREATE INDEX IF NOT EXISTS run_latest_input ON run_latest (input_path, output_dir, superseded_by)"
+
+
+class RunLedger:
+    """One SQLite file recording every run of a job.
+
+    ``run_events`` and ``run_documents`` are append-only: each state transition
+    and each results/manifest payload adds a row. ``run_latest`` is an index
+    holding the current state per run so failed or incomplete runs can be
+    queried by state or input hash without walking output directories. A new
+    run of the same input path and output directory (a re-run, or the same
+    TIFF page again) marks the earlier rows ``superseded_by`` its ``run_id``,
+    so :meth:`runs_by_state` reports only the latest attempt per input. The
+    per-run JSON files are still written; the ledger sits next to them.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path).expanduser().resolve()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(run_latest)")}
+            if "superseded_by" not in columns:
+                self._connection.execute("ALTER TABLE run_latest ADD COLUMN superseded_by TEXT")
+            self._connection.execute(_INPUT_INDEX)
+
+    def record_state(
+        self,
+        run_id: str,
+        input_path: Path,
+        input_sha256: str | None,
+        output_dir: Path,
+        run_state: str,
+        timestamp: str,
+        error: str | None = None,
+    ) -> None:
+        row = (run_id, str(input_path), input_sha256, str(output_dir), run_state, timestamp, error)
+        with self._lock, self._connection:
+            is_new_run = (
+                self._connection.execute("SELECT 1 FROM run_latest WHERE run_id = ?", (run_id,)).fetchone() is None
+            )
+            self._connection.execute(
+                "INSERT INTO run_events (run_id, input_path, input_sha256, output_dir, run_state, timestamp, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._connection.execute(
+                "INSERT INTO run_latest (run_id, input_path, input_sha256, output_dir, run_state, updated_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET run_state = excluded.run_state, "
+                "updated_at = excluded.updated_at, error = excluded.error",
+                row,
+            )
+            if is_new_run:
+                self._connection.execute(
+                    "UPDATE run_latest SET superseded_by = ? "
+                    "WHERE input_path = ? AND output_dir = ? AND run_id != ? AND superseded_by IS NULL",
+                    (run_id, str(input_path), str(output_dir), run_id),
+                )
+
+    def record_document(self, run_id: str, kind: str, payload: dict[str, Any]) -> None:
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO run_documents (run_id, kind, payload) VALUES (?, ?, ?)",
+                (run_id, kind, encoded),
+            )
+
+    def record_manifest(self, run_id: str, manifest: dict[str, Any]) -> None:
+        """Store a manifest, keeping each distinct environment snapshot only once.
+
+        The stored document carries ``environment_fingerprint``; the full block is
+        available from :meth:`environment`.
+        """
+
+        document = dict(manifest)
+        snapshot = document.pop("environment_snapshot", None)
+        fingerprint = document.get("environment_fingerprint")
+        if snapshot is not None and fingerprint:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO environments (fingerprint, payload) VALUES (?, ?)",
+                    (fingerprint, json.dumps(snapshot, sort_keys=True, separators=(",", ":"))),
+                )
+        elif snapshot is not None:
+            document["environment_snapshot"] = snapshot
+        self.record_document(run_id, "manifest", document)
+
+    def environment(self, fingerprint: str) -> dict[str, Any] | None:
+        rows = self._query("SELECT payload FROM environments WHERE fingerprint = ?", (fingerprint,))
+        return json.loads(rows[0]["payload"]) if rows else None
+
+    def runs_by_state(self, *run_states: str) -> list[dict[str, Any]]:
+        """Latest run per input in any of ``run_states`` (e.g. ``"failed"``, ``"running"``).
+
+        Runs superseded by a later run of the same input are left out.
+        """
+
+        if not run_states:
+            raise ValueError("runs_by_state requires at least one run state")
+        placeholders = ", ".join("?" for _ in run_states)
+        return self._query(
+            f"SELECT * FROM run_latest WHERE run_state IN ({placeholders}) AND superseded_by IS NULL "
+            "ORDER BY updated_at",
+            run_states,
+        )
+
+    def runs_for_input(self, input_sha256: str) -> list[dict[str, Any]]:
+        """Every run of inputs hashing to ``input_sha256``, superseded ones included."""
+
+        return self._query(
+            "SELECT * FROM run_latest WHERE input_sha256 = ? ORDER BY updated_at",
+            (input_sha256,),
+        )
+
+    def events(self, run_id: str) -> list[dict[str, Any]]:
+        return self._query("SELECT * FROM run_events WHERE run_id = ? ORDER BY id", (run_id,))
+
+    def document(self, run_id: str, kind: str) -> dict[str, Any] | None:
+        rows = self._query(
+            "SELECT payload FROM run_documents WHERE run_id = ? AND kind = ? ORDER BY id DESC LIMIT 1",
+            (run_id, kind),
+        )
+        return json.loads(rows[0]["payload"]) if rows else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+        with self._lock:
+            cursor = self._connection.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+_OPEN_LEDGERS: dict[Path, RunLedger] = {}
+_OPEN_LEDGERS_LOCK = threading.Lock()
+
+
+def ledger_from_config(config: dict[str, Any]) -> RunLedger | None:
+    """Return the shared ledger for ``config["run_ledger"]`` (a path), or ``None``."""
+
+    raw = config.get("run_ledger")
+    if isinstance(raw, dict):
+        raw = raw.get("path") if raw.get("enabled", True) else None
+    if not raw:
+        return None
+    path = Path(str(raw)).expanduser().resolve()
+    with _OPEN_LEDGERS_LOCK:
+        ledger = _OPEN_LEDGERS.get(path)
+        if ledger is None:
+            ledger = RunLedger(path)
+            _OPEN_LEDGERS[path] = ledger
+        return ledger
@@ -1,23 +1,28 @@
 """CLI pipeline for IrisAtlasAI structural iris analysis.
 
-This module is retained for deterministic single-image CLI runs. The desktop API
-uses ``engine.run_analysis``.
+This module is retained for deterministic CLI runs. A single image is processed
+with ``--input``; ``--input-dir`` and/or ``--glob`` process many images with one
+loaded model and a resumable JSON-lines results ledger. The desktop API uses
+``engine.run_analysis``.
 """
 
 from __future__ import annotations
 
 import argparse
+import glob
 import json
+import os
+from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import cv2
 import numpy as np
 
-from engine.core.measurements import compute_measurements
+from engine.core.measurements import compute_measurements, label_histogram
 from engine.core.overlay import generate_overlay
 from engine.core.segmentation import IrisSegmentationEngine
-from engine.utils.file_utils import ensure_dir, load_json
+from engine.utils.file_utils import SUPPORTED_EXTENSIONS, ensure_dir, load_json, sha256_file
 from engine.utils.image_utils import load_nir_image
 
 
@@ -31,13 +36,15 @@ def _validate_single_image_input(input_path: Path) -> None:
         raise ValueError(f"Input must be a single image file, got: {input_path}")
 
 
-def _validate_mask_contract(mask: np.ndarray) -> np.ndarray:
+def _validate_mask_contract(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Validate labels and return ``(mask_uint8, label_counts)`` from one histogram pass."""
     mask_uint8 = np.asarray(mask, dtype=np.uint8)
     if mask_uint8.ndim != 2:
         raise ValueError("Segmentation mask must be single-channel")
-    if not set(np.unique(mask_uint8)).issubset(CANONICAL_MASK_VALUES):
+    label_counts = label_histogram(mask_uint8)
+    if not set(np.flatnonzero(label_counts).tolist()).issubset(CANONICAL_MASK_VALUES):
         raise ValueError("Unexpected labels found in segmentation output")
-    return mask_uint8
+    return mask_uint8, label_counts
 
 
 def build_result(
@@ -68,7 +75,17 @@ def build_result(
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="IrisAtlasAI NIR structural analysis pipeline")
-    parser.add_argument("--input", required=True, help="Path to NIR iris image (.png/.jpg)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", help="Path to NIR iris image (.png/.jpg)")
+    source.add_argument("--input-dir", help="Folder of NIR iris images processed with one loaded model")
+    parser.add_argument(
+        "--glob",
+        help="Glob pattern selecting images ('**' recurses); relative to --input-dir when given",
+    )
+    parser.add_argument(
+        "--ledger",
+        help="JSON-lines results ledger for folder/glob runs (default: <output>/results_ledger.jsonl)",
+    )
     parser.add_argument("--output", required=True, help="Output folder path")
     parser.add_argument(
         "--config-dir",
@@ -76,38 +93,182 @@ def parse_args() -> argparse.Namespace:
         help="Directory containing model_config.json",
     )
     parser.add_argument("--pdf", action="store_true", help="Generate optional PDF report")
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not (args.input or args.input_dir or args.glob):
+        parser.error("one of --input, --input-dir, or --glob is required")
+    if args.input and args.glob:
+        parser.error("--glob cannot be combined with --input")
+    return args
 
 
 def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if getattr(args, "input_dir", None) or getattr(args, "glob", None):
+        return run_batch(args)
+
     config_dir = Path(args.config_dir)
     input_path = Path(args.input)
     _validate_single_image_input(input_path)
 
     model_config = load_json(config_dir / "model_config.json")
     output_dir = ensure_dir(args.output)
-    original_bgr, gray = load_nir_image(input_path)
-
     segmenter = IrisSegmentationEngine(model_config)
-    mask = _validate_mask_contract(segmenter.infer(gray))
+    return _process_image(segmenter, model_config, input_path, output_dir, pdf=args.pdf)
+
+
+def run_batch(args: argparse.Namespace) -> Dict[str, Any]:
+    """Process every matching image with one loaded model.
+
+    One JSON line per processed image is appended to the results ledger. Images
+    whose ``<stem>_results.json`` exists and whose ledger entry records the same
+    input SHA-256 are skipped, so an interrupted run can simply be restarted.
+    Inputs sharing a stem in one folder (``a.png``, ``a.jpg``) get ``<stem>_2``,
+    ``<stem>_3``, ... output names in sorted order. If the segmentation engine
+    cannot be constructed, the failure is recorded and the run stops.
+    """
+    config_dir = Path(args.config_dir)
+    input_root, images = _collect_batch_inputs(getattr(args, "input_dir", None), getattr(args, "glob", None))
+
+    model_config = load_json(config_dir / "model_config.json")
+    output_root = ensure_dir(args.output)
+    ledger_path = Path(getattr(args, "ledger", None) or output_root / "results_ledger.jsonl")
+    completed = _load_completed_ledger_entries(ledger_path)
+
+    summary = {"processed": 0, "skipped": 0, "failed": 0}
+    segmenter = None
+    used_stems: set[tuple[Path, str]] = set()
+    for input_path in images:
+        output_dir = output_root / input_path.parent.relative_to(input_root)
+        output_stem = _unique_output_stem(output_dir, input_path.stem, used_stems)
+        json_path = output_dir / f"{output_stem}_results.json"
+        input_sha256 = sha256_file(input_path)
+        if json_path.exists() and completed.get(str(json_path.resolve())) == input_sha256:
+            summary["skipped"] += 1
+            continue
+
+        entry: Dict[str, Any] = {
+            "input_path": str(input_path.resolve()),
+            "input_sha256": input_sha256,
+            "results_json_path": str(json_path.resolve()),
+        }
+        if segmenter is None:
+            try:
+                segmenter = IrisSegmentationEngine(model_config)
+            except Exception as exc:
+                # Construction does not depend on the image; retrying per input only repeats the failure.
+                entry.update({"status": "failed", "error": str(exc)})
+                _append_ledger_entry(ledger_path, entry)
+                raise
+        try:
+            _process_image(
+                segmenter,
+                model_config,
+                input_path,
+                ensure_dir(output_dir),
+                pdf=args.pdf,
+                output_stem=output_stem,
+            )
+            entry.update({"status": "success", "error": None})
+            summary["processed"] += 1
+        except Exception as exc:
+            entry.update({"status": "failed", "error": str(exc)})
+            summary["failed"] += 1
+        _append_ledger_entry(ledger_path, entry)
+
+    return {
+        "status": "success" if summary["failed"] == 0 else "partial",
+        "total_images": len(images),
+        **summary,
+        "ledger_path": str(ledger_path),
+    }
+
+
+def _unique_output_stem(output_dir: Path, stem: str, used_stems: set[tuple[Path, str]]) -> str:
+    name = stem
+    suffix = 1
+    while (output_dir, name) in used_stems:
+        suffix += 1
+        name = f"{stem}_{suffix}"
+    used_stems.add((output_dir, name))
+    return name
+
+
+def _collect_batch_inputs(input_dir: str | None, pattern: str | None) -> tuple[Path, List[Path]]:
+    if input_dir:
+        root = Path(input_dir)
+        if not root.is_dir():
+            raise ValueError(f"Input directory does not exist: {root}")
+        candidates = root.glob(pattern) if pattern else root.iterdir()
+    else:
+        candidates = (Path(match) for match in glob.glob(str(pattern), recursive=True))
+
+    images = sorted(
+        path for path in candidates if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+    if not images:
+        raise ValueError("No matching input images found")
+    if not input_dir:
+        root = Path(os.path.commonpath([str(path.parent.resolve()) for path in images]))
+        images = [path.resolve() for path in images]
+    return root, images
+
+
+def _load_completed_ledger_entries(ledger_path: Path) -> Dict[str, str]:
+    """Map results JSON path to the input SHA-256 of its latest successful run."""
+    completed: Dict[str, str] = {}
+    if not ledger_path.exists():
+        return completed
+    with ledger_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted run is simply reprocessed.
+                continue
+            results_path = str(entry.get("results_json_path", ""))
+            if entry.get("status") == "success":
+                completed[results_path] = str(entry.get("input_sha256", ""))
+            else:
+                completed.pop(results_path, None)
+    return completed
+
+
+def _append_ledger_entry(ledger_path: Path, entry: Dict[str, Any]) -> None:
+    ledger_path.parent.mkdir(parents=True, exist_ok=True)
+    record = {**entry, "timestamp": datetime.now(UTC).replace(microsecond=0).isoformat().replace("+00:00", "Z")}
+    with ledger_path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record, sort_keys=True) + "\n")
+        handle.flush()
+
+
+def _process_image(
+    segmenter: IrisSegmentationEngine,
+    model_config: Dict[str, Any],
+    input_path: Path,
+    output_dir: Path,
+    pdf: bool,
+    output_stem: str | None = None,
+) -> Dict[str, Any]:
+    stem = output_stem or input_path.stem
+    original_bgr, gray = load_nir_image(input_path)
+    mask, label_counts = _validate_mask_contract(segmenter.infer(gray))
 
-    mask_path = output_dir / f"{input_path.stem}_mask.png"
+    mask_path = output_dir / f"{stem}_mask.png"
     if not cv2.imwrite(str(mask_path), mask):
         raise ValueError(f"Failed to write segmentation mask: {mask_path}")
 
-    measurements = compute_measurements(mask)
+    measurements = compute_measurements(mask, label_counts=label_counts)
     result = build_result(
         input_filename=input_path.name,
         model_version=str(model_config.get("model_version", "unknown")),
         measurements=measurements,
     )
 
-    json_path = output_dir / f"{input_path.stem}_results.json"
+    json_path = output_dir / f"{stem}_results.json"
     with json_path.open("w", encoding="utf-8") as handle:
         json.dump(result, handle, indent=2)
 
     overlay_enabled = bool(model_config.get("overlay", {}).get("enabled", True))
-    overlay_path = output_dir / f"{input_path.stem}_overlay.png"
+    overlay_path = output_dir / f"{stem}_overlay.png"
     if overlay_enabled:
         generate_overlay(
             original_bgr=original_bgr,
@@ -117,7 +278,7 @@ def run(args: argparse.Namespace) -> Dict[str, Any]:
             output_path=overlay_path,
         )
 
-    pdf_enabled = args.pdf or bool(model_config.get("report", {}).get("enabled", False))
+    pdf_enabled = pdf or bool(model_config.get("report", {}).get("enabled", False))
     if pdf_enabled:
         from engine.core.report import create_pdf_report
 
@@ -129,7 +290,7 @@ def run(args: argparse.Namespace) -> Dict[str, Any]:
                 alpha=float(model_config["overlay"]["alpha"]),
                 output_path=overlay_path,
             )
-        pdf_path = output_dir / f"{input_path.stem}_report.pdf"
+        pdf_path = output_dir / f"{stem}_report.pdf"
         create_pdf_report(input_path, overlay_path, pdf_path, result)
 
     return result
@@ -4,36 +4,55 @@ from __future__ import annotations
 
 import concurrent.futures
 import hashlib
+import inspect
 import json
-import os
 import platform
 import random
 import sys
+import threading
 import time
 import tracemalloc
-from dataclasses import dataclass
+import uuid
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from importlib import metadata as importlib_metadata
 from pathlib import Path
 from typing import Any, Callable
 
-import cv2
 import numpy as np
 
 from engine.app.analysis_types import (
     AnalysisResult,
+    FrozenDict,
     ExtensionContext,
     ExtensionResult,
     ExtensionStatus,
     ExtensionTelemetry,
     RunState,
+    freeze_jsonable,
 )
-from engine.app.preprocessing import frozen_array_copy, load_image_for_analysis
+from engine.app.artifacts import ArtifactPolicy, ArtifactStats, write_input_copy, write_mask
+from engine.app.durability import RunJsonWriter
+from engine.app.extension_executor import THREAD_MODE, ExtensionExecutor
+from engine.app.preprocessing import (
+    LoadedImage,
+    LoaderSettings,
+    frozen_array_copy,
+    frozen_view,
+    load_image,
+    resize_mask,
+)
+from engine.app.result_cache import ResultCache
+from engine.app.run_ledger import RunLedger, ledger_from_config
 from engine.app.version import APP_VERSION, ENGINE_API_VERSION, ENGINE_VERSION, MANIFEST_SCHEMA_VERSION
 from engine.extensions import EXECUTION_ORDER, build_extensions
+from engine.utils.file_utils import cached_sha256_file, sha256_file
 
 
 CANONICAL_MASK_VALUES = {0, 1, 2, 3, 4, 5}
+_OVERLAY_BUFFERS = threading.local()
+_ENVIRONMENT: tuple[dict[str, Any], str] | None = None
+_ENVIRONMENT_LOCK = threading.Lock()
 
 
 @dataclass
@@ -44,268 +63,973 @@ class RuntimeOutput:
     extension_telemetry: list[ExtensionTelemetry]
 
 
+@dataclass
+class RuntimeResources:
+    """Long-lived runtime components that can be shared across many runs.
+
+    The segmentation engine is constructed lazily on first use and then reused,
+    so callers processing many inputs pay predictor initialization only once.
+    """
+
+    device: str
+    model_config: dict[str, Any]
+    segmenter_factory: Callable[[dict[str, Any]], Any]
+    compute_measurements: Callable[..., dict[str, float | int]]
+    generate_overlay: Callable[..., Any]
+    extensions: dict[str, object]
+    extension_executor: ExtensionExecutor = field(default_factory=ExtensionExecutor)
+
+    def __post_init__(self) -> None:
+        self._engine: Any | None = None
+        self._engine_lock = threading.Lock()
+
+    def get_engine(self) -> Any:
+        """Return the shared segmentation engine, building it on first use."""
+
+        with self._engine_lock:
+            if self._engine is None:
+                self._engine = self.segmenter_factory(self.model_config)
+            return self._engine
+
+    @property
+    def engine_loaded(self) -> bool:
+        return self._engine is not None
+
+    def warm_up_extensions(self, config: dict[str, Any]) -> list[str]:
+        """Call each extension's optional ``warm_up(config, device)`` hook.
+
+        Returns the names of extensions that reported a warmed model.
+        """
+
+        config_snapshot = _build_config_snapshot(config)
+        warmed = []
+        for name in EXECUTION_ORDER:
+            warm_up = getattr(self.extensions.get(name), "warm_up", None)
+            if callable(warm_up) and warm_up(config_snapshot, self.device):
+                warmed.append(name)
+        return warmed
+
+    def close(self) -> None:
+        """Stop extension workers; abandoned process-mode calls are terminated."""
+
+        self.extension_executor.shutdown(wait=False)
+
+
+@dataclass(frozen=True)
+class RunPlan:
+    """Per-run paths and config snapshot resolved before any analysis work."""
+
+    input_file: Path
+    output_dir: Path
+    config: dict[str, Any]
+    config_snapshot: dict[str, Any]
+    state_path: Path
+    writer: RunJsonWriter = field(default_factory=RunJsonWriter)
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    ledger: RunLedger | None = None
+    input_sha256: str | None = None
+
+
+@dataclass(frozen=True)
+class SegmentationOutcome:
+    """Validated mask plus measurements when they came from the result cache path.
+
+    ``batch_stats`` is the engine's ``last_batch_stats`` (mode, images/s) when
+    the mask came from an ``infer_batch`` call.
+    """
+
+    mask: np.ndarray
+    metrics: dict[str, float | int] | None
+    result_cache: dict[str, Any]
+    label_counts: np.ndarray | None = None
+    batch_stats: dict[str, Any] | None = None
+
+
+def load_runtime_resources(device: str, config: dict[str, Any]) -> RuntimeResources:
+    """Resolve model config, device, core components, and extensions once."""
+
+    model_config = _load_model_config(config)
+    model_config["device"] = _resolve_device(device)
+    segmenter, compute_measurements, generate_overlay = _load_legacy_runtime_components()
+    return RuntimeResources(
+        device=model_config["device"],
+        model_config=model_config,
+        segmenter_factory=segmenter,
+        compute_measurements=compute_measurements,
+        generate_overlay=generate_overlay,
+        extensions=build_extensions(),
+        extension_executor=ExtensionExecutor.from_config(config),
+    )
+
+
 def run_runtime(
     input_path: str | Path,
     device: str,
     config: dict[str, Any],
     stage_callback: Callable[[str, dict[str, Any]], None] | None = None,
+    resources: RuntimeResources | None = None,
 ) -> RuntimeOutput:
-    """Run deterministic analysis and extension pipeline."""
+    """Run deterministic analysis and extension pipeline.
+
+    When ``resources`` is provided (for example by ``AnalysisSession``), the
+    already-initialized segmentation engine and extensions are reused instead of
+    being rebuilt for this run.
+    """
+
+    plan = begin_run(input_path, config)
+    owns_resources = resources is None
+    try:
+        image = load_image(input_path, LoaderSettings.from_config(config))
+
+        if resources is None:
+            resources = load_runtime_resources(device, config)
+
+        if stage_callback:
+            stage_callback("segmentation_started", {"device": resources.device})
+
+        outcome = segment_input(
+            plan,
+            resources,
+            image.segmentation_gray,
+            mask_shape=image.shape,
+            input_variant=image.input_variant(),
+        )
+
+        return finalize_run(
+            plan=plan,
+            resources=resources,
+            original_bgr=image.original_bgr,
+            gray=image.gray,
+            mask=outcome.mask,
+            warnings=image.warnings,
+            input_decode=image.stats(),
+            stage_callback=stage_callback,
+            metrics=outcome.metrics,
+            result_cache=outcome.result_cache,
+            label_counts=outcome.label_counts,
+        )
+    except Exception as exc:
+        fail_run(plan, exc, stage_callback)
+        raise
+    finally:
+        if owns_resources and resources is not None:
+            resources.close()
+
+
+def begin_run(input_path: str | Path, config: dict[str, Any]) -> RunPlan:
+    """Create the output directory and record the QUEUED and RUNNING states."""
 
     output_dir = Path(config.get("output_dir", Path.cwd() / "outputs")).resolve()
     output_dir.mkdir(parents=True, exist_ok=True)
-
     input_file = Path(input_path).resolve()
-    config_snapshot = _build_config_snapshot(config)
-    state_path = _resolve_state_path(config, output_dir)
+    ledger = ledger_from_config(config)
 
-    _write_run_state(
-        state_path=state_path,
-        run_state=RunState.QUEUED,
-        input_path=input_file,
+    plan = RunPlan(
+        input_file=input_file,
         output_dir=output_dir,
-        config_snapshot=config_snapshot,
-        error=None,
+        config=config,
+        config_snapshot=_build_config_snapshot(config),
+        state_path=_resolve_state_path(config, output_dir),
+        writer=RunJsonWriter.from_config(config),
+        ledger=ledger,
+        input_sha256=_ledger_input_sha256(input_file) if ledger is not None else None,
     )
-    _write_run_state(
-        state_path=state_path,
-        run_state=RunState.RUNNING,
+    for run_state in (RunState.QUEUED, RunState.RUNNING):
+        _write_run_state(plan, run_state, error=None)
+    return plan
+
+
+def segment_input(
+    plan: RunPlan,
+    resources: RuntimeResources,
+    gray: np.ndarray,
+    input_sha256: str | None = None,
+    mask_shape: tuple[int, int] | None = None,
+    input_variant: dict[str, Any] | None = None,
+) -> SegmentationOutcome:
+    """Segment ``gray``, consulting the content-addressed result cache when enabled.
+
+    ``mask_shape`` is the full-resolution ``(height, width)`` when ``gray`` was
+    decoded at reduced scale; the mask is scaled up to it (nearest neighbour)
+    before validation, so measurements and artifacts stay full-resolution.
+
+    The cache key combines the input file SHA-256, ``input_variant`` (loader
+    mode, reduction, and raw layout from ``LoadedImage.input_variant()``), the
+    model hash, the model ``input_size``, and the engine version. On a hit the
+    engine is not touched
+    at all; on a miss the mask and measurements are computed and stored. A
+    store that fails is reported as ``result_cache.status = "store_failed"``
+    instead of failing the run.
+    """
+
+    mask_shape = tuple(mask_shape or gray.shape[:2])
+    cache = ResultCache.from_config(plan.config)
+    if cache is None:
+        mask, label_counts = _validate_mask_contract(_infer_mask(resources, gray, mask_shape))
+        return SegmentationOutcome(
+            mask=mask,
+            metrics=None,
+            result_cache={"status": "disabled"},
+            label_counts=label_counts,
+        )
+
+    model_hash = _compute_model_hash(model_config=resources.model_config, config_snapshot=plan.config_snapshot)
+    key = ResultCache.make_key(
+        input_sha256=input_sha256 or plan.input_sha256 or _sha256_file(plan.input_file),
+        model_hash=model_hash,
+        input_size=resources.model_config.get("input_size", [256, 256]),
+        engine_version=ENGINE_VERSION,
+        input_variant=input_variant,
+    )
+    cached = cache.get(key)
+    if cached is not None and cached.mask.shape == mask_shape:
+        mask, label_counts = _validate_mask_contract(cached.mask)
+        return SegmentationOutcome(
+            mask=mask,
+            metrics=dict(cached.metrics),
+            result_cache={"status": "hit", "key": key},
+            label_counts=label_counts,
+        )
+
+    mask, label_counts = _validate_mask_contract(_infer_mask(resources, gray, mask_shape))
+    metrics = {
+        name: _normalize_metric_value(value)
+        for name, value in _measure(resources.compute_measurements, mask, label_counts).items()
+    }
+    result_cache: dict[str, Any] = {"status": "miss", "key": key}
+    try:
+        cache.put(key, mask, metrics)
+    except Exception as exc:
+        # The analysis itself succeeded; a cache that cannot be written only costs reuse.
+        result_cache = {"status": "store_failed", "key": key, "error": str(exc)}
+    return SegmentationOutcome(
+        mask=mask,
+        metrics=metrics,
+        result_cache=result_cache,
+        label_counts=label_counts,
+    )
+
+
+def segment_batch(
+    plans: list[RunPlan],
+    resources: RuntimeResources,
+    grays: list[np.ndarray],
+    input_sha256s: list[str | None] | None = None,
+    mask_shapes: list[tuple[int, int] | None] | None = None,
+    input_variants: list[dict[str, Any] | None] | None = None,
+) -> list[SegmentationOutcome | Exception]:
+    """Segment several inputs, using the engine's ``infer_batch`` when it has one.
+
+    Falls back to :func:`segment_input` per item when the result cache is
+    enabled or the engine only implements ``infer``, and retries each item on
+    its own when the batched call fails, so one bad input does not fail the
+    whole batch. Failures are returned in place of the outcome so the caller
+    can fail individual runs. ``mask_shapes`` and ``input_variants`` work as in
+    :func:`segment_input`.
+    """
+
+    if not plans:
+        return []
+    input_sha256s = input_sha256s or [None] * len(plans)
+    mask_shapes = mask_shapes or [None] * len(plans)
+    input_variants = input_variants or [None] * len(plans)
+    if any(ResultCache.from_config(plan.config) is not None for plan in plans):
+        # Checked before the engine is built, so an all-hit batch never loads the model.
+        return _segment_each(plans, resources, grays, input_sha256s, mask_shapes, input_variants)
+    engine = resources.get_engine()
+    infer_batch = getattr(engine, "infer_batch", None)
+    if not callable(infer_batch):
+        return _segment_each(plans, resources, grays, input_sha256s, mask_shapes, input_variants)
+
+    try:
+        masks = infer_batch(grays)
+    except Exception:
+        return _segment_each(plans, resources, grays, input_sha256s, mask_shapes, input_variants)
+    batch_stats = getattr(engine, "last_batch_stats", None) or None
+
+    outcomes = []
+    for mask, gray, mask_shape in zip(masks, grays, mask_shapes):
+        try:
+            mask_shape = tuple(mask_shape or gray.shape[:2])
+            if isinstance(mask, np.ndarray) and mask.ndim == 2 and mask.shape != mask_shape:
+                mask = resize_mask(mask, mask_shape)
+            mask, label_counts = _validate_mask_contract(mask)
+        except Exception as exc:
+            outcomes.append(exc)
+            continue
+        outcomes.append(
+            SegmentationOutcome(
+                mask=mask,
+                metrics=None,
+                result_cache={"status": "disabled"},
+                label_counts=label_counts,
+                batch_stats=dict(batch_stats) if batch_stats else None,
+            )
+        )
+    return outcomes
+
+
+def _segment_each(
+    plans: list[RunPlan],
+    resources: RuntimeResources,
+    grays: list[np.ndarray],
+    input_sha256s: list[str | None],
+    mask_shapes: list[tuple[int, int] | None],
+    input_variants: list[dict[str, Any] | None],
+) -> list[SegmentationOutcome | Exception]:
+    outcomes: list[SegmentationOutcome | Exception] = []
+    for plan, gray, input_sha256, mask_shape, input_variant in zip(
+        plans, grays, input_sha256s, mask_shapes, input_variants
+    ):
+        try:
+            outcomes.append(
+                segment_input(
+                    plan,
+                    resources,
+                    gray,
+                    input_sha256=input_sha256,
+                    mask_shape=mask_shape,
+                    input_variant=input_variant,
+                )
+            )
+        except Exception as exc:
+            outcomes.append(exc)
+    return outcomes
+
+
+def finalize_run(
+    plan: RunPlan,
+    resources: RuntimeResources,
+    original_bgr: np.ndarray,
+    gray: np.ndarray,
+    mask: np.ndarray,
+    warnings: list[str],
+    stage_callback: Callable[[str, dict[str, Any]], None] | None = None,
+    metrics: dict[str, float | int] | None = None,
+    result_cache: dict[str, Any] | None = None,
+    label_counts: np.ndarray | None = None,
+    input_decode: dict[str, Any] | None = None,
+    extension_results: dict[str, ExtensionResult] | None = None,
+    extension_snapshot: _SharedExtensionSnapshot | None = None,
+    segmentation_batch: dict[str, Any] | None = None,
+) -> RuntimeOutput:
+    """Write artifacts, run extensions, and persist results for a segmented input.
+
+    ``metrics`` may carry measurements already computed (or cached) for ``mask``;
+    otherwise they are derived from ``label_counts`` when it is given.
+    ``input_decode`` (loader stats) and ``segmentation_batch`` (the engine's
+    batched-inference throughput) are recorded in the manifest.
+    ``extension_results`` holds outputs already produced by a batched extension
+    call (see :func:`finalize_batch`); those extensions are not run again, and
+    ``extension_snapshot`` is the snapshot their contexts were built from.
+    """
+
+    config = plan.config
+    config_snapshot = plan.config_snapshot
+    input_file = plan.input_file
+    output_dir = plan.output_dir
+    model_config = _deepcopy_jsonable(resources.model_config)
+    compute_measurements = resources.compute_measurements
+    generate_overlay = resources.generate_overlay
+
+    policy = ArtifactPolicy.from_config(config)
+    artifact_stats = ArtifactStats()
+    mask_path = write_mask(policy, mask, output_dir, artifact_stats)
+    write_input_copy(policy, input_file, original_bgr, output_dir, artifact_stats)
+
+    overlay_alpha = float(config.get("overlay_alpha", model_config.get("overlay", {}).get("alpha", 0.45)))
+    overlay_path = output_dir / policy.overlay_filename
+    overlay_kwargs: dict[str, Any] = {}
+    if _accepts_keyword(generate_overlay, "out"):
+        overlay_kwargs["out"] = _overlay_buffer(original_bgr.shape)
+    if _accepts_keyword(generate_overlay, "write_params"):
+        overlay_kwargs["write_params"] = policy.overlay_params()
+    overlay_started = time.perf_counter()
+    generate_overlay(
+        original_bgr=original_bgr,
+        mask=mask,
+        class_colors=model_config.get("overlay", {}).get("class_colors_bgr", {}),
+        alpha=overlay_alpha,
+        output_path=overlay_path,
+        **overlay_kwargs,
+    )
+    artifact_stats.record("overlay", overlay_path, overlay_started, policy.overlay_format)
+
+    if metrics is None:
+        metrics = _measure(compute_measurements, mask, label_counts)
+    results_json_path = output_dir / "results.json"
+
+    extension_payloads: dict[str, dict[str, Any]] = {}
+    extension_telemetry: list[ExtensionTelemetry] = []
+    fail_on_extension_error = bool(config.get("fail_on_extension_error", False))
+    if fail_on_extension_error:
+        warnings.append("fail_on_extension_error=true is reserved in v0.5-alpha; soft-fail mode remains active.")
+
+    shared_snapshot = extension_snapshot or _extension_snapshot(plan, resources, gray, original_bgr, mask, metrics)
+
+    extension_payloads, extension_telemetry = _run_extension_graph(
+        extensions=resources.extensions,
+        extension_cfg=config.get("extensions", {}),
+        build_context=shared_snapshot.context,
+        executor=resources.extension_executor,
+        warnings=warnings,
+        stage_callback=stage_callback,
+        max_parallel=int(config.get("extension_parallelism", 0) or 0),
+        precomputed=extension_results,
+    )
+
+    analysis_result = AnalysisResult(
+        status="success",
+        engine_version=ENGINE_VERSION,
+        model_version=str(model_config.get("model_version", "unknown")),
+        input_filename=input_file.name,
+        device=str(model_config.get("device", "cpu")),
+        mask_path=str(mask_path),
+        overlay_path=str(overlay_path),
+        results_json_path=str(results_json_path),
+        metrics={key: _normalize_metric_value(value) for key, value in metrics.items()},
+        warnings=warnings,
+        extensions=extension_payloads,
+    )
+
+    payload = analysis_result.to_dict()
+    # Optional mirrored fields for UI convenience.
+    for extension_name, ext_data in extension_payloads.items():
+        if extension_name == "micro_features":
+            payload["micro_feature_metrics"] = ext_data.get("micro_feature_metrics")
+            payload["micro_feature_boxes"] = ext_data.get("micro_feature_boxes")
+        if extension_name == "sector_mapping":
+            payload["sector_density_metrics"] = ext_data.get("sector_density_metrics")
+        if extension_name == "interpretation":
+            payload["interpretation_summary"] = ext_data.get("interpretation_summary")
+            payload["interpretation_text"] = ext_data.get("interpretation_text")
+
+    plan.writer.write(results_json_path, payload)
+    if plan.ledger is not None:
+        plan.ledger.record_document(plan.run_id, "results", payload)
+
+    manifest_path = output_dir / "manifest.json"
+    manifest = _build_manifest_payload(
+        analysis_result=analysis_result,
+        extension_telemetry=extension_telemetry,
+        config_snapshot=config_snapshot,
+        model_config=model_config,
+        run_state=RunState.COMPLETED,
         input_path=input_file,
         output_dir=output_dir,
-        config_snapshot=config_snapshot,
-        error=None,
+        timestamp_override=config.get("manifest_timestamp"),
+        result_cache=result_cache,
+        extension_context=shared_snapshot.stats(),
+        artifact_stats=artifact_stats.to_manifest(),
+        input_decode=input_decode,
+        segmentation_batch=segmentation_batch,
     )
+    plan.writer.write(manifest_path, manifest)
+    if plan.ledger is not None:
+        plan.ledger.record_manifest(plan.run_id, manifest)
 
-    try:
-        original_bgr, gray, warnings = load_image_for_analysis(input_path)
+    _write_run_state(plan, RunState.COMPLETED, error=None)
+    plan.writer.flush()
 
-        model_config = _load_model_config(config)
-        model_config["device"] = _resolve_device(device)
+    if stage_callback:
+        stage_callback("analysis_done", {"result": "success"})
+    return RuntimeOutput(analysis_result=analysis_result, extension_telemetry=extension_telemetry)
 
-        if stage_callback:
-            stage_callback("segmentation_started", {"device": model_config["device"]})
 
-        segmenter, compute_measurements, generate_overlay = _load_legacy_runtime_components()
-        engine = segmenter(model_config)
-        mask = _validate_mask_contract(engine.infer(gray))
+def fail_run(
+    plan: RunPlan,
+    exc: BaseException,
+    stage_callback: Callable[[str, dict[str, Any]], None] | None = None,
+) -> None:
+    """Record the FAILED state for a run that raised."""
 
-        mask_path = output_dir / "mask.png"
-        _require_write(mask_path, mask)
+    _write_run_state(plan, RunState.FAILED, error=str(exc))
+    plan.writer.flush()
+    if stage_callback:
+        stage_callback("analysis_done", {"result": "failed", "error": str(exc)})
 
-        input_copy_path = output_dir / "input.png"
-        _require_write(input_copy_path, original_bgr)
 
-        overlay_alpha = float(config.get("overlay_alpha", model_config.get("overlay", {}).get("alpha", 0.45)))
-        overlay_path = output_dir / "overlay.png"
-        generate_overlay(
-            original_bgr=original_bgr,
-            mask=mask,
-            class_colors=model_config.get("overlay", {}).get("class_colors_bgr", {}),
-            alpha=overlay_alpha,
-            output_path=overlay_path,
-        )
+def reject_run(plan: RunPlan, reason: str) -> None:
+    """Record the REJECTED state for an input skipped before segmentation."""
 
-        metrics = compute_measurements(mask)
-        results_json_path = output_dir / "results.json"
-
-        extension_payloads: dict[str, dict[str, Any]] = {}
-        extension_telemetry: list[ExtensionTelemetry] = []
-        fail_on_extension_error = bool(config.get("fail_on_extension_error", False))
-        if fail_on_extension_error:
-            warnings.append("fail_on_extension_error=true is reserved in v0.5-alpha; soft-fail mode remains active.")
-
-        extensions = build_extensions()
-        extension_cfg = config.get("extensions", {})
-
-        for extension_name in EXECUTION_ORDER:
-            ext = extensions[extension_name]
-            ext_settings = extension_cfg.get(extension_name, {})
-            timeout_ms = int(ext_settings.get("timeout_ms", 30000))
-
-            dependency_status = _validate_dependencies(extension_name, ext, extension_payloads)
-            if dependency_status is not None:
-                status, warning = dependency_status
-                telemetry = ExtensionTelemetry(
-                    name=extension_name,
-                    version=str(getattr(ext, "version", "1")),
-                    status=status,
-                    duration_ms=0,
-                    peak_memory_mb=None,
-                    warning=warning,
-                )
-                extension_telemetry.append(telemetry)
-                warnings.append(f"[{extension_name}] {warning}")
-                continue
-
-            cfg_version = str(ext_settings.get("version", getattr(ext, "version", "1")))
-            impl_version = str(getattr(ext, "version", "1"))
-            if cfg_version != impl_version:
-                warnings.append(
-                    f"[{extension_name}] Config version {cfg_version} differs from implementation {impl_version}; "
-                    "executing implementation version."
-                )
+    _write_run_state(plan, RunState.REJECTED, error=reason)
+    plan.writer.flush()
 
-            context = ExtensionContext(
-                input_path=input_file,
-                output_dir=output_dir,
-                grayscale_image=frozen_array_copy(gray),
-                original_bgr=frozen_array_copy(original_bgr),
-                segmentation_mask=frozen_array_copy(mask),
-                iris_mask=frozen_array_copy((mask == 2).astype(np.uint8)),
-                metrics=dict(metrics),
-                device=model_config["device"],
-                model_version=str(model_config.get("model_version", "unknown")),
-                config=_deepcopy_jsonable(config_snapshot),
-                extension_outputs=_deepcopy_jsonable(extension_payloads),
-            )
 
-            if stage_callback:
-                stage_callback(f"{extension_name}_started", {"timeout_ms": timeout_ms})
+def finalize_batch(
+    plans: list[RunPlan],
+    resources: RuntimeResources,
+    images: list[LoadedImage],
+    outcomes: list[SegmentationOutcome],
+    input_decodes: list[dict[str, Any]] | None = None,
+) -> list[RuntimeOutput | Exception]:
+    """Finalize several segmented inputs, batching extensions that implement ``run_batch``.
 
-            _set_deterministic_seeds()
-            start = time.perf_counter()
-            tracemalloc.start()
+    Dependency-free extensions exposing ``run_batch(contexts)`` (e.g. the YOLO
+    micro-feature detector) run once over the whole batch; every other
+    extension runs per input inside :func:`finalize_run`. A batched call that
+    raises is retried per input with a warning; one that exceeds the summed
+    per-input ``timeout_ms`` is recorded as TIMEOUT for every input rather
+    than run again. A failing input is recorded as FAILED and its exception
+    returned in place of the output.
+    """
+
+    metrics = [
+        outcome.metrics
+        if outcome.metrics is not None
+        else _measure(resources.compute_measurements, outcome.mask, outcome.label_counts)
+        for outcome in outcomes
+    ]
+    batched_names = _batched_extension_names(plans, resources)
+    # Snapshots are built once per input and reused by finalize_run; without a
+    # batched extension, finalize_run builds each one only when it is needed.
+    snapshots: list[_SharedExtensionSnapshot | Exception | None] = [None] * len(plans)
+    if batched_names:
+        for index, (plan, image, outcome) in enumerate(zip(plans, images, outcomes)):
             try:
-                ext_result = _run_with_timeout(ext.run, context, timeout_ms=timeout_ms)
-            except TimeoutError:
-                duration_ms = int((time.perf_counter() - start) * 1000)
-                _, peak = tracemalloc.get_traced_memory()
-                tracemalloc.stop()
-                warning = f"Extension timed out after {timeout_ms} ms"
-                warnings.append(f"[{extension_name}] {warning}")
-                telemetry = ExtensionTelemetry(
-                    name=extension_name,
-                    version=impl_version,
+                snapshots[index] = _extension_snapshot(
+                    plan, resources, image.gray, image.original_bgr, outcome.mask, metrics[index]
+                )
+            except Exception as exc:
+                snapshots[index] = exc
+    batched, batch_warnings = _run_batched_extensions(plans, resources, batched_names, snapshots)
+
+    results: list[RuntimeOutput | Exception] = []
+    for index, (plan, image, outcome) in enumerate(zip(plans, images, outcomes)):
+        try:
+            if isinstance(snapshots[index], Exception):
+                raise snapshots[index]
+            original_bgr, gray = image.original_bgr, image.gray
+            results.append(
+                finalize_run(
+                    plan=plan,
+                    resources=resources,
+                    original_bgr=original_bgr,
+                    gray=gray,
+                    mask=outcome.mask,
+                    warnings=[*image.warnings, *batch_warnings[index]],
+                    metrics=metrics[index],
+                    result_cache=outcome.result_cache,
+                    label_counts=outcome.label_counts,
+                    # Taken after the deferred decodes above so the stats count them.
+                    input_decode=input_decodes[index] if input_decodes else image.stats(),
+                    extension_results=batched[index],
+                    extension_snapshot=snapshots[index],
+                    segmentation_batch=outcome.batch_stats,
+                )
+            )
+        except Exception as exc:
+            fail_run(plan, exc)
+            results.append(exc)
+    return results
+
+
+def _batched_extension_names(plans: list[RunPlan], resources: RuntimeResources) -> list[str]:
+    if len(plans) < 2:
+        return []
+    names = []
+    for name in EXECUTION_ORDER:
+        extension = resources.extensions.get(name)
+        if not callable(getattr(extension, "run_batch", None)):
+            continue
+        # Only extensions without dependencies: their context is known before the graph runs.
+        if getattr(extension, "requires", []) or getattr(extension, "optional_requires", []):
+            continue
+        if all(bool(plan.config.get("extensions", {}).get(name, {}).get("enabled", True)) for plan in plans):
+            names.append(name)
+    return names
+
+
+def _run_batched_extensions(
+    plans: list[RunPlan],
+    resources: RuntimeResources,
+    names: list[str],
+    snapshots: list[_SharedExtensionSnapshot | Exception | None],
+) -> tuple[list[dict[str, ExtensionResult]], list[list[str]]]:
+    results: list[dict[str, ExtensionResult]] = [{} for _ in plans]
+    warnings: list[list[str]] = [[] for _ in plans]
+    members = [index for index, snapshot in enumerate(snapshots) if isinstance(snapshot, _SharedExtensionSnapshot)]
+    if len(members) < 2:
+        return results, warnings
+    for name in names:
+        contexts = [snapshots[index].context({}) for index in members]
+        # The batch gets the time its inputs would have had one by one.
+        timeout_ms = sum(
+            max(int(plans[index].config.get("extensions", {}).get(name, {}).get("timeout_ms", 30000)), 1)
+            for index in members
+        )
+        future = resources.extension_executor.submit(_run_extension_batch_seeded, resources.extensions[name], contexts)
+        try:
+            batch_results = list(future.result(timeout=timeout_ms / 1000.0))
+            if len(batch_results) != len(members):
+                raise ValueError(f"run_batch returned {len(batch_results)} results for {len(members)} inputs")
+        except concurrent.futures.TimeoutError:
+            resources.extension_executor.abandon(future)
+            for index in members:
+                results[index][name] = ExtensionResult(
                     status=ExtensionStatus.TIMEOUT,
-                    duration_ms=duration_ms,
-                    peak_memory_mb=round(peak / (1024 * 1024), 3),
-                    warning=warning,
+                    warning=f"Batched extension timed out after {timeout_ms} ms",
                 )
-                extension_telemetry.append(telemetry)
+            continue
+        except Exception as exc:
+            for index in members:
+                warnings[index].append(f"[{name}] Batched run failed, retried per input: {exc}")
+            continue
+        for index, result in zip(members, batch_results):
+            results[index][name] = result
+    return results, warnings
+
+
+def _extension_snapshot(
+    plan: RunPlan,
+    resources: RuntimeResources,
+    gray: np.ndarray,
+    original_bgr: np.ndarray,
+    mask: np.ndarray,
+    metrics: dict[str, float | int],
+) -> _SharedExtensionSnapshot:
+    return _SharedExtensionSnapshot(
+        input_file=plan.input_file,
+        output_dir=plan.output_dir,
+        gray=gray,
+        original_bgr=original_bgr,
+        mask=mask,
+        metrics=metrics,
+        device=resources.model_config["device"],
+        model_version=str(resources.model_config.get("model_version", "unknown")),
+        config_snapshot=plan.config_snapshot,
+    )
+
+
+def _run_extension_graph(
+    extensions: dict[str, object],
+    extension_cfg: dict[str, Any],
+    build_context: Callable[[dict[str, dict[str, Any]]], ExtensionContext],
+    executor: ExtensionExecutor,
+    warnings: list[str],
+    stage_callback: Callable[[str, dict[str, Any]], None] | None,
+    max_parallel: int = 0,
+    precomputed: dict[str, ExtensionResult] | None = None,
+) -> tuple[dict[str, dict[str, Any]], list[ExtensionTelemetry]]:
+    """Run extensions as a dependency graph and assemble results in locked order.
+
+    An extension depends on the entries of ``requires`` and ``optional_requires``
+    that precede it in ``EXECUTION_ORDER``; it starts as soon as all of them have
+    finished, so independent extensions run concurrently (bounded by
+    ``max_parallel``; ``0`` means unbounded). Each extension only sees the
+    outputs of its declared dependencies, which keeps results independent of
+    scheduling. Payloads, telemetry, and warnings are assembled in
+    ``EXECUTION_ORDER``. Calls run on the long-lived ``executor``; a timed-out
+    extension releases the scheduler at its deadline and is handed to
+    ``executor.abandon``. Results in ``precomputed`` are used as-is instead of
+    calling the extension.
+    """
+
+    precomputed = precomputed or {}
+    order = [name for name in EXECUTION_ORDER if name in extensions]
+    position = {name: index for index, name in enumerate(order)}
+    dependencies = {
+        name: [
+            dep
+            for dep in [*getattr(extensions[name], "requires", []), *getattr(extensions[name], "optional_requires", [])]
+            if dep in position and position[dep] < position[name]
+        ]
+        for name in order
+    }
+    limit = max_parallel if max_parallel > 0 else len(order)
+
+    payloads: dict[str, dict[str, Any]] = {}
+    telemetry: dict[str, ExtensionTelemetry] = {}
+    ext_warnings: dict[str, list[str]] = {name: [] for name in order}
+    pending = list(order)
+    running: dict[concurrent.futures.Future, tuple[str, float, float, int]] = {}
+
+    # Child-process allocations are invisible to tracemalloc in this process.
+    tracer = _ExtensionMemoryTracer() if executor.mode == THREAD_MODE else None
+
+    launched: set[str] = set()
+
+    def finish(name: str, entry: ExtensionTelemetry, payload: dict[str, Any] | None = None) -> None:
+        telemetry[name] = entry
+        if payload is not None:
+            payloads[name] = payload
+        if stage_callback and name in launched:
+            stage_callback(f"{name}_done", {"status": entry.status.value})
+
+    try:
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= limit:
+                    break
+                if any(dep not in telemetry for dep in dependencies[name]):
+                    continue
+                pending.remove(name)
+                ext = extensions[name]
+                ext_settings = extension_cfg.get(name, {})
+                impl_version = str(getattr(ext, "version", "1"))
+
+                dependency_outputs = {dep: payloads[dep] for dep in dependencies[name] if dep in payloads}
+                dependency_status = _validate_dependencies(name, ext, dependency_outputs)
+                if dependency_status is not None:
+                    status, warning = dependency_status
+                    ext_warnings[name].append(warning)
+                    finish(
+                        name,
+                        ExtensionTelemetry(
+                            name=name,
+                            version=impl_version,
+                            status=status,
+                            duration_ms=0,
+                            peak_memory_mb=None,
+                            warning=warning,
+                        ),
+                    )
+                    continue
+
+                cfg_version = str(ext_settings.get("version", impl_version))
+                if cfg_version != impl_version:
+                    ext_warnings[name].append(
+                        f"Config version {cfg_version} differs from implementation {impl_version}; "
+                        "executing implementation version."
+                    )
+
+                timeout_ms = int(ext_settings.get("timeout_ms", 30000))
                 if stage_callback:
-                    stage_callback(f"{extension_name}_done", {"status": ExtensionStatus.TIMEOUT.value})
-                continue
-            except Exception as exc:  # pragma: no cover - runtime protection
-                duration_ms = int((time.perf_counter() - start) * 1000)
-                _, peak = tracemalloc.get_traced_memory()
-                tracemalloc.stop()
-                warning = f"Extension error: {exc}"
-                warnings.append(f"[{extension_name}] {warning}")
-                telemetry = ExtensionTelemetry(
-                    name=extension_name,
-                    version=impl_version,
-                    status=ExtensionStatus.FAILED,
-                    duration_ms=duration_ms,
-                    peak_memory_mb=round(peak / (1024 * 1024), 3),
-                    warning=warning,
+                    stage_callback(f"{name}_started", {"timeout_ms": timeout_ms})
+
+                baseline = tracer.begin() if tracer is not None else 0
+                start = time.perf_counter()
+                if name in precomputed:
+                    future = concurrent.futures.Future()
+                    future.set_result(precomputed[name])
+                else:
+                    future = executor.submit(_run_extension_seeded, ext, build_context(dependency_outputs))
+                launched.add(name)
+                running[future] = (name, start, start + max(timeout_ms, 1) / 1000.0, baseline)
+
+            if not running:
+                if pending:
+                    # Unreachable for a DAG over preceding entries; guard against a stall.
+                    raise RuntimeError(f"Extension scheduling stalled with pending: {pending}")
+                break
+
+            next_deadline = min(deadline for _, _, deadline, _ in running.values())
+            done, _ = concurrent.futures.wait(
+                list(running),
+                timeout=max(next_deadline - time.perf_counter(), 0.0),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            now = time.perf_counter()
+            for future in list(running):
+                name, start, deadline, baseline = running[future]
+                if future not in done and now < deadline:
+                    continue
+                del running[future]
+                duration_ms = int((now - start) * 1000)
+                peak_memory_mb = tracer.end(baseline) if tracer is not None else None
+                impl_version = str(getattr(extensions[name], "version", "1"))
+
+                if future not in done:
+                    executor.abandon(future)
+                    timeout_ms = int(round((deadline - start) * 1000))
+                    warning = f"Extension timed out after {timeout_ms} ms"
+                    ext_warnings[name].append(warning)
+                    finish(
+                        name,
+                        ExtensionTelemetry(
+                            name=name,
+                            version=impl_version,
+                            status=ExtensionStatus.TIMEOUT,
+                            duration_ms=duration_ms,
+                            peak_memory_mb=peak_memory_mb,
+                            warning=warning,
+                        ),
+                    )
+                    continue
+
+                try:
+                    ext_result = future.result()
+                except Exception as exc:  # pragma: no cover - runtime protection
+                    warning = f"Extension error: {exc}"
+                    ext_warnings[name].append(warning)
+                    finish(
+                        name,
+                        ExtensionTelemetry(
+                            name=name,
+                            version=impl_version,
+                            status=ExtensionStatus.FAILED,
+                            duration_ms=duration_ms,
+                            peak_memory_mb=peak_memory_mb,
+                            warning=warning,
+                        ),
+                    )
+                    continue
+
+                if not isinstance(ext_result, ExtensionResult):
+                    ext_result = ExtensionResult(
+                        status=ExtensionStatus.FAILED,
+                        warning=f"Invalid extension result type from {name}",
+                    )
+                if ext_result.warning:
+                    ext_warnings[name].append(ext_result.warning)
+
+                finish(
+                    name,
+                    ExtensionTelemetry(
+                        name=name,
+                        version=impl_version,
+                        status=ext_result.status,
+                        duration_ms=duration_ms,
+                        peak_memory_mb=peak_memory_mb,
+                        model_version=ext_result.model_version,
+                        warning=ext_result.warning,
+                        timings_ms={key: round(float(value), 3) for key, value in ext_result.timings.items()},
+                    ),
+                    _deepcopy_jsonable(ext_result.payload) if ext_result.status == ExtensionStatus.SUCCESS else None,
                 )
-                extension_telemetry.append(telemetry)
-                if stage_callback:
-                    stage_callback(f"{extension_name}_done", {"status": ExtensionStatus.FAILED.value})
-                continue
+    finally:
+        for future in running:
+            executor.abandon(future)
+        if tracer is not None:
+            tracer.close()
+
+    for name in order:
+        warnings.extend(f"[{name}] {warning}" for warning in ext_warnings[name])
+    return (
+        {name: payloads[name] for name in order if name in payloads},
+        [telemetry[name] for name in order if name in telemetry],
+    )
 
-            duration_ms = int((time.perf_counter() - start) * 1000)
-            _, peak = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
 
-            if not isinstance(ext_result, ExtensionResult):
-                ext_result = ExtensionResult(
-                    status=ExtensionStatus.FAILED,
-                    warning=f"Invalid extension result type from {extension_name}",
-                )
+def _run_extension_seeded(extension: Any, context: ExtensionContext) -> Any:
+    # Module-level so it can be pickled into process-mode workers.
+    _set_deterministic_seeds()
+    return extension.run(context)
 
-            if ext_result.warning:
-                warnings.append(f"[{extension_name}] {ext_result.warning}")
 
-            if ext_result.status == ExtensionStatus.SUCCESS:
-                extension_payloads[extension_name] = _deepcopy_jsonable(ext_result.payload)
+def _run_extension_batch_seeded(extension: Any, contexts: list[ExtensionContext]) -> Any:
+    _set_deterministic_seeds()
+    return extension.run_batch(contexts)
 
-            telemetry = ExtensionTelemetry(
-                name=extension_name,
-                version=impl_version,
-                status=ext_result.status,
-                duration_ms=duration_ms,
-                peak_memory_mb=round(peak / (1024 * 1024), 3),
-                model_version=ext_result.model_version,
-                warning=ext_result.warning,
-            )
-            extension_telemetry.append(telemetry)
-
-            if stage_callback:
-                stage_callback(f"{extension_name}_done", {"status": ext_result.status.value})
-
-        analysis_result = AnalysisResult(
-            status="success",
-            engine_version=ENGINE_VERSION,
-            model_version=str(model_config.get("model_version", "unknown")),
-            input_filename=input_file.name,
-            device=str(model_config.get("device", "cpu")),
-            mask_path=str(mask_path),
-            overlay_path=str(overlay_path),
-            results_json_path=str(results_json_path),
-            metrics={key: _normalize_metric_value(value) for key, value in metrics.items()},
-            warnings=warnings,
-            extensions=extension_payloads,
-        )
 
-        payload = analysis_result.to_dict()
-        # Optional mirrored fields for UI convenience.
-        for extension_name, ext_data in extension_payloads.items():
-            if extension_name == "micro_features":
-                payload["micro_feature_metrics"] = ext_data.get("micro_feature_metrics")
-                payload["micro_feature_boxes"] = ext_data.get("micro_feature_boxes")
-            if extension_name == "sector_mapping":
-                payload["sector_density_metrics"] = ext_data.get("sector_density_metrics")
-            if extension_name == "interpretation":
-                payload["interpretation_summary"] = ext_data.get("interpretation_summary")
-                payload["interpretation_text"] = ext_data.get("interpretation_text")
-
-        _atomic_write_json(results_json_path, payload)
-
-        manifest_path = output_dir / "manifest.json"
-        manifest = _build_manifest_payload(
-            analysis_result=analysis_result,
-            extension_telemetry=extension_telemetry,
-            config_snapshot=config_snapshot,
-            model_config=model_config,
-            run_state=RunState.COMPLETED,
-            input_path=input_file,
-            output_dir=output_dir,
-            timestamp_override=config.get("manifest_timestamp"),
-        )
-        _atomic_write_json(manifest_path, manifest)
-
-        _write_run_state(
-            state_path=state_path,
-            run_state=RunState.COMPLETED,
-            input_path=input_file,
-            output_dir=output_dir,
-            config_snapshot=config_snapshot,
-            error=None,
-        )
+class _SharedExtensionSnapshot:
+    """Read-only inputs built once per run and shared by every extension.
 
-        if stage_callback:
-            stage_callback("analysis_done", {"result": "success"})
-        return RuntimeOutput(analysis_result=analysis_result, extension_telemetry=extension_telemetry)
+    Pixel arrays are frozen once (immutable-buffer copies) and each extension
+    receives read-only views of them; config, metrics, and dependency outputs
+    are shared as ``FrozenDict`` trees instead of per-extension JSON
+    round-trips. ``stats()`` reports the copies this avoided.
+    """
 
-    except Exception as exc:
-        _write_run_state(
-            state_path=state_path,
-            run_state=RunState.FAILED,
-            input_path=input_file,
-            output_dir=output_dir,
-            config_snapshot=config_snapshot,
-            error=str(exc),
+    def __init__(
+        self,
+        input_file: Path,
+        output_dir: Path,
+        gray: np.ndarray,
+        original_bgr: np.ndarray,
+        mask: np.ndarray,
+        metrics: dict[str, float | int],
+        device: str,
+        model_version: str,
+        config_snapshot: dict[str, Any],
+    ) -> None:
+        start = time.perf_counter()
+        self._input_file = input_file
+        self._output_dir = output_dir
+        self._device = device
+        self._model_version = model_version
+        self._gray = frozen_array_copy(gray)
+        self._original_bgr = frozen_array_copy(original_bgr)
+        self._mask = frozen_array_copy(mask)
+        self._iris_mask = frozen_array_copy(np.equal(mask, 2).view(np.uint8))
+        self._metrics = FrozenDict(metrics)
+        self._config = freeze_jsonable(config_snapshot)
+        self._frozen_outputs: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._contexts_built = 0
+        self._build_ms = (time.perf_counter() - start) * 1000.0
+        self._array_bytes = sum(
+            array.nbytes for array in (self._gray, self._original_bgr, self._mask, self._iris_mask)
+        )
+
+    def context(self, extension_outputs: dict[str, dict[str, Any]]) -> ExtensionContext:
+        with self._lock:
+            for name, payload in extension_outputs.items():
+                if name not in self._frozen_outputs:
+                    self._frozen_outputs[name] = freeze_jsonable(payload)
+            outputs = FrozenDict({name: self._frozen_outputs[name] for name in extension_outputs})
+            self._contexts_built += 1
+
+        return ExtensionContext(
+            input_path=self._input_file,
+            output_dir=self._output_dir,
+            grayscale_image=frozen_view(self._gray),
+            original_bgr=frozen_view(self._original_bgr),
+            segmentation_mask=frozen_view(self._mask),
+            iris_mask=frozen_view(self._iris_mask),
+            metrics=self._metrics,
+            device=self._device,
+            model_version=self._model_version,
+            config=self._config,
+            extension_outputs=outputs,
         )
-        if stage_callback:
-            stage_callback("analysis_done", {"result": "failed", "error": str(exc)})
-        raise
 
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            contexts = self._contexts_built
+        return {
+            "contexts_built": contexts,
+            "shared_array_bytes": self._array_bytes,
+            "array_bytes_not_copied": self._array_bytes * max(contexts - 1, 0),
+            "snapshot_build_ms": round(self._build_ms, 3),
+        }
+
+
+class _ExtensionMemoryTracer:
+    """Share one ``tracemalloc`` session between concurrently running extensions.
+
+    ``tracemalloc`` is process-global, so tracing is reference-counted across
+    runs and threads. The peak is reset only when no other traced extension is
+    active; with overlapping extensions the reported peak is an upper bound that
+    includes their allocations. Tracing started by the host application (or a
+    test runner) is left running when the last tracer closes.
+    """
 
-def _run_with_timeout(fn: Callable[[ExtensionContext], ExtensionResult], context: ExtensionContext, timeout_ms: int) -> ExtensionResult:
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(fn, context)
-        return future.result(timeout=max(timeout_ms, 1) / 1000.0)
+    _lock = threading.Lock()
+    _users = 0
+    _active = 0
+    _started_tracing = False
+
+    def __init__(self) -> None:
+        with _ExtensionMemoryTracer._lock:
+            if _ExtensionMemoryTracer._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _ExtensionMemoryTracer._started_tracing = True
+            _ExtensionMemoryTracer._users += 1
+        self._closed = False
+
+    def begin(self) -> int:
+        with _ExtensionMemoryTracer._lock:
+            if _ExtensionMemoryTracer._active == 0:
+                tracemalloc.reset_peak()
+            _ExtensionMemoryTracer._active += 1
+            return tracemalloc.get_traced_memory()[0]
+
+    def end(self, baseline: int) -> float:
+        with _ExtensionMemoryTracer._lock:
+            _ExtensionMemoryTracer._active = max(_ExtensionMemoryTracer._active - 1, 0)
+            _, peak = tracemalloc.get_traced_memory()
+        return round(max(peak - baseline, 0) / (1024 * 1024), 3)
+
+    def close(self) -> None:
+        with _ExtensionMemoryTracer._lock:
+            if self._closed:
+                return
+            self._closed = True
+            _ExtensionMemoryTracer._users -= 1
+            if _ExtensionMemoryTracer._users == 0 and _ExtensionMemoryTracer._started_tracing:
+                _ExtensionMemoryTracer._started_tracing = False
+                tracemalloc.stop()
 
 
 def _load_legacy_runtime_components():
@@ -321,18 +1045,53 @@ def _load_legacy_runtime_components():
     return IrisSegmentationEngine, compute_measurements, generate_overlay
 
 
-def _validate_mask_contract(mask: np.ndarray) -> np.ndarray:
+def _infer_mask(resources: RuntimeResources, gray: np.ndarray, mask_shape: tuple[int, ...]) -> np.ndarray:
+    mask = resources.get_engine().infer(gray)
+    if isinstance(mask, np.ndarray) and mask.ndim == 2 and mask.shape != mask_shape:
+        mask = resize_mask(mask, mask_shape)
+    return mask
+
+
+def _validate_mask_contract(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Validate labels and return ``(mask_uint8, label_counts)`` from one histogram pass."""
+
+    from engine.core.measurements import label_histogram
+
     mask_uint8 = np.asarray(mask, dtype=np.uint8)
     if mask_uint8.ndim != 2:
         raise ValueError("Segmentation mask must be single-channel")
-    if not set(np.unique(mask_uint8)).issubset(CANONICAL_MASK_VALUES):
+    label_counts = label_histogram(mask_uint8)
+    if not set(np.flatnonzero(label_counts).tolist()).issubset(CANONICAL_MASK_VALUES):
         raise ValueError("Unexpected labels found in segmentation output")
-    return mask_uint8
+    return mask_uint8, label_counts
+
+
+def _measure(
+    compute_measurements: Callable[..., dict[str, float | int]],
+    mask: np.ndarray,
+    label_counts: np.ndarray | None,
+) -> dict[str, float | int]:
+    # Injected measurement functions may predate the ``label_counts`` argument.
+    if label_counts is not None and _accepts_keyword(compute_measurements, "label_counts"):
+        return compute_measurements(mask, label_counts=label_counts)
+    return compute_measurements(mask)
 
 
-def _require_write(path: Path, image: np.ndarray) -> None:
-    if not cv2.imwrite(str(path), image):
-        raise RuntimeError(f"Failed to write image: {path}")
+def _overlay_buffer(shape: tuple[int, ...]) -> np.ndarray:
+    # One blend buffer per writer thread, reused while the image shape is stable.
+    buffer = getattr(_OVERLAY_BUFFERS, "array", None)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.uint8)
+        _OVERLAY_BUFFERS.array = buffer
+    return buffer
+
+
+def _accepts_keyword(fn: Callable[..., Any], name: str) -> bool:
+    try:
+        parameters = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in parameters or any(param.kind is inspect.Parameter.VAR_KEYWORD for param in parameters.values())
 
 
 def _resolve_device(device: str) -> str:
@@ -404,18 +1163,15 @@ def _validate_dependencies(extension_name: str, extension: object, outputs: dict
     return None
 
 
-def _atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
-    with tmp_path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2, sort_keys=True)
-        handle.flush()
-        os.fsync(handle.fileno())
-    os.replace(tmp_path, path)
+def _deepcopy_jsonable(payload: Any) -> Any:
+    return json.loads(json.dumps(payload, default=_thaw_frozen))
 
 
-def _deepcopy_jsonable(payload: Any) -> Any:
-    return json.loads(json.dumps(payload))
+def _thaw_frozen(value: Any) -> Any:
+    # Extensions may echo parts of their frozen config back into payloads.
+    if isinstance(value, FrozenDict):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
 
 def _build_config_snapshot(config: dict[str, Any]) -> dict[str, Any]:
@@ -431,23 +1187,34 @@ def _resolve_state_path(config: dict[str, Any], output_dir: Path) -> Path:
     return output_dir / "session_state.json"
 
 
-def _write_run_state(
-    state_path: Path,
-    run_state: RunState,
-    input_path: Path,
-    output_dir: Path,
-    config_snapshot: dict[str, Any],
-    error: str | None,
-) -> None:
+def _write_run_state(plan: RunPlan, run_state: RunState, error: str | None) -> None:
     payload = {
         "run_state": run_state.value,
         "timestamp": _utc_now_iso(),
-        "input_path": str(input_path),
-        "output_dir": str(output_dir),
-        "config_snapshot": config_snapshot,
+        "input_path": str(plan.input_file),
+        "output_dir": str(plan.output_dir),
+        "config_snapshot": plan.config_snapshot,
         "error": error,
     }
-    _atomic_write_json(state_path, payload)
+    plan.writer.write(plan.state_path, payload)
+    if plan.ledger is not None:
+        plan.ledger.record_state(
+            run_id=plan.run_id,
+            input_path=plan.input_file,
+            input_sha256=plan.input_sha256,
+            output_dir=plan.output_dir,
+            run_state=run_state.value,
+            timestamp=payload["timestamp"],
+            error=error,
+        )
+
+
+def _ledger_input_sha256(input_file: Path) -> str | None:
+    # Missing inputs still get QUEUED/FAILED ledger rows, just without a hash.
+    try:
+        return sha256_file(input_file)
+    except OSError:
+        return None
 
 
 def _build_manifest_payload(
@@ -459,13 +1226,19 @@ def _build_manifest_payload(
     input_path: Path,
     output_dir: Path,
     timestamp_override: Any | None,
+    result_cache: dict[str, Any] | None = None,
+    extension_context: dict[str, Any] | None = None,
+    artifact_stats: dict[str, Any] | None = None,
+    input_decode: dict[str, Any] | None = None,
+    segmentation_batch: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     timestamp = str(timestamp_override).strip() if timestamp_override is not None else ""
     if not timestamp:
         timestamp = _utc_now_iso()
 
     model_version = str(model_config.get("model_version") or analysis_result.model_version or "unknown")
-    model_hash = _compute_model_hash(model_config=model_config, config_snapshot=config_snapshot)
+    model_hash, model_hash_cached = _resolve_model_hash(model_config=model_config, config_snapshot=config_snapshot)
+    environment_snapshot, environment_fingerprint = get_environment_snapshot()
 
     payload: dict[str, Any] = {
         "app_version": APP_VERSION,
@@ -476,8 +1249,10 @@ def _build_manifest_payload(
         "device": analysis_result.device,
         "timestamp": timestamp,
         "model_hash": model_hash,
+        "model_hash_cached": model_hash_cached,
         "config_snapshot": config_snapshot,
-        "environment_snapshot": _build_environment_snapshot(),
+        "environment_snapshot": environment_snapshot,
+        "environment_fingerprint": environment_fingerprint,
         "extensions": [entry.to_manifest() for entry in extension_telemetry],
         "run_state": run_state.value,
         "input_path": str(input_path),
@@ -487,12 +1262,48 @@ def _build_manifest_payload(
             "overlay_path": analysis_result.overlay_path,
             "results_json_path": analysis_result.results_json_path,
         },
+        "result_cache": dict(result_cache or {"status": "disabled"}),
     }
+    if extension_context is not None:
+        payload["extension_context"] = extension_context
+    if artifact_stats is not None:
+        payload["artifact_stats"] = artifact_stats
+    if input_decode is not None:
+        payload["input_decode"] = input_decode
+    if segmentation_batch is not None:
+        payload["segmentation_batch"] = segmentation_batch
 
     payload["manifest_sha256"] = _canonical_payload_sha256(payload)
     return payload
 
 
+def get_environment_snapshot() -> tuple[dict[str, Any], str]:
+    """Return ``(snapshot, fingerprint)``, computed once per process.
+
+    Package metadata lookups and the torch import can be slow, so the snapshot
+    is memoized; call :func:`refresh_environment_snapshot` after changing the
+    environment in-process. The fingerprint is the SHA-256 of the canonical
+    snapshot JSON.
+    """
+
+    global _ENVIRONMENT
+    with _ENVIRONMENT_LOCK:
+        if _ENVIRONMENT is None:
+            snapshot = _build_environment_snapshot()
+            _ENVIRONMENT = (snapshot, _canonical_payload_sha256(snapshot))
+        snapshot, fingerprint = _ENVIRONMENT
+    return _deepcopy_jsonable(snapshot), fingerprint
+
+
+def refresh_environment_snapshot() -> tuple[dict[str, Any], str]:
+    """Drop the memoized environment snapshot and rebuild it."""
+
+    global _ENVIRONMENT
+    with _ENVIRONMENT_LOCK:
+        _ENVIRONMENT = None
+    return get_environment_snapshot()
+
+
 def _build_environment_snapshot() -> dict[str, Any]:
     packages = {
         "numpy": _safe_package_version("numpy"),
@@ -537,29 +1348,32 @@ def _safe_package_version(name: str) -> str | None:
 
 
 def _compute_model_hash(model_config: dict[str, Any], config_snapshot: dict[str, Any]) -> str:
+    return _resolve_model_hash(model_config=model_config, config_snapshot=config_snapshot)[0]
+
+
+def _resolve_model_hash(model_config: dict[str, Any], config_snapshot: dict[str, Any]) -> tuple[str, bool]:
+    """Return ``(model_hash, was_cached)``.
+
+    Checkpoint digests come from the persistent hash sidecar, so the checkpoint
+    is only re-read after it changes on disk.
+    """
+
     explicit_hash = config_snapshot.get("model_hash") or model_config.get("model_hash")
     if explicit_hash:
-        return str(explicit_hash)
+        return str(explicit_hash), False
 
     model_folder = str(model_config.get("model_folder", "")).strip()
     checkpoint_name = str(model_config.get("checkpoint_name", "")).strip()
     if model_folder and checkpoint_name:
         checkpoint_path = Path(model_folder).expanduser().resolve() / checkpoint_name
         if checkpoint_path.exists() and checkpoint_path.is_file():
-            return _sha256_file(checkpoint_path)
+            return cached_sha256_file(checkpoint_path)
 
-    return _canonical_payload_sha256(model_config)
+    return _canonical_payload_sha256(model_config), False
 
 
 def _sha256_file(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as handle:
-        while True:
-            chunk = handle.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
-    return digest.hexdigest()
+    return sha256_file(path)
 
 
 def _canonical_payload_sha256(payload: dict[str, Any]) -> str:
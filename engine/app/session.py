@@ -0,0 +1,289 @@
+"""Long-lived analysis sessions for multi-image workloads."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, Callable
+
+from engine.app.analysis_types import AnalysisResult, ExtensionTelemetry
+from engine.app.frame_sources import FrameRejected, FrameSourceSettings, FrameSummary, run_frame_source
+from engine.app.pipeline import PipelineSettings, run_staged_pipeline
+from engine.app.preprocessing import LoadedImage, LoaderSettings, QualityGateSettings, load_image
+from engine.app.result_cache import ResultCache
+from engine.app.runtime import (
+    RunPlan,
+    RuntimeOutput,
+    RuntimeResources,
+    begin_run,
+    fail_run,
+    finalize_batch,
+    load_runtime_resources,
+    run_runtime,
+    segment_batch,
+)
+from engine.app.version import ENGINE_VERSION
+
+
+class AnalysisSession:
+    """Keep the segmentation predictor and extensions loaded across many inputs.
+
+    Each call to :meth:`analyze` behaves like ``run_analysis`` but reuses the
+    same ``IrisSegmentationEngine`` and extension instances, so checkpoint
+    loading happens once per session instead of once per image. With
+    ``eager=True`` extension models (e.g. the YOLO detector) are warmed as well;
+    when the result cache is enabled the engine itself is still built on the
+    first cache miss, so a fully cached workload never loads the checkpoint.
+    """
+
+    def __init__(self, device: str = "auto", config: dict[str, Any] | None = None, eager: bool = True) -> None:
+        self.device = device
+        self.config: dict[str, Any] = dict(config or {})
+        self.output_root = Path(self.config.get("output_dir", Path.cwd() / "outputs")).resolve()
+        self.last_extension_telemetry: list[ExtensionTelemetry] = []
+        self.last_frame_summary: dict[str, Any] | None = None
+        self._used_run_names: set[str] = set()
+        self._resources: RuntimeResources | None = load_runtime_resources(device, self.config)
+        self.warmed_extensions: list[str] = []
+        if eager:
+            if ResultCache.from_config(self.config) is None:
+                self._resources.get_engine()
+            self.warmed_extensions = self._resources.warm_up_extensions(self.config)
+
+    def __enter__(self) -> AnalysisSession:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def resources(self) -> RuntimeResources:
+        if self._resources is None:
+            raise RuntimeError("AnalysisSession is closed")
+        return self._resources
+
+    def close(self) -> None:
+        """Release the shared engine, extension instances, and extension workers."""
+
+        if self._resources is not None:
+            self._resources.close()
+        self._resources = None
+
+    def analyze(
+        self,
+        input_path: str | Path,
+        output_dir: str | Path | None = None,
+        stage_callback: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> AnalysisResult:
+        """Analyze one input, writing artifacts to ``output_dir``.
+
+        When ``output_dir`` is omitted, a per-image directory is created below the
+        session ``output_dir`` and named after the input file stem.
+        """
+
+        input_file = Path(input_path)
+        run_dir = Path(output_dir).resolve() if output_dir is not None else self._next_run_dir(input_file)
+        runtime_output = run_runtime(
+            input_path=input_file,
+            device=self.device,
+            config=self._run_config(run_dir),
+            stage_callback=stage_callback,
+            resources=self.resources,
+        )
+        self.last_extension_telemetry = list(runtime_output.extension_telemetry)
+        return runtime_output.analysis_result
+
+    def analyze_many(self, inputs: Iterable[str | Path]) -> Iterator[AnalysisResult]:
+        """Stream one ``AnalysisResult`` per input.
+
+        Inputs are decoded and segmented ``config["session_batch_size"]`` at a
+        time (default 8), so engines with ``infer_batch`` and extensions with
+        ``run_batch`` process each chunk in one call; results are yielded in
+        input order once their chunk is finished.
+
+        A failing input yields a ``status="failed"`` result carrying the error in
+        ``warnings``; its ``session_state.json`` records the failure and the
+        remaining inputs are still processed.
+        """
+
+        batch_size = max(int(self.config.get("session_batch_size", 8) or 1), 1)
+        chunk: list[Path] = []
+        for input_path in inputs:
+            chunk.append(Path(input_path))
+            if len(chunk) >= batch_size:
+                yield from self._analyze_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._analyze_chunk(chunk)
+
+    def analyze_pipelined(
+        self,
+        inputs: Iterable[str | Path],
+        settings: PipelineSettings | None = None,
+    ) -> Iterator[AnalysisResult]:
+        """Stream results like :meth:`analyze_many`, overlapping I/O with inference.
+
+        Decoding, segmentation, and artifact writing run as separate stages (see
+        ``engine.app.pipeline``); widths come from ``config["pipeline"]`` unless
+        ``settings`` is given. Results are yielded in input order.
+        """
+
+        settings = settings or PipelineSettings.from_config(self.config)
+        jobs = (
+            (Path(input_path), self._run_config(self._next_run_dir(Path(input_path))))
+            for input_path in inputs
+        )
+        for input_file, outcome in run_staged_pipeline(jobs, self.resources, settings):
+            if isinstance(outcome, Exception):
+                self.last_extension_telemetry = []
+                yield _failed_result(input_file, self.resources, outcome)
+                continue
+            self.last_extension_telemetry = list(outcome.extension_telemetry)
+            yield outcome.analysis_result
+
+    def analyze_frames(
+        self,
+        input_path: str | Path,
+        settings: FrameSourceSettings | None = None,
+    ) -> Iterator[AnalysisResult]:
+        """Stream one ``AnalysisResult`` per page of a multi-page TIFF or frame of a video.
+
+        Frames are decoded lazily and segmented ``batch_size`` at a time (see
+        ``engine.app.frame_sources``); each gets its own directory (``page_00003``,
+        ``frame_000120``) below the input's run directory. When the stream ends, an
+        aggregate ``frames_summary.json`` is written there and kept in
+        ``last_frame_summary``.
+
+        With ``config["quality_gate"]`` enabled, blurred, badly exposed, or
+        closed-eye frames (and, in best-of mode, all but the sharpest frames of
+        each burst) are skipped before segmentation and yielded with
+        ``status="rejected"`` and the reason in ``warnings``.
+        """
+
+        input_file = Path(input_path)
+        run_dir = self._next_run_dir(input_file)
+        settings = settings or FrameSourceSettings.from_config(self.config)
+        summary = FrameSummary(input_file.resolve())
+        self.last_frame_summary = None
+        outcomes = run_frame_source(
+            input_file,
+            self.resources,
+            lambda frame: self._run_config(run_dir / frame.name),
+            settings,
+            LoaderSettings.from_config(self.config),
+            QualityGateSettings.from_config(self.config),
+        )
+        for frame, outcome in outcomes:
+            summary.add(frame, outcome)
+            if isinstance(outcome, FrameRejected):
+                self.last_extension_telemetry = []
+                yield _failed_result(
+                    input_file,
+                    self.resources,
+                    outcome,
+                    status="rejected",
+                    message=f"Frame {frame.name} rejected by quality gate: {outcome}",
+                )
+                continue
+            if isinstance(outcome, Exception):
+                self.last_extension_telemetry = []
+                yield _failed_result(
+                    input_file,
+                    self.resources,
+                    outcome,
+                    message=f"Analysis of frame {frame.name} failed: {outcome}",
+                )
+                continue
+            self.last_extension_telemetry = list(outcome.extension_telemetry)
+            yield outcome.analysis_result
+        self.last_frame_summary = summary.write(run_dir / "frames_summary.json")
+
+    def _analyze_chunk(self, input_files: list[Path]) -> Iterator[AnalysisResult]:
+        outcomes: dict[int, RuntimeOutput | Exception] = {}
+        decoded: list[tuple[int, RunPlan, LoadedImage]] = []
+        for index, input_file in enumerate(input_files):
+            run_config = self._run_config(self._next_run_dir(input_file))
+            try:
+                plan = begin_run(input_file, run_config)
+            except Exception as exc:
+                outcomes[index] = exc
+                continue
+            try:
+                image = load_image(input_file, LoaderSettings.from_config(run_config))
+            except Exception as exc:
+                fail_run(plan, exc)
+                outcomes[index] = exc
+                continue
+            decoded.append((index, plan, image))
+
+        segmented = segment_batch(
+            [plan for _, plan, _ in decoded],
+            self.resources,
+            [image.segmentation_gray for _, _, image in decoded],
+            mask_shapes=[image.shape for _, _, image in decoded],
+            input_variants=[image.input_variant() for _, _, image in decoded],
+        )
+        ready = []
+        for (index, plan, image), outcome in zip(decoded, segmented):
+            if isinstance(outcome, Exception):
+                fail_run(plan, outcome)
+                outcomes[index] = outcome
+            else:
+                ready.append((index, plan, image, outcome))
+
+        finalized = finalize_batch(
+            [plan for _, plan, _, _ in ready],
+            self.resources,
+            [image for _, _, image, _ in ready],
+            [outcome for _, _, _, outcome in ready],
+        )
+        for (index, _, _, _), output in zip(ready, finalized):
+            outcomes[index] = output
+
+        for index, input_file in enumerate(input_files):
+            outcome = outcomes[index]
+            if isinstance(outcome, Exception):
+                self.last_extension_telemetry = []
+                yield _failed_result(input_file, self.resources, outcome)
+                continue
+            self.last_extension_telemetry = list(outcome.extension_telemetry)
+            yield outcome.analysis_result
+
+    def _run_config(self, run_dir: Path) -> dict[str, Any]:
+        run_config = dict(self.config)
+        run_config["output_dir"] = str(run_dir)
+        # A shared state file would be overwritten by every image of the batch.
+        run_config.pop("state_path", None)
+        return run_config
+
+    def _next_run_dir(self, input_file: Path) -> Path:
+        base = input_file.stem or "input"
+        name = base
+        suffix = 1
+        while name in self._used_run_names:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        self._used_run_names.add(name)
+        return self.output_root / name
+
+
+def _failed_result(
+    input_file: Path,
+    resources: RuntimeResources,
+    exc: Exception,
+    status: str = "failed",
+    message: str | None = None,
+) -> AnalysisResult:
+    return AnalysisResult(
+        status=status,
+        engine_version=ENGINE_VERSION,
+        model_version=str(resources.model_config.get("model_version", "unknown")),
+        input_filename=input_file.name,
+        device=resources.device,
+        mask_path="",
+        overlay_path="",
+        results_json_path="",
+        metrics={},
+        warnings=[message or f"Analysis failed: {exc}"],
+        extensions={},
+    )
@@ -1,13 +1,17 @@
 """Core segmentation/measurement modules for IrisAtlas engine."""
 
 from engine.core.measurements import compute_measurements
-from engine.core.overlay import generate_overlay
+from engine.core.overlay import generate_overlay, render_overlay
+from engine.core.predictor_cache import PREDICTOR_CACHE, PredictorCache
 from engine.core.report import create_pdf_report
 from engine.core.segmentation import IrisSegmentationEngine
 
 __all__ = [
     "IrisSegmentationEngine",
+    "PREDICTOR_CACHE",
+    "PredictorCache",
     "compute_measurements",
     "generate_overlay",
+    "render_overlay",
     "create_pdf_report",
 ]
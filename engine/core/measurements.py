@@ -15,15 +15,33 @@ CLASS_IDS = {
     "scurf": 5,
 }
 
+# bincount widens its input to intp, so large masks are counted in chunks.
+_HISTOGRAM_CHUNK_PIXELS = 1 << 20
 
 
-def compute_measurements(mask: np.ndarray) -> Dict[str, float | int]:
-    """Compute deterministic pixel counts and structural ratios."""
-    pupil_pixels = int(np.sum(mask == CLASS_IDS["pupil"]))
-    iris_pixels = int(np.sum(mask == CLASS_IDS["iris"]))
-    collarette_pixels = int(np.sum(mask == CLASS_IDS["collarette"]))
-    furrow_pixels = int(np.sum(mask == CLASS_IDS["furrow"]))
-    scurf_pixels = int(np.sum(mask == CLASS_IDS["scurf"]))
+def label_histogram(mask: np.ndarray) -> np.ndarray:
+    """Count every uint8 label (background included) in one pass over ``mask``.
+
+    Returns an int64 array of length 256 indexed by label value.
+    """
+    flat = np.asarray(mask, dtype=np.uint8).reshape(-1)
+    counts = np.zeros(256, dtype=np.int64)
+    for start in range(0, flat.size, _HISTOGRAM_CHUNK_PIXELS):
+        counts += np.bincount(flat[start : start + _HISTOGRAM_CHUNK_PIXELS], minlength=256)
+    return counts
+
+
+def compute_measurements(mask: np.ndarray, label_counts: np.ndarray | None = None) -> Dict[str, float | int]:
+    """Compute deterministic pixel counts and structural ratios.
+
+    ``label_counts`` may be a precomputed :func:`label_histogram` of ``mask``.
+    """
+    counts = label_histogram(mask) if label_counts is None else label_counts
+    pupil_pixels = int(counts[CLASS_IDS["pupil"]])
+    iris_pixels = int(counts[CLASS_IDS["iris"]])
+    collarette_pixels = int(counts[CLASS_IDS["collarette"]])
+    furrow_pixels = int(counts[CLASS_IDS["furrow"]])
+    scurf_pixels = int(counts[CLASS_IDS["scurf"]])
 
     if iris_pixels <= 0:
         raise ValueError("iris_pixels is zero; cannot compute ratios")
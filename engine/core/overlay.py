@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 import cv2
 import numpy as np
@@ -16,14 +17,70 @@ def generate_overlay(
     class_colors: Dict[str, List[int]],
     alpha: float,
     output_path: str | Path,
+    out: np.ndarray | None = None,
+    write_params: Sequence[int] | None = None,
 ) -> Path:
-    """Blend class-colored mask on top of original image and write PNG."""
+    """Blend class-colored mask on top of original image and write it.
+
+    ``out`` may be a reusable buffer shaped like ``original_bgr``; the format
+    follows the ``output_path`` suffix with optional ``cv2.imwrite`` params.
+    """
+    blended = render_overlay(original_bgr, mask, class_colors, alpha, out=out)
+    path = Path(output_path)
+    cv2.imwrite(str(path), blended, list(write_params or []))
+    return path
+
+
+def render_overlay(
+    original_bgr: np.ndarray,
+    mask: np.ndarray,
+    class_colors: Dict[str, List[int]],
+    alpha: float,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Return ``addWeighted(original, 1 - alpha, colorized mask, alpha)``.
+
+    The colorized mask comes from one pass through a 256-entry palette lookup
+    table instead of one boolean mask per class. Every pixel still goes through
+    ``addWeighted`` (unlabeled pixels are scaled by ``1 - alpha``), so the output
+    is byte-identical to the per-class renderer. ``out`` is reused when it
+    matches ``original_bgr``.
+    """
+    if original_bgr.dtype != np.uint8 or original_bgr.ndim != 3 or mask.shape != original_bgr.shape[:2]:
+        return _render_overlay_dense(original_bgr, mask, class_colors, alpha)
+
+    colors = tuple((int(class_id), tuple(np.array(bgr, dtype=np.uint8).tolist())) for class_id, bgr in class_colors.items())
+    palette = _palette_channels(colors, original_bgr.shape[2])
+    labels = np.asarray(mask, dtype=np.uint8)
+    overlay = cv2.merge([cv2.LUT(labels, channel) for channel in palette])
+
+    if out is None or out.shape != original_bgr.shape or out.dtype != np.uint8:
+        out = np.empty_like(original_bgr)
+    return cv2.addWeighted(original_bgr, 1.0 - alpha, overlay, alpha, 0.0, dst=out)
+
+
+@lru_cache(maxsize=16)
+def _palette_channels(colors: tuple[tuple[int, tuple[int, ...]], ...], channels: int) -> tuple[np.ndarray, ...]:
+    palette = np.zeros((256, channels), dtype=np.uint8)
+    # Later entries win, matching assignment order in the per-class renderer.
+    for class_id, bgr in colors:
+        if 0 <= class_id < 256:
+            palette[class_id] = bgr
+    tables = tuple(np.ascontiguousarray(palette[:, channel]) for channel in range(channels))
+    for table in tables:
+        table.setflags(write=False)
+    return tables
+
+
+def _render_overlay_dense(
+    original_bgr: np.ndarray,
+    mask: np.ndarray,
+    class_colors: Dict[str, List[int]],
+    alpha: float,
+) -> np.ndarray:
     overlay = np.zeros_like(original_bgr)
 
     for class_id, bgr in class_colors.items():
         overlay[mask == int(class_id)] = np.array(bgr, dtype=np.uint8)
 
-    blended = cv2.addWeighted(original_bgr, 1.0 - alpha, overlay, alpha, 0.0)
-    out = Path(output_path)
-    cv2.imwrite(str(out), blended)
-    return out
+    return cv2.addWeighted(original_bgr, 1.0 - alpha, overlay, alpha, 0.0)
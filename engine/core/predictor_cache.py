@@ -0,0 +1,193 @@
+"""Process-wide LRU cache of initialized nnU-Net predictors."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class PredictorKey:
+    """Identity of an initialized predictor.
+
+    Two engines share a predictor only if they resolve to the same model folder,
+    checkpoint bytes, folds, device, and sliding-window step.
+    """
+
+    model_folder: str
+    checkpoint_name: str
+    folds: tuple[str, ...]
+    device: str
+    tile_step_size: float
+    checkpoint_sha256: str | None
+
+
+@dataclass
+class _CacheEntry:
+    predictor: Any
+    size_bytes: int
+
+
+class PredictorCache:
+    """Bounded LRU cache with explicit eviction and memory accounting.
+
+    Entries are evicted least-recently-used first whenever ``max_entries`` or
+    ``max_bytes`` is exceeded. The most recently loaded predictor is always kept,
+    even if it alone exceeds ``max_bytes``. Predictors load under a per-key
+    lock, so building one predictor never blocks hits on, or loads of, another.
+    """
+
+    def __init__(self, max_entries: int = 2, max_bytes: int | None = None) -> None:
+        self._entries: OrderedDict[PredictorKey, _CacheEntry] = OrderedDict()
+        self._loading: dict[PredictorKey, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._max_entries = max(int(max_entries), 1)
+        self._max_bytes = int(max_bytes) if max_bytes is not None else None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def configure(self, max_entries: int | None = None, max_bytes: int | None = None) -> None:
+        """Update the given capacity limits and evict immediately if they are now exceeded.
+
+        Limits left as ``None`` keep their current value.
+        """
+
+        with self._lock:
+            if max_entries is not None:
+                self._max_entries = max(int(max_entries), 1)
+            if max_bytes is not None:
+                self._max_bytes = int(max_bytes)
+            self._enforce_limits()
+
+    def get_or_load(self, key: PredictorKey, loader: Callable[[], Any]) -> Any:
+        """Return the cached predictor for ``key`` or load and insert it."""
+
+        with self._lock:
+            predictor = self._lookup(key)
+            if predictor is not None:
+                return predictor
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                predictor = self._lookup(key)
+                if predictor is not None:
+                    # Another thread finished loading while this one waited.
+                    return predictor
+                self._misses += 1
+            try:
+                predictor = loader()
+                size_bytes = estimate_predictor_bytes(predictor)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self._entries[key] = _CacheEntry(predictor=predictor, size_bytes=size_bytes)
+                self._loading.pop(key, None)
+                self._enforce_limits()
+            return predictor
+
+    def evict(self, key: PredictorKey) -> bool:
+        """Drop one predictor. Returns ``True`` if it was cached."""
+
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self._evictions += 1
+            return True
+
+    def clear(self) -> None:
+        """Drop every cached predictor."""
+
+        with self._lock:
+            self._evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and per-entry memory accounting."""
+
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "total_bytes": sum(entry.size_bytes for entry in self._entries.values()),
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "keys": [
+                    {
+                        "model_folder": key.model_folder,
+                        "checkpoint_name": key.checkpoint_name,
+                        "folds": list(key.folds),
+                        "device": key.device,
+                        "tile_step_size": key.tile_step_size,
+                        "checkpoint_sha256": key.checkpoint_sha256,
+                        "size_bytes": entry.size_bytes,
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def _lookup(self, key: PredictorKey) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.predictor
+
+    def _enforce_limits(self) -> None:
+        while len(self._entries) > self._max_entries:
+            self._evict_oldest()
+        if self._max_bytes is None:
+            return
+        while len(self._entries) > 1 and sum(entry.size_bytes for entry in self._entries.values()) > self._max_bytes:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        self._entries.popitem(last=False)
+        self._evictions += 1
+
+
+def estimate_predictor_bytes(predictor: Any) -> int:
+    """Best-effort byte count of tensors held by an nnU-Net predictor.
+
+    Counts the per-fold parameter dictionaries kept by ``nnUNetPredictor`` plus
+    the live network parameters and buffers.
+    """
+
+    total = 0
+    for state in getattr(predictor, "list_of_parameters", None) or []:
+        if isinstance(state, dict):
+            total += sum(_tensor_bytes(value) for value in state.values())
+
+    network = getattr(predictor, "network", None)
+    for attribute in ("parameters", "buffers"):
+        iterator = getattr(network, attribute, None)
+        if callable(iterator):
+            try:
+                total += sum(_tensor_bytes(value) for value in iterator())
+            except Exception:
+                continue
+    return int(total)
+
+
+def _tensor_bytes(value: Any) -> int:
+    numel = getattr(value, "numel", None)
+    element_size = getattr(value, "element_size", None)
+    if callable(numel) and callable(element_size):
+        return int(numel()) * int(element_size())
+    nbytes = getattr(value, "nbytes", None)
+    return int(nbytes) if isinstance(nbytes, int) else 0
+
+
+PREDICTOR_CACHE = PredictorCache()
@@ -2,13 +2,20 @@
 
 from __future__ import annotations
 
+import contextlib
+import hashlib
 import os
+import time
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any, Dict
 
 import cv2
 import numpy as np
 
+from engine.core.predictor_cache import PREDICTOR_CACHE, PredictorKey
+from engine.utils.file_utils import cached_sha256_file
+
 
 CANONICAL_CLASS_LABELS = {
     "background": 0,
@@ -30,6 +37,7 @@ class IrisSegmentationEngine:
         self._set_deterministic()
         self._validate_canonical_class_map()
         self._predictor = self._load_predictor()
+        self.last_batch_stats: Dict[str, Any] = {}
 
     @staticmethod
     def _set_deterministic() -> None:
@@ -59,9 +67,15 @@ class IrisSegmentationEngine:
             )
 
     def _load_predictor(self):
-        """Instantiate an nnU-Net predictor once per process."""
+        """Return an initialized nnU-Net predictor, shared process-wide.
+
+        Predictors are kept in ``PREDICTOR_CACHE`` keyed by resolved model folder,
+        checkpoint name and digest, folds, device, and tile step size, so repeated
+        engine construction reuses the loaded weights. Set
+        ``model_config["cache_predictor"] = false`` to force a private instance.
+        """
         try:
-            import torch
+            import torch  # noqa: F401
         except Exception as exc:
             raise ImportError("torch is required for segmentation inference.") from exc
 
@@ -69,12 +83,22 @@ class IrisSegmentationEngine:
         model_folder = self._validate_model_folder()
 
         try:
-            from nnunetv2.inference.predict_from_raw_data import nnUNetPredictor
+            from nnunetv2.inference.predict_from_raw_data import nnUNetPredictor  # noqa: F401
         except ImportError as exc:
             raise ImportError(
                 "nnunetv2 is required for segmentation inference. Install from requirements.txt"
             ) from exc
 
+        if not bool(self.model_config.get("cache_predictor", True)):
+            return self._build_predictor(model_folder)
+
+        key = self._predictor_cache_key(model_folder)
+        return PREDICTOR_CACHE.get_or_load(key, lambda: self._build_predictor(model_folder))
+
+    def _build_predictor(self, model_folder: Path):
+        import torch
+        from nnunetv2.inference.predict_from_raw_data import nnUNetPredictor
+
         predictor = nnUNetPredictor(
             tile_step_size=self.model_config.get("tile_step_size", 0.5),
             use_gaussian=True,
@@ -95,6 +119,33 @@ class IrisSegmentationEngine:
         )
         return predictor
 
+    def _predictor_cache_key(self, model_folder: Path) -> PredictorKey:
+        checkpoint_name = str(self.model_config.get("checkpoint_name", "checkpoint_final.pth"))
+        folds = tuple(str(fold) for fold in self.model_config.get("folds", [0]))
+        return PredictorKey(
+            model_folder=str(model_folder.resolve()),
+            checkpoint_name=checkpoint_name,
+            folds=folds,
+            device=str(self.device),
+            tile_step_size=float(self.model_config.get("tile_step_size", 0.5)),
+            checkpoint_sha256=self._checkpoint_digest(model_folder, checkpoint_name, folds),
+        )
+
+    @staticmethod
+    def _checkpoint_digest(model_folder: Path, checkpoint_name: str, folds: tuple[str, ...]) -> str | None:
+        """Digest of every checkpoint the predictor would load (nnU-Net ``fold_*`` layout)."""
+        candidates = [model_folder / f"fold_{fold}" / checkpoint_name for fold in folds]
+        checkpoints = [path for path in candidates if path.is_file()]
+        if not checkpoints and (model_folder / checkpoint_name).is_file():
+            checkpoints = [model_folder / checkpoint_name]
+        if not checkpoints:
+            return None
+        digests = [cached_sha256_file(path)[0] for path in checkpoints]
+        if len(digests) == 1:
+            return digests[0]
+        combined = ":".join(digests)
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+
     @staticmethod
     def _engine_root() -> Path:
         return Path(__file__).resolve().parents[1]
@@ -137,14 +188,7 @@ class IrisSegmentationEngine:
 
     def infer(self, gray_image: np.ndarray) -> np.ndarray:
         """Run segmentation inference and return labels [0..5] as uint8 mask."""
-        resized = cv2.resize(
-            gray_image,
-            tuple(self.model_config.get("input_size", [256, 256])),
-            interpolation=cv2.INTER_AREA,
-        )
-
-        image_float = resized.astype(np.float32) / 255.0
-        image_4d = image_float[None, None, ...]
+        image_4d = self._prepare_input(gray_image)
 
         segmentation = self._predictor.predict_single_npy_array(
             input_image=image_4d,
@@ -154,13 +198,83 @@ class IrisSegmentationEngine:
             save_or_return_probabilities=False,
         )
 
+        return self._finalize_mask(segmentation, gray_image.shape)
+
+    def infer_batch(
+        self,
+        gray_images: Sequence[np.ndarray],
+        batch_size: int | None = None,
+    ) -> list[np.ndarray]:
+        """Segment many grayscale images, running the network in micro-batches.
+
+        Returns one mask per input, identical to calling :meth:`infer` on each
+        image. By default this is not a stacked forward: each image still goes
+        through ``predict_single_npy_array`` one at a time. Only with
+        ``model_config["batched_forward"] = true`` and a single-fold 2D network
+        whose patch size equals ``input_size`` are preprocessed inputs stacked
+        into one tensor per micro-batch and passed through the network in a
+        single forward call.
+
+        Throughput of the last call (``mode`` and ``images_per_second``) is
+        stored in ``last_batch_stats``; the runtime copies it into each
+        manifest as ``segmentation_batch``.
+        """
+        start = time.perf_counter()
+        size = max(int(batch_size or self.model_config.get("inference_batch_size", 8)), 1)
+        direct = self._supports_batched_forward()
+
+        masks: list[np.ndarray] = []
+        batches = 0
+        for offset in range(0, len(gray_images), size):
+            chunk = list(gray_images[offset : offset + size])
+            stacked = np.stack([self._prepare_input(gray) for gray in chunk])
+            if direct:
+                segmentations = self._predict_stacked(stacked)
+            else:
+                segmentations = [
+                    self._predictor.predict_single_npy_array(
+                        input_image=image_4d,
+                        image_properties={"spacing": np.array([1.0, 1.0, 1.0])},
+                        segmentation_previous_stage=None,
+                        output_file_truncated=None,
+                        save_or_return_probabilities=False,
+                    )
+                    for image_4d in stacked
+                ]
+            masks.extend(
+                self._finalize_mask(segmentation, gray.shape) for segmentation, gray in zip(segmentations, chunk)
+            )
+            batches += 1
+
+        seconds = time.perf_counter() - start
+        self.last_batch_stats = {
+            "images": len(masks),
+            "batches": batches,
+            "batch_size": size,
+            "mode": "batched_forward" if direct else "per_image",
+            "seconds": round(seconds, 6),
+            "images_per_second": round(len(masks) / seconds, 3) if seconds > 0 else None,
+        }
+        return masks
+
+    def _prepare_input(self, gray_image: np.ndarray) -> np.ndarray:
+        resized = cv2.resize(
+            gray_image,
+            tuple(self.model_config.get("input_size", [256, 256])),
+            interpolation=cv2.INTER_AREA,
+        )
+
+        image_float = resized.astype(np.float32) / 255.0
+        return image_float[None, None, ...]
+
+    def _finalize_mask(self, segmentation: Any, shape: tuple[int, ...]) -> np.ndarray:
         if isinstance(segmentation, tuple):
             segmentation = segmentation[0]
 
         mask = np.asarray(segmentation, dtype=np.uint8)
         mask = cv2.resize(
             mask,
-            (gray_image.shape[1], gray_image.shape[0]),
+            (shape[1], shape[0]),
             interpolation=cv2.INTER_NEAREST,
         )
 
@@ -171,3 +285,106 @@ class IrisSegmentationEngine:
             raise ValueError("Unexpected labels found in segmentation output")
 
         return mask
+
+    def _supports_batched_forward(self) -> bool:
+        """Whether one forward call per micro-batch reproduces nnU-Net's per-image output.
+
+        Opt-in via ``model_config["batched_forward"]``. Requires a single fold (no
+        fold ensembling), no test-time mirroring, and a patch size equal to
+        ``input_size`` so the sliding window is a single tile.
+        """
+        if not bool(self.model_config.get("batched_forward", False)):
+            return False
+        predictor = self._predictor
+        parameters = getattr(predictor, "list_of_parameters", None)
+        configuration = getattr(predictor, "configuration_manager", None)
+        if getattr(predictor, "network", None) is None or configuration is None:
+            return False
+        if not parameters or len(parameters) != 1 or getattr(predictor, "use_mirroring", False):
+            return False
+        patch_size = [int(v) for v in getattr(configuration, "patch_size", [])]
+        input_w, input_h = [int(v) for v in self.model_config.get("input_size", [256, 256])]
+        return patch_size == [input_h, input_w]
+
+    def _predict_stacked(self, stacked: np.ndarray) -> list[np.ndarray]:
+        """Run nnU-Net preprocessing per image and one network forward per shape group.
+
+        Mirrors ``predict_single_npy_array`` for the single-tile case: identical
+        preprocessing, ``pad_nd_image`` padding to the patch size, Gaussian tile
+        weighting accumulated in half precision, and the same logits-to-segmentation
+        export. ``crop_to_nonzero`` can shrink cases by different amounts, so cases
+        are grouped by padded shape; a group that needs more than one tile goes
+        through the predictor's own sliding window.
+        """
+        import torch
+        from acvl_utils.cropping_and_padding.padding import pad_nd_image
+        from nnunetv2.inference.export_prediction import convert_predicted_logits_to_segmentation_with_correct_shape
+        from nnunetv2.inference.sliding_window_prediction import compute_gaussian
+
+        predictor = self._predictor
+        configuration = predictor.configuration_manager
+        patch_size = [int(v) for v in configuration.patch_size]
+        if not getattr(self, "_batched_parameters_loaded", False):
+            predictor.network.load_state_dict(predictor.list_of_parameters[0])
+            self._batched_parameters_loaded = True
+
+        preprocessor = configuration.preprocessor_class(verbose=False)
+        cases = [
+            preprocessor.run_case_npy(
+                image_4d,
+                None,
+                {"spacing": np.array([1.0, 1.0, 1.0])},
+                predictor.plans_manager,
+                configuration,
+                predictor.dataset_json,
+            )
+            for image_4d in stacked
+        ]
+
+        padded = [
+            pad_nd_image(torch.from_numpy(case[0]), patch_size, "constant", {"value": 0}, True, None)
+            for case in cases
+        ]
+        groups: dict[tuple[int, ...], list[int]] = {}
+        for index, (data, _) in enumerate(padded):
+            groups.setdefault(tuple(data.shape[2:]), []).append(index)
+
+        device = predictor.device
+        gaussian = compute_gaussian(
+            tuple(patch_size), sigma_scale=1.0 / 8, value_scaling_factor=10, device=device
+        ).half()
+        autocast = torch.autocast(device.type, enabled=True) if device.type == "cuda" else contextlib.nullcontext()
+
+        case_logits: list[Any] = [None] * len(cases)
+        predictor.network.eval()
+        for shape, indices in groups.items():
+            if list(shape) != patch_size:
+                for index in indices:
+                    case_logits[index] = predictor.predict_logits_from_preprocessed_data(
+                        torch.from_numpy(cases[index][0])
+                    ).cpu()
+                continue
+
+            data = torch.stack([padded[index][0][:, 0] for index in indices]).to(device)
+            with torch.no_grad(), autocast:
+                logits = predictor.network(data)
+            for row, index in enumerate(indices):
+                weighted = torch.zeros((logits.shape[1], 1, *logits.shape[2:]), dtype=torch.half, device=device)
+                weights = torch.zeros((1, *logits.shape[2:]), dtype=torch.half, device=device)
+                weighted[:, 0] += logits[row] * gaussian
+                weights[0] += gaussian
+                torch.div(weighted, weights, out=weighted)
+                revert_padding = padded[index][1]
+                case_logits[index] = weighted[(slice(None), *revert_padding[1:])].cpu()
+
+        return [
+            convert_predicted_logits_to_segmentation_with_correct_shape(
+                logits,
+                predictor.plans_manager,
+                configuration,
+                predictor.label_manager,
+                case[2],
+                return_probabilities=False,
+            )
+            for logits, case in zip(case_logits, cases)
+        ]
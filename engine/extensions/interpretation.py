@@ -32,7 +32,7 @@ class InterpretationExtension:
     name = "interpretation"
     version = "1"
     requires: list[str] = []
-    optional_requires: list[str] = ["micro_features", "sector_mapping"]
+    optional_requires: list[str] = ["micro_features"]
 
     def run(self, context: ExtensionContext) -> ExtensionResult:
         cfg = context.config.get("extensions", {}).get(self.name, {})
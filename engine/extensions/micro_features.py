@@ -2,12 +2,130 @@
 
 from __future__ import annotations
 
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+import cv2
 import numpy as np
 
 from engine.app.analysis_types import ExtensionContext, ExtensionResult, ExtensionStatus
+from engine.utils.file_utils import cached_sha256_file
+
+
+class _SerializedModel:
+    """Loaded detector whose ``predict`` calls are serialized by a per-model lock.
+
+    Ultralytics predictors keep per-call state on the model, so a cached model
+    shared by extension worker threads must not run two ``predict`` calls at once.
+    """
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+        self._predict_lock = threading.Lock()
+
+    def predict(self, *args: Any, **kwargs: Any) -> Any:
+        with self._predict_lock:
+            return self.model.predict(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class YoloModelCache:
+    """Per-process LRU cache of loaded YOLO detectors.
+
+    Keys combine the resolved weights path, its size/mtime, content SHA-256, and
+    the device, so replacing the weights file or switching devices loads a new
+    model while repeated images reuse the fused one. Weights load under a
+    per-key lock, so loading one model never blocks hits on another, and
+    ``predict`` on a cached model is serialized across threads.
+    """
+
+    def __init__(self, max_entries: int = 2) -> None:
+        self._entries: OrderedDict[tuple[str, int, int, str, str], _SerializedModel] = OrderedDict()
+        self._loading: dict[tuple[str, int, int, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._max_entries = max(int(max_entries), 1)
+
+    def get_or_load(self, weights: Path, device: str, loader: Callable[[str], Any]) -> tuple[Any, bool]:
+        """Return ``(model, was_cached)`` for ``weights`` on ``device``."""
+
+        key = self.key_for(weights, device)
+        with self._lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model, True
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                model = self._lookup(key)
+                if model is not None:
+                    # Another thread finished loading while this one waited.
+                    return model, True
+            try:
+                model = _SerializedModel(loader(key[0]))
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self._entries[key] = model
+                self._loading.pop(key, None)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            return model, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _lookup(self, key: tuple[str, int, int, str, str]) -> _SerializedModel | None:
+        model = self._entries.get(key)
+        if model is not None:
+            self._entries.move_to_end(key)
+        return model
+
+    @staticmethod
+    def key_for(weights: Path, device: str) -> tuple[str, int, int, str, str]:
+        resolved = weights.expanduser().resolve()
+        stat = resolved.stat()
+        digest, _ = cached_sha256_file(resolved)
+        return str(resolved), int(stat.st_size), int(stat.st_mtime_ns), digest, str(device)
+
+
+YOLO_MODEL_CACHE = YoloModelCache()
+
+
+@dataclass(frozen=True)
+class _PreparedCrop:
+    """Iris bounding-box crop plus everything needed to map detections back."""
+
+    cfg: Mapping[str, Any]
+    weights: Path
+    iris_mask: np.ndarray
+    crop_gray: np.ndarray
+    crop_iris: np.ndarray
+    x_min: int
+    y_min: int
+    image_shape: tuple[int, ...]
+    predict_kwargs: dict[str, Any]
+
+
+def _load_yolo(weights_path: str) -> Any:
+    from ultralytics import YOLO  # type: ignore[import-not-found]
+
+    return YOLO(weights_path)
 
 
 class MicroFeaturesExtension:
@@ -18,7 +136,111 @@ class MicroFeaturesExtension:
     requires: list[str] = []
     optional_requires: list[str] = []
 
+    def warm_up(self, config: Mapping[str, Any], device: str) -> bool:
+        """Load the configured detector into ``YOLO_MODEL_CACHE`` ahead of the first image.
+
+        Returns ``True`` when a model is cached; missing weights or ultralytics are
+        left for :meth:`run` to report.
+        """
+
+        cfg = config.get("extensions", {}).get(self.name, {})
+        weights_path = str(cfg.get("weights_path", "")).strip()
+        if not bool(cfg.get("enabled", True)) or not weights_path:
+            return False
+        weights = Path(weights_path).expanduser()
+        if not weights.exists():
+            return False
+        try:
+            YOLO_MODEL_CACHE.get_or_load(weights, device, _load_yolo)
+        except Exception:
+            return False
+        return True
+
     def run(self, context: ExtensionContext) -> ExtensionResult:
+        prepared = self._prepare(context)
+        if isinstance(prepared, ExtensionResult):
+            return prepared
+
+        load_start = time.perf_counter()
+        try:
+            model, _ = YOLO_MODEL_CACHE.get_or_load(prepared.weights, context.device, _load_yolo)
+        except ImportError as exc:
+            return _ultralytics_missing(exc)
+        load_ms = (time.perf_counter() - load_start) * 1000.0
+
+        predict_start = time.perf_counter()
+        result = model.predict(source=prepared.crop_gray, **prepared.predict_kwargs)[0]
+        predict_ms = (time.perf_counter() - predict_start) * 1000.0
+        # A cache hit shows up as a near-zero model_load.
+        return self._build_result(prepared, result, {"model_load": load_ms, "predict": predict_ms})
+
+    def run_batch(self, contexts: Sequence[ExtensionContext]) -> list[ExtensionResult]:
+        """Detect micro features for many images, batching crops through the detector.
+
+        Results are returned in ``contexts`` order and match :meth:`run` per image.
+        Ultralytics letterboxes a single image to the smallest stride-aligned
+        rectangle but a mixed-shape batch to the full ``imgsz`` square, which
+        would change detections. PyTorch weights therefore get each crop
+        padded to its own single-image letterbox here, and crops whose
+        letterboxes match share a ``predict`` call; other weights share a call
+        only when crop shapes match. ``batch_size`` in the extension config
+        bounds each call (default 8).
+        """
+
+        results: list[ExtensionResult | None] = [None] * len(contexts)
+        groups: dict[tuple[Any, ...], list[tuple[int, _PreparedCrop]]] = {}
+        for index, context in enumerate(contexts):
+            prepared = self._prepare(context)
+            if isinstance(prepared, ExtensionResult):
+                results[index] = prepared
+                continue
+            group_key = (
+                str(prepared.weights),
+                context.device,
+                tuple(sorted(prepared.predict_kwargs.items())),
+            )
+            groups.setdefault(group_key, []).append((index, prepared))
+
+        for members in groups.values():
+            first = members[0][1]
+            load_start = time.perf_counter()
+            try:
+                model, _ = YOLO_MODEL_CACHE.get_or_load(first.weights, first.predict_kwargs["device"], _load_yolo)
+            except ImportError as exc:
+                for index, _ in members:
+                    results[index] = _ultralytics_missing(exc)
+                continue
+            load_ms = (time.perf_counter() - load_start) * 1000.0
+
+            shapes: dict[tuple[int, ...], list[tuple[int, _PreparedCrop, _Letterbox | None]]] = {}
+            if first.weights.suffix.lower() == ".pt":
+                stride = _model_stride(model)
+                size = _letterbox_size(first.predict_kwargs["imgsz"], stride)
+                for index, prepared in members:
+                    letterbox = _letterbox(prepared.crop_gray, size, stride)
+                    shapes.setdefault(letterbox.image.shape, []).append((index, prepared, letterbox))
+            else:
+                for index, prepared in members:
+                    shapes.setdefault(prepared.crop_gray.shape, []).append((index, prepared, None))
+
+            batch_size = max(int(first.cfg.get("batch_size", 8)), 1)
+            for same_shape in shapes.values():
+                for offset in range(0, len(same_shape), batch_size):
+                    chunk = same_shape[offset : offset + batch_size]
+                    sources = [prepared.crop_gray if box is None else box.image for _, prepared, box in chunk]
+                    predict_start = time.perf_counter()
+                    outputs = model.predict(source=sources, **first.predict_kwargs)
+                    predict_ms = (time.perf_counter() - predict_start) * 1000.0
+                    timings = {"model_load": load_ms, "predict": predict_ms / len(chunk)}
+                    for (index, prepared, letterbox), output in zip(chunk, outputs, strict=True):
+                        results[index] = self._build_result(prepared, output, timings, letterbox)
+                    # The load is charged to the first chunk only.
+                    load_ms = 0.0
+
+        assert all(result is not None for result in results), "micro_features run_batch left a context without a result"
+        return results
+
+    def _prepare(self, context: ExtensionContext) -> _PreparedCrop | ExtensionResult:
         cfg = (
             context.config.get("extensions", {})
             .get(self.name, {})
@@ -53,17 +275,34 @@ class MicroFeaturesExtension:
         x_min = int(np.min(iris_points[1]))
         x_max = int(np.max(iris_points[1])) + 1
 
-        crop_gray = context.grayscale_image[y_min:y_max, x_min:x_max]
-        crop_iris = iris_mask[y_min:y_max, x_min:x_max]
-
-        try:
-            from ultralytics import YOLO  # type: ignore[import-not-found]
-        except Exception as exc:
-            return ExtensionResult(
-                status=ExtensionStatus.FAILED,
-                warning=f"ultralytics not available for micro_features: {exc}",
-            )
+        return _PreparedCrop(
+            cfg=cfg,
+            weights=weights,
+            iris_mask=iris_mask,
+            crop_gray=context.grayscale_image[y_min:y_max, x_min:x_max],
+            crop_iris=iris_mask[y_min:y_max, x_min:x_max],
+            x_min=x_min,
+            y_min=y_min,
+            image_shape=context.grayscale_image.shape[:2],
+            predict_kwargs={
+                "verbose": False,
+                "conf": float(cfg.get("confidence_threshold", 0.25)),
+                "iou": float(cfg.get("iou_threshold", 0.45)),
+                "imgsz": int(cfg.get("imgsz", 640)),
+                "augment": False,
+                "device": context.device,
+            },
+        )
 
+    def _build_result(
+        self,
+        prepared: _PreparedCrop,
+        result: Any,
+        timings: dict[str, float],
+        letterbox: _Letterbox | None = None,
+    ) -> ExtensionResult:
+        cfg = prepared.cfg
+        crop_iris = prepared.crop_iris
         class_names = cfg.get(
             "class_names",
             {
@@ -73,25 +312,17 @@ class MicroFeaturesExtension:
             },
         )
 
-        model = YOLO(str(weights))
-        result = model.predict(
-            source=crop_gray,
-            verbose=False,
-            conf=float(cfg.get("confidence_threshold", 0.25)),
-            iou=float(cfg.get("iou_threshold", 0.45)),
-            imgsz=int(cfg.get("imgsz", 640)),
-            augment=False,
-            device=context.device,
-        )[0]
-
         boxes_out: list[dict[str, Any]] = []
         box_area_sum = 0.0
         lacunae_count = 0
         crypt_count = 0
 
         if result.boxes is not None:
+            xyxy_boxes = result.boxes.xyxy.cpu().numpy()
+            if letterbox is not None:
+                xyxy_boxes = letterbox.to_crop(xyxy_boxes, crop_iris.shape)
             for xyxy, score, cls_id in zip(
-                result.boxes.xyxy.cpu().numpy(),
+                xyxy_boxes,
                 result.boxes.conf.cpu().numpy(),
                 result.boxes.cls.cpu().numpy(),
                 strict=False,
@@ -106,10 +337,10 @@ class MicroFeaturesExtension:
                 if crop_iris[cy, cx] == 0:
                     continue
 
-                gx1 = max(0, int(round(x1)) + x_min)
-                gy1 = max(0, int(round(y1)) + y_min)
-                gx2 = min(context.grayscale_image.shape[1] - 1, int(round(x2)) + x_min)
-                gy2 = min(context.grayscale_image.shape[0] - 1, int(round(y2)) + y_min)
+                gx1 = max(0, int(round(x1)) + prepared.x_min)
+                gy1 = max(0, int(round(y1)) + prepared.y_min)
+                gx2 = min(prepared.image_shape[1] - 1, int(round(x2)) + prepared.x_min)
+                gy2 = min(prepared.image_shape[0] - 1, int(round(y2)) + prepared.y_min)
                 if gx2 <= gx1 or gy2 <= gy1:
                     continue
 
@@ -129,7 +360,7 @@ class MicroFeaturesExtension:
                     }
                 )
 
-        iris_area = float(np.count_nonzero(iris_mask))
+        iris_area = float(np.count_nonzero(prepared.iris_mask))
         area_ratio = float(box_area_sum / iris_area) if iris_area > 0 else 0.0
         payload = {
             "micro_feature_boxes": boxes_out,
@@ -144,4 +375,69 @@ class MicroFeaturesExtension:
             status=ExtensionStatus.SUCCESS,
             payload=payload,
             model_version=str(cfg.get("model_version", "unknown")),
+            timings=dict(timings),
         )
+
+
+@dataclass(frozen=True)
+class _Letterbox:
+    """A crop padded to the input ultralytics would build for it alone."""
+
+    image: np.ndarray
+
+    def to_crop(self, boxes: np.ndarray, crop_shape: tuple[int, ...]) -> np.ndarray:
+        """Map ``xyxy`` boxes from letterbox to crop coordinates, as ultralytics' ``scale_boxes`` does."""
+
+        height, width = self.image.shape[:2]
+        gain = min(height / crop_shape[0], width / crop_shape[1])
+        pad_x = round((width - crop_shape[1] * gain) / 2 - 0.1)
+        pad_y = round((height - crop_shape[0] * gain) / 2 - 0.1)
+        boxes = np.array(boxes, dtype=np.float32, copy=True).reshape(-1, 4)
+        boxes[:, [0, 2]] -= pad_x
+        boxes[:, [1, 3]] -= pad_y
+        boxes /= gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, crop_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, crop_shape[0])
+        return boxes
+
+
+def _letterbox(crop: np.ndarray, size: int, stride: int) -> _Letterbox:
+    """Resize and pad ``crop`` like ultralytics' ``LetterBox(auto=True)`` for a single image.
+
+    The result is already stride-aligned with its long side at ``size``, so
+    ultralytics' own letterbox leaves it unchanged and several of them can
+    share one ``predict`` call.
+    """
+
+    height, width = crop.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    pad_w, pad_h = np.mod(size - new_width, stride) / 2, np.mod(size - new_height, stride) / 2
+    if (width, height) != (new_width, new_height):
+        crop = cv2.resize(crop, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    return _Letterbox(cv2.copyMakeBorder(crop, top, bottom, left, right, cv2.BORDER_CONSTANT, value=114))
+
+
+def _letterbox_size(imgsz: int, stride: int) -> int:
+    # ultralytics rounds ``imgsz`` up to a multiple of the model stride.
+    return max(math.ceil(imgsz / stride) * stride, stride)
+
+
+def _model_stride(model: Any) -> int:
+    """Largest model stride, at least 32, as ultralytics' ``AutoBackend`` reports it."""
+
+    stride = getattr(getattr(model, "model", None), "stride", None)
+    try:
+        stride = stride.cpu() if hasattr(stride, "cpu") else stride
+        return max(int(np.max(np.asarray(stride))), 32)
+    except (TypeError, ValueError):
+        return 32
+
+
+def _ultralytics_missing(exc: Exception) -> ExtensionResult:
+    return ExtensionResult(
+        status=ExtensionStatus.FAILED,
+        warning=f"ultralytics not available for micro_features: {exc}",
+    )
@@ -3,6 +3,9 @@
 from __future__ import annotations
 
 import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
@@ -12,6 +15,195 @@ import numpy as np
 from engine.app.analysis_types import ExtensionContext, ExtensionResult, ExtensionStatus
 
 
+# Canonical mask labels are 0..5 (see runtime CANONICAL_MASK_VALUES).
+_LABEL_SLOTS = 6
+# Finest supported schema; 12-sector boundaries are a subset of these.
+_GRID_SECTORS = 24
+# Slack (in pixels) over the float64 rounding error of the reference formula.
+_GRID_EPSILON = 1e-6
+# Grid boxes are the selection's bounding box rounded out to this many pixels,
+# so frames with slightly different iris extents share a grid.
+_GRID_ALIGN = 32
+# Rows per float64 block while building a grid; bounds the temporaries.
+_GRID_BLOCK_ROWS = 128
+
+
+@dataclass(frozen=True)
+class SectorGrid:
+    """Per-pixel 24-sector index around a quantized center, over one image box.
+
+    ``index`` and ``safe_distance`` cover rows ``top:top + height`` and columns
+    ``left:left + width`` of the image.
+
+    ``safe_distance`` is how far the true center may move from
+    ``(center_x, center_y)`` before the pixel could change sector: for a pixel at
+    radius ``r`` whose angle is ``m`` radians from the nearest boundary, the
+    direction to it turns by at most ``asin(d / r)`` when the center moves by
+    ``d``, so the sector is stable while ``d < r * sin(m)``.
+    """
+
+    center_x: float
+    center_y: float
+    top: int
+    left: int
+    index: np.ndarray
+    safe_distance: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.index.nbytes + self.safe_distance.nbytes)
+
+
+class SectorGridCache:
+    """LRU cache of :class:`SectorGrid` keyed by aligned selection box and quantized center.
+
+    Lookups are bit-exact with ``SectorMappingExtension._sector_index``: pixels
+    whose ``safe_distance`` does not cover the offset between the true and the
+    quantized center are recomputed with the float64 reference formula. Grids
+    cover only the (aligned) bounding box of the selection and are built
+    outside the cache lock, so a miss never blocks other lookups. Building a
+    grid costs more than one direct evaluation, so a key's first lookup is
+    answered directly and the grid is built only when the key comes back.
+    """
+
+    def __init__(self, max_entries: int = 4, quantum: float = 4.0) -> None:
+        self._entries: OrderedDict[tuple[int, int, int, int, float, float], SectorGrid] = OrderedDict()
+        # Keys looked up once without a grid; bounded like the grids themselves.
+        self._seen: OrderedDict[tuple[int, int, int, int, float, float], None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max(int(max_entries), 1)
+        self.quantum = float(quantum)
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def sector_index(
+        self,
+        selection: np.ndarray,
+        center_x: float,
+        center_y: float,
+        sector_count: int,
+    ) -> np.ndarray:
+        """Sector index of every ``True`` pixel of ``selection``, in ``np.nonzero`` order."""
+
+        if _GRID_SECTORS % sector_count != 0:
+            ys, xs = np.nonzero(selection)
+            return SectorMappingExtension._sector_index(xs, ys, center_x, center_y, sector_count)
+
+        rows = np.flatnonzero(selection.any(axis=1))
+        if rows.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        cols = np.flatnonzero(selection.any(axis=0))
+        box = (
+            int(rows[0]) // _GRID_ALIGN * _GRID_ALIGN,
+            int(cols[0]) // _GRID_ALIGN * _GRID_ALIGN,
+            min(-(-(int(rows[-1]) + 1) // _GRID_ALIGN) * _GRID_ALIGN, selection.shape[0]),
+            min(-(-(int(cols[-1]) + 1) // _GRID_ALIGN) * _GRID_ALIGN, selection.shape[1]),
+        )
+        grid = self.get(box, center_x, center_y)
+        if grid is None:
+            ys, xs = np.nonzero(selection)
+            return SectorMappingExtension._sector_index(xs, ys, center_x, center_y, sector_count)
+        # The box holds every selected pixel, so its nonzero order matches the full frame.
+        window = selection[box[0] : box[2], box[1] : box[3]]
+        offset = math.hypot(center_x - grid.center_x, center_y - grid.center_y)
+        index = grid.index[window].astype(np.int64) // (_GRID_SECTORS // sector_count)
+        unstable = window & (grid.safe_distance <= offset + _GRID_EPSILON)
+        if np.any(unstable):
+            ys, xs = np.nonzero(unstable)
+            index[unstable[window]] = SectorMappingExtension._sector_index(
+                xs + box[1], ys + box[0], center_x, center_y, sector_count
+            )
+        return index
+
+    def get(self, box: tuple[int, int, int, int], center_x: float, center_y: float) -> SectorGrid | None:
+        """Grid over rows ``box[0]:box[2]`` and columns ``box[1]:box[3]`` around a quantized center.
+
+        Returns ``None`` on the first lookup of a key (see the class docstring).
+        """
+
+        key = (
+            int(box[0]),
+            int(box[1]),
+            int(box[2]),
+            int(box[3]),
+            round(center_x / self.quantum) * self.quantum,
+            round(center_y / self.quantum) * self.quantum,
+        )
+        with self._lock:
+            grid = self._entries.get(key)
+            if grid is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return grid
+            self.misses += 1
+            if self._seen.pop(key, False) is False:
+                self._seen[key] = None
+                while len(self._seen) > self._max_entries * 4:
+                    self._seen.popitem(last=False)
+                return None
+            self.builds += 1
+
+        grid = _build_sector_grid(*key)
+        with self._lock:
+            # Another thread may have built the same grid meanwhile; keep the first.
+            grid = self._entries.setdefault(key, grid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return grid
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._seen.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": sum(grid.nbytes for grid in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds,
+            }
+
+
+def _build_sector_grid(
+    top: int,
+    left: int,
+    bottom: int,
+    right: int,
+    center_x: float,
+    center_y: float,
+) -> SectorGrid:
+    index = np.empty((bottom - top, right - left), dtype=np.uint8)
+    safe_distance = np.empty((bottom - top, right - left), dtype=np.float32)
+    dx = np.arange(left, right, dtype=np.float64)[None, :] - np.float64(center_x)
+    for start in range(top, bottom, _GRID_BLOCK_ROWS):
+        stop = min(start + _GRID_BLOCK_ROWS, bottom)
+        dy = np.float64(center_y) - np.arange(start, stop, dtype=np.float64)[:, None]
+        angles = np.mod(np.arctan2(dx, dy), 2.0 * np.pi)
+        scaled = (angles / (2.0 * np.pi)) * _GRID_SECTORS
+        block_index = np.floor(scaled)
+        boundary_margin = np.minimum(scaled - block_index, block_index + 1.0 - scaled) * (2.0 * np.pi / _GRID_SECTORS)
+        block_safe = np.hypot(dx, dy) * np.sin(boundary_margin)
+        index[start - top : stop - top] = block_index
+        # Round down so float32 storage never overstates stability.
+        safe_distance[start - top : stop - top] = np.nextafter(block_safe.astype(np.float32), np.float32(0))
+    return SectorGrid(
+        center_x=center_x,
+        center_y=center_y,
+        top=top,
+        left=left,
+        index=index,
+        safe_distance=safe_distance,
+    )
+
+
+SECTOR_GRID_CACHE = SectorGridCache()
+
+
 class SectorMappingExtension:
     """Map segmentation and micro-feature detections to clock sectors."""
 
@@ -118,44 +310,46 @@ class SectorMappingExtension:
         radius: float,
         micro_boxes: list[dict[str, Any]],
     ) -> dict[str, Any]:
-        ys, xs = np.where(mask == 2)
-        sector_idx = self._sector_index(xs, ys, center_x, center_y, sector_count)
+        iris_pixels = mask == 2
+        sector_idx = SECTOR_GRID_CACHE.sector_index(iris_pixels, center_x, center_y, sector_count)
+
+        # One (sector, label) histogram instead of a boolean mask per sector.
+        # Bins past the last sector (an angle rounding to exactly 2*pi) were
+        # never counted by any sector, so they are sliced off.
+        labels = mask[iris_pixels].astype(np.int64)
+        flat_counts = np.bincount(
+            sector_idx * _LABEL_SLOTS + labels,
+            minlength=sector_count * _LABEL_SLOTS,
+        )
+        counts = flat_counts[: sector_count * _LABEL_SLOTS].reshape(sector_count, _LABEL_SLOTS)
 
         metrics: dict[str, Any] = {}
         for idx in range(sector_count):
-            key = f"sector_{idx + 1}"
-            metrics[key] = {
-                "iris_pixels": 0,
-                "collarette_pixels": 0,
-                "scurf_rim_pixels": 0,
-                "contraction_furrows_pixels": 0,
+            metrics[f"sector_{idx + 1}"] = {
+                "iris_pixels": int(counts[idx, 2]),
+                "collarette_pixels": int(counts[idx, 3]),
+                "scurf_rim_pixels": int(counts[idx, 4]),
+                "contraction_furrows_pixels": int(counts[idx, 5]),
                 "micro_feature_count": 0,
                 "micro_feature_labels": {},
                 "radius": radius,
             }
 
-        for idx in range(sector_count):
-            key = f"sector_{idx + 1}"
-            mask_sector = sector_idx == idx
-            if np.any(mask_sector):
-                x_sector = xs[mask_sector]
-                y_sector = ys[mask_sector]
-                labels = mask[y_sector, x_sector]
-                metrics[key]["iris_pixels"] = int(np.count_nonzero(labels == 2))
-                metrics[key]["collarette_pixels"] = int(np.count_nonzero(labels == 3))
-                metrics[key]["scurf_rim_pixels"] = int(np.count_nonzero(labels == 4))
-                metrics[key]["contraction_furrows_pixels"] = int(np.count_nonzero(labels == 5))
-
-        for box in micro_boxes:
-            x1, y1, x2, y2 = box.get("bbox", [0, 0, 0, 0])
-            cx = np.array([0.5 * (float(x1) + float(x2))], dtype=np.float64)
-            cy = np.array([0.5 * (float(y1) + float(y2))], dtype=np.float64)
-            idx = int(self._sector_index(cx, cy, center_x, center_y, sector_count)[0])
-            key = f"sector_{idx + 1}"
-            metrics[key]["micro_feature_count"] += 1
-            label = str(box.get("label", "unknown"))
-            label_counts = metrics[key]["micro_feature_labels"]
-            label_counts[label] = int(label_counts.get(label, 0) + 1)
+        if micro_boxes:
+            bboxes = np.array([box.get("bbox", [0, 0, 0, 0]) for box in micro_boxes], dtype=np.float64).reshape(-1, 4)
+            box_idx = self._sector_index(
+                0.5 * (bboxes[:, 0] + bboxes[:, 2]),
+                0.5 * (bboxes[:, 1] + bboxes[:, 3]),
+                center_x,
+                center_y,
+                sector_count,
+            )
+            for box, idx in zip(micro_boxes, box_idx.tolist(), strict=True):
+                key = f"sector_{idx + 1}"
+                metrics[key]["micro_feature_count"] += 1
+                label = str(box.get("label", "unknown"))
+                label_counts = metrics[key]["micro_feature_labels"]
+                label_counts[label] = int(label_counts.get(label, 0) + 1)
 
         return metrics
 
@@ -167,10 +361,10 @@ class SectorMappingExtension:
         center_y: float,
         sector_count: int,
     ) -> Path:
-        ys, xs = np.where(iris_mask > 0)
-        idx = self._sector_index(xs, ys, center_x, center_y, sector_count)
+        iris_pixels = iris_mask > 0
+        idx = SECTOR_GRID_CACHE.sector_index(iris_pixels, center_x, center_y, sector_count)
         normalized = np.zeros_like(iris_mask, dtype=np.uint8)
-        normalized[ys, xs] = ((idx + 1) * int(255 / max(sector_count, 1))).astype(np.uint8)
+        normalized[iris_pixels] = ((idx + 1) * int(255 / max(sector_count, 1))).astype(np.uint8)
         heatmap = cv2.applyColorMap(normalized, cv2.COLORMAP_TURBO)
         heatmap[iris_mask == 0] = 0
 
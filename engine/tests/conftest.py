@@ -8,7 +8,18 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure repository root is importable so `import engine` works from any cwd.
 REPO_ROOT = Path(__file__).resolve().parents[2]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_hash_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep checkpoint hash sidecars out of the user's ``~/.irisatlasai``."""
+
+    import engine.utils.file_utils as file_utils
+
+    monkeypatch.setattr(file_utils, "HASH_CACHE_DIR", tmp_path / "hash_cache")
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from engine import AnalysisSession, run_analysis_batch
+from engine.app.run_ledger import ledger_from_config
+from engine.utils.file_utils import sha256_file
+
+
+def _build_config(tmp_path: Path) -> dict:
+    return {
+        "output_dir": str(tmp_path / "out"),
+        "model_config": {
+            "model_version": "test_model",
+            "overlay": {"alpha": 0.45, "class_colors_bgr": {"0": [0, 0, 0], "2": [0, 255, 0]}},
+            "class_labels": {
+                "background": 0,
+                "pupil": 1,
+                "iris": 2,
+                "collarette": 3,
+                "scurf_rim": 4,
+                "contraction_furrows": 5,
+            },
+        },
+        "extensions": {
+            "micro_features": {"enabled": False, "version": "1"},
+            "sector_mapping": {"enabled": False, "version": "1"},
+            "interpretation": {"enabled": False, "version": "1"},
+        },
+    }
+
+
+def _patch_counting_runtime(monkeypatch) -> dict:
+    counts = {"constructed": 0, "inferred": 0, "threads": set()}
+
+    class CountingSegmenter:
+        def __init__(self, model_config):
+            counts["constructed"] += 1
+
+        def infer(self, gray):
+            counts["inferred"] += 1
+            counts["threads"].add(threading.get_ident())
+            return np.full_like(gray, 2, dtype=np.uint8)
+
+    def fake_measurements(mask):
+        return {
+            "pupil_pixels": 0,
+            "iris_pixels": int(np.sum(mask == 2)),
+            "collarette_pixels": 0,
+            "furrow_pixels": 0,
+            "scurf_pixels": 0,
+            "pupil_to_iris": 0.0,
+            "collarette_to_iris": 0.0,
+            "furrow_to_iris": 0.0,
+            "scurf_to_iris": 0.0,
+        }
+
+    def fake_overlay(original_bgr, mask, class_colors, alpha, output_path):
+        cv2.imwrite(str(output_path), original_bgr)
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (CountingSegmenter, fake_measurements, fake_overlay),
+    )
+    return counts
+
+
+def _write_inputs(tmp_path: Path, names: list[str]) -> list[Path]:
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        assert cv2.imwrite(str(path), np.zeros((16, 16, 3), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def test_run_analysis_batch_loads_engine_once(tmp_path: Path, monkeypatch) -> None:
+    counts = _patch_counting_runtime(monkeypatch)
+    inputs = _write_inputs(tmp_path, ["a.png", "b.png", "c.png"])
+    config = _build_config(tmp_path)
+
+    results = list(run_analysis_batch(inputs, "cpu", config))
+
+    assert (counts["constructed"], counts["inferred"]) == (1, 3)
+    assert [result.input_filename for result in results] == ["a.png", "b.png", "c.png"]
+    for name in ("a", "b", "c"):
+        run_dir = Path(config["output_dir"]) / name
+        assert (run_dir / "mask.png").exists()
+        state = json.loads((run_dir / "session_state.json").read_text(encoding="utf-8"))
+        assert state["run_state"] == "completed"
+
+
+def test_session_streams_failures_and_deduplicates_run_dirs(tmp_path: Path, monkeypatch) -> None:
+    _patch_counting_runtime(monkeypatch)
+    (tmp_path / "nested").mkdir()
+    inputs = _write_inputs(tmp_path, ["a.png", "nested/a.png"])
+    missing = tmp_path / "missing.png"
+
+    with AnalysisSession(device="cpu", config=_build_config(tmp_path)) as session:
+        results = list(session.analyze_many([inputs[0], missing, inputs[1]]))
+
+    assert [result.status for result in results] == ["success", "failed", "success"]
+    assert "does not exist" in results[1].warnings[0]
+    assert Path(results[0].mask_path).parent.name == "a"
+    assert Path(results[2].mask_path).parent.name == "a_2"
+
+
+def test_pipelined_batch_preserves_order_and_single_inference_thread(tmp_path: Path, monkeypatch) -> None:
+    counts = _patch_counting_runtime(monkeypatch)
+    names = [f"img_{index}.png" for index in range(6)]
+    inputs = _write_inputs(tmp_path, names)
+    inputs.insert(3, tmp_path / "missing.png")
+
+    config = _build_config(tmp_path)
+    config["pipeline"] = {"decode_workers": 3, "writer_workers": 2, "queue_size": 1}
+    results = list(run_analysis_batch(inputs, "cpu", config))
+
+    assert [result.input_filename for result in results] == [path.name for path in inputs]
+    assert [result.status for result in results].count("failed") == 1
+    assert results[3].status == "failed"
+    assert (counts["constructed"], counts["inferred"]) == (1, 6)
+    assert len(counts["threads"]) == 1
+    failed_state = json.loads((Path(config["output_dir"]) / "missing" / "session_state.json").read_text(encoding="utf-8"))
+    assert failed_state["run_state"] == "failed"
+
+
+def test_run_ledger_indexes_states_and_documents(tmp_path: Path, monkeypatch) -> None:
+    _patch_counting_runtime(monkeypatch)
+    inputs = _write_inputs(tmp_path, ["a.png", "b.png"])
+    inputs.insert(1, tmp_path / "missing.png")
+    config = _build_config(tmp_path)
+    config["run_ledger"] = str(tmp_path / "job.sqlite")
+
+    results = list(run_analysis_batch(inputs, "cpu", config))
+
+    ledger = ledger_from_config(config)
+    assert [result.status for result in results] == ["success", "failed", "success"]
+    failed = ledger.runs_by_state("failed")
+    assert [Path(row["input_path"]).name for row in failed] == ["missing.png"]
+    assert failed[0]["input_sha256"] is None
+    assert ledger.runs_by_state("queued", "running") == []
+
+    # a.png and b.png have identical pixels, so they share an input hash.
+    same_input = ledger.runs_for_input(sha256_file(inputs[0]))
+    assert sorted(Path(row["input_path"]).name for row in same_input) == ["a.png", "b.png"]
+    completed = next(row for row in same_input if row["input_path"].endswith("a.png"))
+    assert [event["run_state"] for event in ledger.events(completed["run_id"])] == ["queued", "running", "completed"]
+    assert ledger.document(completed["run_id"], "results")["input_filename"] == "a.png"
+    ledger_manifest = ledger.document(completed["run_id"], "manifest")
+    assert ledger_manifest["run_state"] == "completed"
+    assert "environment_snapshot" not in ledger_manifest
+    manifest = json.loads(Path(results[0].results_json_path).with_name("manifest.json").read_text(encoding="utf-8"))
+    assert ledger_manifest["environment_fingerprint"] == manifest["environment_fingerprint"]
+    assert ledger.environment(manifest["environment_fingerprint"]) == manifest["environment_snapshot"]
+
+
+def test_run_ledger_reports_only_the_latest_run_per_input(tmp_path: Path, monkeypatch) -> None:
+    _patch_counting_runtime(monkeypatch)
+    inputs = [tmp_path / "late.png", *_write_inputs(tmp_path, ["ok.png"])]
+    config = _build_config(tmp_path)
+    config["run_ledger"] = str(tmp_path / "job.sqlite")
+    ledger = ledger_from_config(config)
+
+    assert [result.status for result in run_analysis_batch(inputs, "cpu", config)] == ["failed", "success"]
+    failed = ledger.runs_by_state("failed")
+    assert [Path(row["input_path"]).name for row in failed] == ["late.png"]
+
+    _write_inputs(tmp_path, ["late.png"])
+    assert [result.status for result in run_analysis_batch(inputs[:1], "cpu", config)] == ["success"]
+
+    assert ledger.runs_by_state("failed") == []
+    completed = ledger.runs_by_state("completed")
+    assert sorted(Path(row["input_path"]).name for row in completed) == ["late.png", "ok.png"]
+    # The failed attempt keeps its history.
+    assert [event["run_state"] for event in ledger.events(failed[0]["run_id"])] == ["queued", "running", "failed"]
+    with pytest.raises(ValueError):
+        ledger.runs_by_state()
+
+
+def test_environment_snapshot_is_computed_once_per_process(tmp_path: Path, monkeypatch) -> None:
+    from engine.app import runtime
+
+    _patch_counting_runtime(monkeypatch)
+    builds = {"count": 0}
+    real_build = runtime._build_environment_snapshot
+
+    def counting_build():
+        builds["count"] += 1
+        return real_build()
+
+    monkeypatch.setattr(runtime, "_build_environment_snapshot", counting_build)
+    monkeypatch.setattr(runtime, "_ENVIRONMENT", None)
+    inputs = _write_inputs(tmp_path, ["a.png", "b.png"])
+
+    results = list(run_analysis_batch(inputs, "cpu", _build_config(tmp_path)))
+
+    assert builds["count"] == 1
+    fingerprints = {
+        json.loads(Path(result.results_json_path).with_name("manifest.json").read_text(encoding="utf-8"))["environment_fingerprint"]
+        for result in results
+    }
+    assert len(fingerprints) == 1
+    _, fingerprint = runtime.refresh_environment_snapshot()
+    assert builds["count"] == 2
+    assert {fingerprint} == fingerprints
+
+
+def test_reduced_loader_segments_small_and_writes_full_resolution_mask(tmp_path: Path, monkeypatch) -> None:
+    _patch_counting_runtime(monkeypatch)
+    path = tmp_path / "large.jpg"
+    assert cv2.imwrite(str(path), np.full((600, 800, 3), 90, dtype=np.uint8))
+    config = _build_config(tmp_path)
+    config["image_loader"] = {"mode": "reduced", "reduced_min_side": 128}
+
+    [result] = list(run_analysis_batch([path], "cpu", config))
+
+    assert result.status == "success"
+    assert cv2.imread(result.mask_path, cv2.IMREAD_UNCHANGED).shape == (600, 800)
+    manifest = json.loads(Path(result.results_json_path).with_name("manifest.json").read_text(encoding="utf-8"))
+    assert manifest["input_decode"]["reduction"] == 4
+    assert manifest["input_decode"]["decodes"] == 2
+
+
+def test_raw_frame_input_runs_without_transcoding(tmp_path: Path, monkeypatch) -> None:
+    counts = _patch_counting_runtime(monkeypatch)
+    path = tmp_path / "capture_0001.raw"
+    path.write_bytes(np.full((24, 32), 700, dtype="<u2").tobytes())
+    config = _build_config(tmp_path)
+    config["image_loader"] = {"raw": {"width": 32, "height": 24, "dtype": "uint16", "bit_depth": 10}}
+
+    [result] = list(run_analysis_batch([path], "cpu", config))
+
+    assert result.status == "success"
+    assert counts["inferred"] == 1
+    assert cv2.imread(result.mask_path, cv2.IMREAD_UNCHANGED).shape == (24, 32)
+    input_copy = cv2.imread(str(Path(result.mask_path).with_name("input.png")), cv2.IMREAD_UNCHANGED)
+    assert int(input_copy.max()) == 700 >> 2
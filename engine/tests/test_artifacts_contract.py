@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from engine.app.artifacts import load_packed_mask, pack_mask, unpack_mask
+from engine.app.runtime import run_runtime
+from engine.core.overlay import generate_overlay, render_overlay
+
+
+def _components():
+    class HalfIrisSegmenter:
+        def __init__(self, model_config):
+            self.model_config = model_config
+
+        def infer(self, gray):
+            mask = np.full(gray.shape, 2, dtype=np.uint8)
+            mask[: gray.shape[0] // 2] = 1
+            return mask
+
+    def measurements(mask):
+        return {"iris_pixels": int(np.sum(mask == 2)), "pupil_pixels": int(np.sum(mask == 1))}
+
+    return HalfIrisSegmenter, measurements, generate_overlay
+
+
+def test_pack_mask_round_trips_odd_sizes() -> None:
+    mask = np.random.default_rng(2).integers(0, 6, size=(7, 5), dtype=np.uint8)
+    packed = pack_mask(mask)
+    assert packed.nbytes == (mask.size * 3 + 7) // 8
+    np.testing.assert_array_equal(unpack_mask(packed, mask.shape), mask)
+
+
+def test_artifact_policy_controls_formats_and_reports_stats(tmp_path: Path, monkeypatch) -> None:
+    image = np.random.default_rng(4).integers(0, 256, size=(16, 12, 3), dtype=np.uint8)
+    input_path = tmp_path / "in.png"
+    assert cv2.imwrite(str(input_path), image)
+    monkeypatch.setattr("engine.app.runtime._load_legacy_runtime_components", _components)
+
+    colors = {"1": [255, 0, 0], "2": [0, 255, 0]}
+    config = {
+        "output_dir": str(tmp_path / "out"),
+        "model_config": {"model_version": "x", "overlay": {"alpha": 0.4, "class_colors_bgr": colors}},
+        "extensions": {name: {"enabled": False} for name in ("micro_features", "sector_mapping", "interpretation")},
+        "artifacts": {"png_compression": 9, "input_copy": "hardlink", "overlay_format": "webp", "mask_format": "packed3"},
+    }
+
+    result = run_runtime(str(input_path), "cpu", config).analysis_result
+    out_dir = Path(config["output_dir"])
+
+    mask = load_packed_mask(result.mask_path)
+    assert result.mask_path.endswith("mask.npz")
+    assert int(np.sum(mask == 1)) == 8 * 12
+    assert (out_dir / "input.png").stat().st_ino == input_path.stat().st_ino
+    overlay = cv2.imread(result.overlay_path, cv2.IMREAD_UNCHANGED)
+    np.testing.assert_array_equal(overlay, render_overlay(image, mask, colors, 0.4))
+
+    stats = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))["artifact_stats"]
+    assert {name: entry["mode"] for name, entry in stats.items()} == {
+        "mask": "packed3",
+        "input_copy": "hardlink",
+        "overlay": "webp",
+    }
+    assert all(entry["bytes"] > 0 and entry["encode_ms"] >= 0 for entry in stats.values())
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
 import time
+import tracemalloc
 from pathlib import Path
 
 import cv2
@@ -9,7 +12,9 @@ import numpy as np
 import pytest
 
 from engine.app.analysis_types import ExtensionResult, ExtensionStatus
-from engine.app.runtime import run_runtime
+from engine.app.extension_executor import ExtensionExecutor
+from engine.app.runtime import _ExtensionMemoryTracer, load_runtime_resources, run_runtime
+from engine.extensions.registry import EXECUTION_ORDER
 
 
 def _fake_components():
@@ -159,3 +164,215 @@ def test_execution_order_lock() -> None:
     from engine.extensions.registry import EXECUTION_ORDER
 
     assert EXECUTION_ORDER == ["micro_features", "sector_mapping", "interpretation"]
+
+
+def test_independent_extensions_run_concurrently_in_locked_order(tmp_path: Path, monkeypatch) -> None:
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    input_path = tmp_path / "in.png"
+    assert cv2.imwrite(str(input_path), image)
+
+    monkeypatch.setattr("engine.app.runtime._load_legacy_runtime_components", _fake_components)
+    barrier = threading.Barrier(2, timeout=5)
+    seen_outputs: dict[str, list[str]] = {}
+
+    class Producer:
+        name = "micro_features"
+        version = "1"
+        requires = []
+        optional_requires = []
+
+        def run(self, context):
+            return ExtensionResult(status=ExtensionStatus.SUCCESS, payload={"boxes": []})
+
+    class Consumer:
+        version = "1"
+        requires = []
+        optional_requires = ["micro_features"]
+
+        def __init__(self, name):
+            self.name = name
+
+        def run(self, context):
+            seen_outputs[self.name] = sorted(context.extension_outputs)
+            barrier.wait()
+            return ExtensionResult(status=ExtensionStatus.SUCCESS, payload={"name": self.name})
+
+    monkeypatch.setattr(
+        "engine.app.runtime.build_extensions",
+        lambda: {
+            "micro_features": Producer(),
+            "sector_mapping": Consumer("sector_mapping"),
+            "interpretation": Consumer("interpretation"),
+        },
+    )
+
+    config = _base_config(tmp_path)
+    output = run_runtime(str(input_path), "cpu", config)
+
+    assert [entry.name for entry in output.extension_telemetry] == EXECUTION_ORDER
+    assert all(entry.status == ExtensionStatus.SUCCESS for entry in output.extension_telemetry)
+    assert list(output.analysis_result.extensions) == EXECUTION_ORDER
+    assert seen_outputs == {"sector_mapping": ["micro_features"], "interpretation": ["micro_features"]}
+
+
+def test_extension_context_is_read_only_and_shared(tmp_path: Path, monkeypatch) -> None:
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    input_path = tmp_path / "in.png"
+    assert cv2.imwrite(str(input_path), image)
+
+    monkeypatch.setattr("engine.app.runtime._load_legacy_runtime_components", _fake_components)
+    seen: dict[str, object] = {}
+
+    class Inspector:
+        version = "1"
+        requires = []
+        optional_requires = []
+
+        def __init__(self, name):
+            self.name = name
+
+        def run(self, context):
+            if self.name == "micro_features":
+                with pytest.raises(ValueError):
+                    context.segmentation_mask[0, 0] = 0
+                with pytest.raises(ValueError):
+                    context.grayscale_image.setflags(write=True)
+                with pytest.raises(TypeError):
+                    context.config["extensions"] = {}
+                seen["iris_pixels"] = int(context.iris_mask.sum())
+            return ExtensionResult(status=ExtensionStatus.SUCCESS, payload={"echo": context.config["extensions"]})
+
+    monkeypatch.setattr(
+        "engine.app.runtime.build_extensions",
+        lambda: {name: Inspector(name) for name in EXECUTION_ORDER},
+    )
+
+    config = _base_config(tmp_path)
+    config["extensions"] = {name: {"enabled": True, "version": "1"} for name in EXECUTION_ORDER}
+
+    output = run_runtime(str(input_path), "cpu", config)
+
+    assert seen["iris_pixels"] == 16 * 16
+    assert all(entry.status == ExtensionStatus.SUCCESS for entry in output.extension_telemetry)
+    manifest = json.loads((Path(config["output_dir"]) / "manifest.json").read_text(encoding="utf-8"))
+    stats = manifest["extension_context"]
+    assert stats["contexts_built"] == 3
+    assert stats["array_bytes_not_copied"] == 2 * stats["shared_array_bytes"]
+
+
+def test_memory_tracer_leaves_host_tracing_running() -> None:
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracer = _ExtensionMemoryTracer()
+        tracer.end(tracer.begin())
+        tracer.close()
+        assert tracemalloc.is_tracing()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    if not was_tracing:
+        # Tracing the tracer started itself is stopped again by its last user.
+        tracer = _ExtensionMemoryTracer()
+        assert tracemalloc.is_tracing()
+        tracer.close()
+        assert not tracemalloc.is_tracing()
+
+
+def test_extension_executor_persists_and_timeout_releases_caller(tmp_path: Path, monkeypatch) -> None:
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    input_path = tmp_path / "in.png"
+    assert cv2.imwrite(str(input_path), image)
+
+    monkeypatch.setattr("engine.app.runtime._load_legacy_runtime_components", _fake_components)
+    release = threading.Event()
+
+    class Runaway:
+        name = "micro_features"
+        version = "1"
+        requires = []
+        optional_requires = []
+
+        def run(self, context):
+            release.wait(5)
+            return ExtensionResult(status=ExtensionStatus.SUCCESS, payload={})
+
+    class Quick:
+        version = "1"
+        requires = []
+        optional_requires = []
+
+        def __init__(self, name):
+            self.name = name
+
+        def run(self, context):
+            return ExtensionResult(status=ExtensionStatus.SUCCESS, payload={"ok": True})
+
+    monkeypatch.setattr(
+        "engine.app.runtime.build_extensions",
+        lambda: {"micro_features": Runaway(), "sector_mapping": Quick("sector_mapping"), "interpretation": Quick("interpretation")},
+    )
+
+    config = _base_config(tmp_path)
+    config["extensions"] = {
+        "micro_features": {"enabled": True, "timeout_ms": 50, "version": "1"},
+        "sector_mapping": {"enabled": True, "timeout_ms": 1000, "version": "1"},
+        "interpretation": {"enabled": True, "timeout_ms": 1000, "version": "1"},
+    }
+    resources = load_runtime_resources("cpu", config)
+    try:
+        started = time.perf_counter()
+        for index in range(2):
+            config["output_dir"] = str(tmp_path / f"out_{index}")
+            output = run_runtime(str(input_path), "cpu", config, resources=resources)
+            statuses = [entry.status for entry in output.extension_telemetry]
+            assert statuses == [ExtensionStatus.TIMEOUT, ExtensionStatus.SUCCESS, ExtensionStatus.SUCCESS]
+        assert time.perf_counter() - started < 2.0
+
+        stats = resources.extension_executor.stats()
+        assert (stats["submitted"], stats["abandoned"]) == (6, 2)
+    finally:
+        release.set()
+        resources.close()
+
+
+def test_process_executor_terminates_abandoned_calls() -> None:
+    executor = ExtensionExecutor(mode="process", max_workers=1)
+    try:
+        assert executor.submit(abs, -3).result(timeout=30) == 3
+        runaway = executor.submit(time.sleep, 60)
+        time.sleep(0.2)
+        executor.abandon(runaway)
+
+        stats = executor.stats()
+        assert stats["terminated"] == 1
+        assert executor.submit(abs, -4).result(timeout=30) == 4
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize("durability", ["strict", "batched", "async"])
+def test_durability_modes_leave_consistent_final_files(tmp_path: Path, monkeypatch, durability: str) -> None:
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    input_path = tmp_path / "in.png"
+    assert cv2.imwrite(str(input_path), image)
+    monkeypatch.setattr("engine.app.runtime._load_legacy_runtime_components", _fake_components)
+    fsynced: list[int] = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsynced.append(fd), real_fsync(fd))[1])
+
+    config = _base_config(tmp_path)
+    config["durability"] = durability
+    config["extensions"] = {name: {"enabled": False, "version": "1"} for name in EXECUTION_ORDER}
+    run_runtime(str(input_path), "cpu", config)
+
+    out_dir = Path(config["output_dir"])
+    state = json.loads((out_dir / "session_state.json").read_text(encoding="utf-8"))
+    assert state["run_state"] == "completed"
+    assert json.loads((out_dir / "results.json").read_text(encoding="utf-8"))["status"] == "success"
+    assert json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))["run_state"] == "completed"
+    # strict: QUEUED, RUNNING, results, manifest, COMPLETED; otherwise one per file.
+    assert len(fsynced) == (5 if durability == "strict" else 3)
+    assert not list(out_dir.glob("*.tmp"))
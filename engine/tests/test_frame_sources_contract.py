@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from engine import run_analysis_frames
+from engine.app import frame_sources
+from engine.app.frame_sources import FrameSourceSettings, is_frame_source, iter_frames
+
+
+def _build_config(tmp_path: Path) -> dict:
+    return {
+        "output_dir": str(tmp_path / "out"),
+        "model_config": {
+            "model_version": "test_model",
+            "overlay": {"alpha": 0.45, "class_colors_bgr": {"2": [0, 255, 0]}},
+        },
+        "extensions": {
+            "micro_features": {"enabled": False, "version": "1"},
+            "sector_mapping": {"enabled": False, "version": "1"},
+            "interpretation": {"enabled": False, "version": "1"},
+        },
+    }
+
+
+def _patch_batch_runtime(monkeypatch) -> list[int]:
+    batch_sizes: list[int] = []
+
+    class BatchSegmenter:
+        def __init__(self, model_config):
+            pass
+
+        def infer(self, gray):
+            raise AssertionError("frame sources should use infer_batch")
+
+        def infer_batch(self, grays):
+            batch_sizes.append(len(grays))
+            self.last_batch_stats = {"images": len(grays), "mode": "per_image", "images_per_second": 50.0}
+            return [np.where(gray > 0, 2, 0).astype(np.uint8) for gray in grays]
+
+    def fake_measurements(mask):
+        return {"iris_pixels": int(np.sum(mask == 2))}
+
+    def fake_overlay(original_bgr, mask, class_colors, alpha, output_path):
+        cv2.imwrite(str(output_path), original_bgr)
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (BatchSegmenter, fake_measurements, fake_overlay),
+    )
+    return batch_sizes
+
+
+def test_multipage_tiff_yields_one_result_per_page_and_a_summary(tmp_path: Path, monkeypatch) -> None:
+    batch_sizes = _patch_batch_runtime(monkeypatch)
+    path = tmp_path / "stack.tif"
+    pages = [np.full((12, 16), value, dtype=np.uint8) for value in (0, 10, 20, 30, 40)]
+    pages[2][:6] = 0
+    assert cv2.imwritemulti(str(path), pages)
+    assert is_frame_source(path)
+    config = _build_config(tmp_path)
+    config["frame_source"] = {"batch_size": 2}
+
+    results = list(run_analysis_frames(path, "cpu", config))
+
+    assert [result.status for result in results] == ["success"] * 5
+    assert batch_sizes == [2, 2, 1]
+    assert [Path(result.mask_path).parent.name for result in results] == [f"page_{index:05d}" for index in range(5)]
+    assert [result.metrics["iris_pixels"] for result in results] == [0, 192, 96, 192, 192]
+    summary = json.loads((Path(config["output_dir"]) / "stack" / "frames_summary.json").read_text(encoding="utf-8"))
+    assert summary == config["_frame_summary"]
+    assert (summary["frames"], summary["succeeded"], summary["failed_frames"]) == (5, 5, [])
+    assert summary["metrics"]["iris_pixels"] == {"mean": 134.4, "min": 0, "max": 192}
+    manifest = json.loads(Path(results[4].mask_path).with_name("manifest.json").read_text(encoding="utf-8"))
+    assert manifest["segmentation_batch"] == {"images": 1, "mode": "per_image", "images_per_second": 50.0}
+
+
+def test_video_frames_are_streamed_with_stride_and_limit(tmp_path: Path) -> None:
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    assert writer.isOpened()
+    for index in range(9):
+        writer.write(np.full((24, 32, 3), index * 25, dtype=np.uint8))
+    writer.release()
+
+    frames = list(iter_frames(path, FrameSourceSettings(frame_stride=2, max_frames=3)))
+
+    assert [frame.index for frame in frames] == [0, 2, 4]
+    assert [frame.name for frame in frames] == ["frame_000000", "frame_000002", "frame_000004"]
+    assert all(frame.image.shape == (24, 32) for frame in frames)
+    assert abs(int(frames[2].image.gray.mean()) - 100) <= 3
+
+
+def test_tiff_reads_span_at_most_batch_size_pages(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "stack.tif"
+    assert cv2.imwritemulti(str(path), [np.full((12, 16), 10 * index, dtype=np.uint8) for index in range(9)])
+    reads: list[tuple[int, int]] = []
+    imreadmulti = cv2.imreadmulti
+
+    def recording_imreadmulti(filename, start, count, **kwargs):
+        reads.append((start, count))
+        return imreadmulti(filename, start, count, **kwargs)
+
+    monkeypatch.setattr(cv2, "imreadmulti", recording_imreadmulti)
+
+    frames = list(iter_frames(path, FrameSourceSettings(batch_size=4, frame_stride=2, max_frames=4)))
+
+    assert [frame.index for frame in frames] == [0, 2, 4, 6]
+    assert [int(frame.image.gray.mean()) for frame in frames] == [0, 20, 40, 60]
+    # Pages past max_frames are never decoded, and no call spans more than batch_size pages.
+    assert reads == [(0, 3), (4, 3)]
+
+    reads.clear()
+    assert [frame.index for frame in iter_frames(path, FrameSourceSettings(batch_size=2, frame_stride=4))] == [0, 4, 8]
+    assert reads == [(0, 1), (4, 1), (8, 1)]
+
+
+def _synthetic_eye(rng: np.random.Generator, texture: int) -> np.ndarray:
+    image = np.full((240, 320), 140, dtype=np.int32)
+    iris = np.zeros((240, 320), dtype=np.uint8)
+    cv2.circle(iris, (160, 120), 80, 1, -1)
+    image[iris == 1] = 90 + rng.integers(-texture, texture + 1, int(iris.sum()))
+    cv2.circle(image, (160, 120), 25, 15, -1)
+    return image.clip(0, 255).astype(np.uint8)
+
+
+def test_quality_gate_rejects_frames_before_segmentation(tmp_path: Path, monkeypatch) -> None:
+    batch_sizes = _patch_batch_runtime(monkeypatch)
+    rng = np.random.default_rng(2)
+    sharp = _synthetic_eye(rng, texture=30)
+    softer = _synthetic_eye(rng, texture=12)
+    blurred = cv2.GaussianBlur(sharp, (0, 0), 6)
+    closed = np.clip(150 + rng.normal(0, 20, sharp.shape), 0, 255).astype(np.uint8)
+    path = tmp_path / "burst.tif"
+    assert cv2.imwritemulti(str(path), [softer, blurred, sharp, closed])
+    config = _build_config(tmp_path)
+    config["quality_gate"] = {"best_of": 1, "burst_size": 4}
+
+    results = list(run_analysis_frames(path, "cpu", config))
+
+    assert [result.status for result in results] == ["rejected", "rejected", "success", "rejected"]
+    assert batch_sizes == [1]
+    assert "burst_rank" in results[0].warnings[0]
+    assert "blur" in results[1].warnings[0]
+    assert "no_pupil" in results[3].warnings[0]
+    run_dir = Path(config["output_dir"]) / "burst"
+    state = json.loads((run_dir / "page_00001" / "session_state.json").read_text(encoding="utf-8"))
+    assert state["run_state"] == "rejected"
+    assert state["error"].startswith("blur")
+    manifest = json.loads((run_dir / "page_00002" / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["input_decode"]["quality"]["passed"] is True
+    assert config["_frame_summary"]["rejected"] == {"blur": 1, "burst_rank": 1, "no_pupil": 1}
+    assert config["_frame_summary"]["succeeded"] == 1
+
+
+def test_failed_batch_is_retried_frame_by_frame(tmp_path: Path, monkeypatch) -> None:
+    calls = {"batch": 0, "single": 0}
+
+    class FlakySegmenter:
+        def __init__(self, model_config):
+            pass
+
+        def infer(self, gray):
+            calls["single"] += 1
+            if not gray.any():
+                raise ValueError("blank frame")
+            return np.where(gray > 0, 2, 0).astype(np.uint8)
+
+        def infer_batch(self, grays):
+            calls["batch"] += 1
+            return [self.infer(gray) for gray in grays]
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (
+            FlakySegmenter,
+            lambda mask: {"iris_pixels": int(np.sum(mask == 2))},
+            lambda original_bgr, mask, class_colors, alpha, output_path: cv2.imwrite(str(output_path), original_bgr),
+        ),
+    )
+    path = tmp_path / "stack.tif"
+    assert cv2.imwritemulti(str(path), [np.full((12, 16), value, dtype=np.uint8) for value in (10, 0, 30)])
+    config = _build_config(tmp_path)
+    config["frame_source"] = {"batch_size": 3}
+
+    results = list(run_analysis_frames(path, "cpu", config))
+
+    assert [result.status for result in results] == ["success", "failed", "success"]
+    assert calls["batch"] == 1
+    assert [result.metrics.get("iris_pixels") for result in results if result.status == "success"] == [192, 192]
+
+
+def test_frame_that_cannot_start_a_run_fails_alone(tmp_path: Path, monkeypatch) -> None:
+    _patch_batch_runtime(monkeypatch)
+    real_begin_run = frame_sources.begin_run
+
+    def begin_run(source, run_config):
+        if run_config["output_dir"].endswith("page_00001"):
+            raise PermissionError("output directory is read-only")
+        return real_begin_run(source, run_config)
+
+    monkeypatch.setattr(frame_sources, "begin_run", begin_run)
+    path = tmp_path / "stack.tif"
+    assert cv2.imwritemulti(str(path), [np.full((12, 16), value, dtype=np.uint8) for value in (10, 20, 30)])
+    config = _build_config(tmp_path)
+
+    results = list(run_analysis_frames(path, "cpu", config))
+
+    assert [result.status for result in results] == ["success", "failed", "success"]
+    assert results[1].warnings == ["Analysis of frame page_00001 failed: output directory is read-only"]
+    assert config["_frame_summary"]["failed_frames"] == [1]
+
+
+def test_cached_pages_are_read_in_batches_without_building_the_engine(tmp_path: Path, monkeypatch) -> None:
+    counts = {"constructed": 0, "reads": 0}
+
+    class CountingSegmenter:
+        def __init__(self, model_config):
+            counts["constructed"] += 1
+
+        def infer(self, gray):
+            return np.where(gray > 0, 2, 0).astype(np.uint8)
+
+        def infer_batch(self, grays):
+            return [self.infer(gray) for gray in grays]
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (
+            CountingSegmenter,
+            lambda mask: {"iris_pixels": int(np.sum(mask == 2))},
+            lambda original_bgr, mask, class_colors, alpha, output_path: cv2.imwrite(str(output_path), original_bgr),
+        ),
+    )
+    imreadmulti = cv2.imreadmulti
+
+    def counting_imreadmulti(*args, **kwargs):
+        counts["reads"] += 1
+        return imreadmulti(*args, **kwargs)
+
+    monkeypatch.setattr(cv2, "imreadmulti", counting_imreadmulti)
+    path = tmp_path / "stack.tif"
+    assert cv2.imwritemulti(str(path), [np.full((12, 16), value, dtype=np.uint8) for value in (10, 20, 30, 40, 50)])
+    config = _build_config(tmp_path)
+    config["model_hash"] = "fixed-model-hash"
+    config["result_cache"] = {"enabled": True, "cache_dir": str(tmp_path / "cache")}
+    config["frame_source"] = {"batch_size": 2}
+
+    first = list(run_analysis_frames(path, "cpu", config))
+    assert (counts["constructed"], counts["reads"]) == (1, 3)
+
+    second = list(run_analysis_frames(path, "cpu", config))
+    assert (counts["constructed"], counts["reads"]) == (1, 6)
+    assert [result.metrics for result in second] == [result.metrics for result in first]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+
+import engine.utils.file_utils as file_utils
+from engine.app.analysis_types import RunState
+from engine.app.runtime import _build_manifest_payload
+from engine.utils.file_utils import cached_sha256_file
+
+
+def test_cached_sha256_reuses_sidecar_across_processes(tmp_path: Path, monkeypatch) -> None:
+    checkpoint = tmp_path / "checkpoint_final.pth"
+    checkpoint.write_bytes(b"weights-v1")
+    cache_dir = tmp_path / "hash_cache"
+    monkeypatch.setattr(file_utils, "_HASH_MEMO", OrderedDict())
+
+    digest, cached = cached_sha256_file(checkpoint, cache_dir=cache_dir)
+    assert digest == hashlib.sha256(b"weights-v1").hexdigest()
+    assert cached is False
+
+    def fail_rehash(path):  # pragma: no cover
+        raise AssertionError("checkpoint was rehashed")
+
+    # A fresh process has an empty memo but finds the persistent sidecar.
+    real_sha256_file = file_utils.sha256_file
+    monkeypatch.setattr(file_utils, "_HASH_MEMO", OrderedDict())
+    monkeypatch.setattr(file_utils, "sha256_file", fail_rehash)
+    assert cached_sha256_file(checkpoint, cache_dir=cache_dir) == (digest, True)
+    monkeypatch.setattr(file_utils, "sha256_file", real_sha256_file)
+
+    checkpoint.write_bytes(b"weights-v2-longer")
+    monkeypatch.setattr(file_utils, "_HASH_MEMO", OrderedDict())
+    new_digest, cached = cached_sha256_file(checkpoint, cache_dir=cache_dir)
+    assert new_digest == hashlib.sha256(b"weights-v2-longer").hexdigest()
+    assert cached is False
+
+
+def test_manifest_reports_cached_model_hash(tmp_path: Path, monkeypatch) -> None:
+    model_folder = tmp_path / "model"
+    model_folder.mkdir()
+    (model_folder / "checkpoint_final.pth").write_bytes(b"weights")
+    monkeypatch.setattr(file_utils, "_HASH_MEMO", OrderedDict())
+    monkeypatch.setattr(file_utils, "HASH_CACHE_DIR", tmp_path / "hash_cache")
+
+    class Result:
+        model_version = "x"
+        device = "cpu"
+        mask_path = overlay_path = results_json_path = ""
+
+    def build() -> dict:
+        return _build_manifest_payload(
+            analysis_result=Result(),
+            extension_telemetry=[],
+            config_snapshot={},
+            model_config={"model_folder": str(model_folder), "checkpoint_name": "checkpoint_final.pth"},
+            run_state=RunState.COMPLETED,
+            input_path=tmp_path / "in.png",
+            output_dir=tmp_path,
+            timestamp_override="2026-01-01T00:00:00Z",
+        )
+
+    first, second = build(), build()
+    assert first["model_hash"] == second["model_hash"] == hashlib.sha256(b"weights").hexdigest()
+    assert (first["model_hash_cached"], second["model_hash_cached"]) == (False, True)
+    assert json.loads(next((tmp_path / "hash_cache").glob("*.json")).read_text(encoding="utf-8"))["size"] == 7
+
+
+
+def test_hash_memo_is_bounded_lru(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(file_utils, "_HASH_MEMO", OrderedDict())
+    monkeypatch.setattr(file_utils, "_HASH_MEMO_MAX_ENTRIES", 2)
+    paths = []
+    for index in range(3):
+        paths.append(tmp_path / f"checkpoint_{index}.pth")
+        paths[-1].write_bytes(bytes([index]))
+
+    cached_sha256_file(paths[0])
+    cached_sha256_file(paths[1])
+    cached_sha256_file(paths[0])
+    cached_sha256_file(paths[2])
+
+    assert [Path(key[0]).name for key in file_utils._HASH_MEMO] == ["checkpoint_0.pth", "checkpoint_2.pth"]
@@ -1,10 +1,21 @@
 import numpy as np
 import pytest
 
-from engine.core.measurements import compute_measurements
+from engine.core.measurements import compute_measurements, label_histogram
 
 
 def test_iris_pixels_zero_raises() -> None:
     mask = np.zeros((4, 4), dtype=np.uint8)
     with pytest.raises(ValueError, match="iris_pixels is zero"):
         compute_measurements(mask)
+
+
+def test_label_histogram_matches_per_class_counts(monkeypatch) -> None:
+    monkeypatch.setattr("engine.core.measurements._HISTOGRAM_CHUNK_PIXELS", 7)
+    mask = np.random.default_rng(3).integers(0, 6, size=(13, 11), dtype=np.uint8)
+
+    counts = label_histogram(mask)
+
+    assert counts.shape == (256,)
+    assert [int(counts[label]) for label in range(6)] == [int(np.sum(mask == label)) for label in range(6)]
+    assert compute_measurements(mask, label_counts=counts) == compute_measurements(mask)
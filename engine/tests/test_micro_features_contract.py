@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import concurrent.futures
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from engine import run_analysis_batch, run_analysis_frames
+from engine.app.analysis_types import ExtensionContext, ExtensionStatus
+from engine.extensions import micro_features
+from engine.extensions.micro_features import MicroFeaturesExtension, YoloModelCache
+
+
+class _FakeTensor:
+    def __init__(self, values):
+        self._values = np.asarray(values, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._values
+
+
+def _ultralytics_letterbox(image: np.ndarray, imgsz: int, auto: bool, stride: int = 32) -> np.ndarray:
+    # ultralytics LetterBox: minimal stride-aligned rectangle when ``auto``, full square otherwise.
+    shape = image.shape[:2]
+    r = min(imgsz / shape[0], imgsz / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = imgsz - new_unpad[0], imgsz - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    dw, dh = dw / 2, dh / 2
+    if shape[::-1] != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=114)
+
+
+def _ultralytics_scale_boxes(img1_shape, boxes: np.ndarray, img0_shape) -> np.ndarray:
+    gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+    pad = (
+        round((img1_shape[1] - img0_shape[1] * gain) / 2 - 0.1),
+        round((img1_shape[0] - img0_shape[0] * gain) / 2 - 0.1),
+    )
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, img0_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, img0_shape[0])
+    return boxes
+
+
+def _fake_result(source: np.ndarray, model_input: np.ndarray):
+    # One box around the bright pixels the model sees and one outside the iris,
+    # scaled back to the source image as ultralytics' postprocess does.
+    h, w = model_input.shape[:2]
+    ys, xs = np.nonzero(model_input > 150)
+    bright = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1] if xs.size else [w / 4, h / 4, 3 * w / 4, 3 * h / 4]
+    xyxy = _ultralytics_scale_boxes((h, w), np.asarray([bright, [0, 0, 1, 1]], dtype=np.float32), source.shape[:2])
+    boxes = types.SimpleNamespace(
+        xyxy=_FakeTensor(xyxy),
+        conf=_FakeTensor([float(model_input.mean()) / 255.0, 0.9]),
+        cls=_FakeTensor([0, 1]),
+    )
+    return types.SimpleNamespace(boxes=boxes)
+
+
+def _install_fake_ultralytics(monkeypatch, batch_sizes: list[int] | None = None, sources_seen: list | None = None) -> list[str]:
+    loads: list[str] = []
+
+    class FakeYOLO:
+        def __init__(self, weights_path):
+            loads.append(weights_path)
+
+        def predict(self, source, imgsz=640, **kwargs):
+            sources = source if isinstance(source, list) else [source]
+            if batch_sizes is not None:
+                batch_sizes.append(len(sources))
+            if sources_seen is not None:
+                sources_seen.extend(sources)
+            auto = len({image.shape for image in sources}) == 1
+            return [_fake_result(image, _ultralytics_letterbox(image, imgsz, auto)) for image in sources]
+
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+    monkeypatch.setattr(micro_features, "YOLO_MODEL_CACHE", YoloModelCache())
+    return loads
+
+
+def _context(
+    tmp_path: Path,
+    weights: Path,
+    device: str = "cpu",
+    iris_box: tuple[int, int, int, int] = (4, 4, 12, 12),
+    fill: int = 0,
+    batch_size: int = 8,
+) -> ExtensionContext:
+    y0, x0, y1, x1 = iris_box
+    mask = np.zeros((16, 16), dtype=np.uint8)
+    mask[y0:y1, x0:x1] = 2
+    gray = np.full((16, 16), fill, dtype=np.uint8)
+    cfg = {"enabled": True, "weights_path": str(weights), "batch_size": batch_size}
+    return ExtensionContext(
+        input_path=tmp_path / "in.png",
+        output_dir=tmp_path,
+        grayscale_image=gray,
+        original_bgr=np.zeros((16, 16, 3), dtype=np.uint8),
+        segmentation_mask=mask,
+        iris_mask=(mask == 2).astype(np.uint8),
+        metrics={},
+        device=device,
+        model_version="x",
+        config={"extensions": {"micro_features": cfg}},
+        extension_outputs={},
+    )
+
+
+def test_yolo_model_is_loaded_once_per_weights_and_device(tmp_path: Path, monkeypatch) -> None:
+    loads = _install_fake_ultralytics(monkeypatch)
+    weights = tmp_path / "detector.pt"
+    weights.write_bytes(b"weights-v1")
+    extension = MicroFeaturesExtension()
+
+    assert extension.warm_up(_context(tmp_path, weights).config, "cpu") is True
+    results = [extension.run(_context(tmp_path, weights)) for _ in range(3)]
+
+    assert len(loads) == 1
+    assert all(result.status == ExtensionStatus.SUCCESS for result in results)
+    assert set(results[0].timings) == {"model_load", "predict"}
+
+    extension.run(_context(tmp_path, weights, device="cuda"))
+    weights.write_bytes(b"weights-v2-longer")
+    extension.run(_context(tmp_path, weights))
+    assert len(loads) == 3
+
+
+def test_run_batch_matches_single_image_path(tmp_path: Path, monkeypatch) -> None:
+    batch_sizes: list[int] = []
+    _install_fake_ultralytics(monkeypatch, batch_sizes)
+    weights = tmp_path / "detector.pt"
+    weights.write_bytes(b"weights")
+    extension = MicroFeaturesExtension()
+
+    contexts = [
+        _context(tmp_path, weights, fill=10 * index, iris_box=box, batch_size=2)
+        for index, box in enumerate([(4, 4, 12, 12), (2, 2, 10, 10), (0, 0, 16, 8), (6, 6, 14, 14), (0, 0, 0, 0)])
+    ]
+    single = [extension.run(context) for context in contexts]
+    batch_sizes.clear()
+    batched = extension.run_batch(contexts)
+
+    assert [result.status for result in batched] == [result.status for result in single]
+    assert [result.payload for result in batched] == [result.payload for result in single]
+    assert [box["bbox"] for box in single[0].payload["micro_feature_boxes"]] == [[6, 6, 10, 10]]
+    # The three 8x8 crops share a letterbox (chunked by batch_size); the 16x8 crop gets its own call.
+    assert batch_sizes == [2, 1, 1]
+
+
+def test_run_sends_the_raw_crop_and_batches_reproduce_its_boxes(tmp_path: Path, monkeypatch) -> None:
+    batch_sizes: list[int] = []
+    sources: list[np.ndarray] = []
+    _install_fake_ultralytics(monkeypatch, batch_sizes, sources)
+    weights = tmp_path / "detector.pt"
+    weights.write_bytes(b"weights")
+    extension = MicroFeaturesExtension()
+
+    contexts = []
+    for index, (box, spot) in enumerate(
+        [((1, 2, 14, 11), (5, 4)), ((0, 1, 13, 11), (3, 6)), ((2, 0, 15, 15), (9, 2)), ((3, 3, 12, 13), (4, 4))]
+    ):
+        context = _context(tmp_path, weights, iris_box=box, fill=60)
+        y0, x0 = box[0] + spot[0], box[1] + spot[1]
+        context.grayscale_image[y0 : y0 + 3, x0 : x0 + 2] = 220 + index
+        contexts.append(context)
+
+    single = []
+    for context, box in zip(contexts, [(1, 2, 14, 11), (0, 1, 13, 11), (2, 0, 15, 15), (3, 3, 12, 13)]):
+        sources.clear()
+        single.append(extension.run(context))
+        # Baseline call signature: the raw 2-D crop, letterboxed by ultralytics itself.
+        assert len(sources) == 1
+        np.testing.assert_array_equal(sources[0], context.grayscale_image[box[0] : box[2], box[1] : box[3]])
+    batch_sizes.clear()
+    batched = extension.run_batch(contexts)
+
+    assert all(result.payload["micro_feature_boxes"] for result in single)
+    assert [result.payload for result in batched] == [result.payload for result in single]
+    # The 13x15 and 9x10 crops share a 576x640 letterbox; the 13x9 and 13x10 crops do not.
+    assert sorted(batch_sizes) == [1, 1, 2]
+
+
+def test_model_cache_loads_outside_global_lock_and_serializes_predict(tmp_path: Path) -> None:
+    slow_weights = tmp_path / "slow.pt"
+    fast_weights = tmp_path / "fast.pt"
+    slow_weights.write_bytes(b"slow")
+    fast_weights.write_bytes(b"fast")
+    cache = YoloModelCache()
+    release_slow = threading.Event()
+    loads: list[str] = []
+    active = {"now": 0, "max": 0}
+    active_lock = threading.Lock()
+
+    class SharedModel:
+        def predict(self, source, **kwargs):
+            with active_lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.01)
+            with active_lock:
+                active["now"] -= 1
+            return [source]
+
+    def loader(path: str):
+        loads.append(Path(path).name)
+        if path.endswith("slow.pt"):
+            assert release_slow.wait(5)
+        return SharedModel()
+
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        slow = [pool.submit(cache.get_or_load, slow_weights, "cpu", loader) for _ in range(2)]
+        # The slow load must not block loading (and hitting) other weights.
+        fast_model, cached = cache.get_or_load(fast_weights, "cpu", loader)
+        assert cached is False
+        assert cache.get_or_load(fast_weights, "cpu", loader) == (fast_model, True)
+        release_slow.set()
+        slow_models = [future.result(timeout=5)[0] for future in slow]
+        assert slow_models[0] is slow_models[1]
+        list(pool.map(lambda index: fast_model.predict(index), range(8)))
+
+    assert sorted(loads) == ["fast.pt", "slow.pt"]
+    assert active["max"] == 1
+
+
+def test_batch_paths_share_one_predict_call(tmp_path: Path, monkeypatch) -> None:
+    batch_sizes: list[int] = []
+    _install_fake_ultralytics(monkeypatch, batch_sizes)
+    weights = tmp_path / "detector.pt"
+    weights.write_bytes(b"weights")
+
+    class IrisSegmenter:
+        def __init__(self, model_config):
+            pass
+
+        def infer(self, gray):
+            return np.where(gray > 0, 2, 0).astype(np.uint8)
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (
+            IrisSegmenter,
+            lambda mask: {"iris_pixels": int(np.sum(mask == 2))},
+            lambda original_bgr, mask, class_colors, alpha, output_path: cv2.imwrite(str(output_path), original_bgr),
+        ),
+    )
+    config = {
+        "output_dir": str(tmp_path / "out"),
+        "model_config": {"model_version": "test_model", "overlay": {"alpha": 0.45, "class_colors_bgr": {}}},
+        "extensions": {
+            "micro_features": {"enabled": True, "version": "1", "weights_path": str(weights), "imgsz": 64},
+            "sector_mapping": {"enabled": False, "version": "1"},
+            "interpretation": {"enabled": False, "version": "1"},
+        },
+        "frame_source": {"batch_size": 4},
+    }
+    pages = []
+    for index, size in enumerate((6, 8, 10, 12)):
+        page = np.zeros((24, 24), dtype=np.uint8)
+        page[2 : 2 + size, 3 : 3 + size + index] = 40 + index
+        pages.append(page)
+    stack = tmp_path / "stack.tif"
+    assert cv2.imwritemulti(str(stack), pages)
+    inputs = []
+    for index, page in enumerate(pages[:3]):
+        inputs.append(tmp_path / f"eye_{index}.png")
+        assert cv2.imwrite(str(inputs[-1]), page)
+
+    frame_results = list(run_analysis_frames(stack, "cpu", dict(config)))
+    assert batch_sizes == [4]
+    batch_results = list(run_analysis_batch(inputs, "cpu", dict(config)))
+    assert batch_sizes == [4, 3]
+
+    for result in [*frame_results, *batch_results]:
+        assert result.status == "success"
+        assert "micro_feature_metrics" in result.extensions["micro_features"]
+
+
+def test_failed_or_timed_out_batches_are_reported(tmp_path: Path, monkeypatch) -> None:
+    behaviour = {"batch": "raise"}
+    calls = {"batch": 0, "single": 0}
+    release = threading.Event()
+
+    class FlakyYOLO:
+        def __init__(self, weights_path):
+            pass
+
+        def predict(self, source, **kwargs):
+            if isinstance(source, list):
+                calls["batch"] += 1
+                if behaviour["batch"] == "raise":
+                    raise RuntimeError("out of memory")
+                assert release.wait(5)
+            else:
+                calls["single"] += 1
+            sources = source if isinstance(source, list) else [source]
+            return [_fake_result(image, image) for image in sources]
+
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FlakyYOLO))
+    monkeypatch.setattr(micro_features, "YOLO_MODEL_CACHE", YoloModelCache())
+    weights = tmp_path / "detector.pt"
+    weights.write_bytes(b"weights")
+
+    class IrisSegmenter:
+        def __init__(self, model_config):
+            pass
+
+        def infer(self, gray):
+            return np.where(gray > 0, 2, 0).astype(np.uint8)
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (
+            IrisSegmenter,
+            lambda mask: {"iris_pixels": int(np.sum(mask == 2))},
+            lambda original_bgr, mask, class_colors, alpha, output_path: cv2.imwrite(str(output_path), original_bgr),
+        ),
+    )
+    inputs = []
+    for index in range(2):
+        page = np.zeros((24, 24), dtype=np.uint8)
+        page[4:16, 4:14] = 60 + index
+        inputs.append(tmp_path / f"eye_{index}.png")
+        assert cv2.imwrite(str(inputs[-1]), page)
+
+    def config(timeout_ms: int) -> dict:
+        return {
+            "output_dir": str(tmp_path / "out"),
+            "model_config": {"model_version": "test_model", "overlay": {"alpha": 0.45, "class_colors_bgr": {}}},
+            "extensions": {
+                "micro_features": {"enabled": True, "version": "1", "weights_path": str(weights), "timeout_ms": timeout_ms},
+                "sector_mapping": {"enabled": False, "version": "1"},
+                "interpretation": {"enabled": False, "version": "1"},
+            },
+        }
+
+    failed = list(run_analysis_batch(inputs, "cpu", config(30000)))
+    assert (calls["batch"], calls["single"]) == (1, 2)
+    for result in failed:
+        assert "micro_feature_metrics" in result.extensions["micro_features"]
+        assert any("Batched run failed, retried per input: out of memory" in warning for warning in result.warnings)
+
+    behaviour["batch"] = "hang"
+    try:
+        timed_out = list(run_analysis_batch(inputs, "cpu", config(100)))
+    finally:
+        # Let the abandoned batch call finish instead of outliving the test.
+        release.set()
+    # The batch had both inputs' budgets (2 x 100 ms); neither input is run again.
+    assert (calls["batch"], calls["single"]) == (2, 2)
+    for result in timed_out:
+        assert "micro_features" not in result.extensions
+        assert "[micro_features] Batched extension timed out after 200 ms" in result.warnings
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from engine.core.overlay import generate_overlay
+
+
+def _reference_overlay(original_bgr, mask, class_colors, alpha):
+    overlay = np.zeros_like(original_bgr)
+    for class_id, bgr in class_colors.items():
+        overlay[mask == int(class_id)] = np.array(bgr, dtype=np.uint8)
+    return cv2.addWeighted(original_bgr, 1.0 - alpha, overlay, alpha, 0.0)
+
+
+def test_lut_overlay_png_is_byte_identical(tmp_path: Path) -> None:
+    rng = np.random.default_rng(5)
+    original = rng.integers(0, 256, size=(61, 47, 3), dtype=np.uint8)
+    mask = rng.integers(0, 7, size=(61, 47), dtype=np.uint8)
+    colors = {"0": [0, 0, 0], "1": [255, 0, 0], "2": [0, 255, 0], "3": [0, 0, 255], "5": [17, 200, 90]}
+    reference_path = tmp_path / "reference.png"
+    assert cv2.imwrite(str(reference_path), _reference_overlay(original, mask, colors, 0.37))
+
+    buffer = np.empty_like(original)
+    for name in ("first.png", "reused.png"):
+        generate_overlay(original, mask, colors, 0.37, tmp_path / name, out=buffer)
+        assert (tmp_path / name).read_bytes() == reference_path.read_bytes()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from engine.app.preprocessing import (
+    LoaderSettings,
+    _likely_non_nir_dense,
+    likely_non_nir,
+    load_image,
+    load_image_for_analysis,
+    probe_image_header,
+)
+from engine.app.raw_frames import RawFrameFormat
+
+
+def test_decode_once_matches_full_decode_and_derives_bgr_lazily(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    gray_png = tmp_path / "gray.png"
+    color_jpg = tmp_path / "color.jpg"
+    assert cv2.imwrite(str(gray_png), rng.integers(0, 256, (37, 53), dtype=np.uint8))
+    assert cv2.imwrite(str(color_jpg), rng.integers(0, 256, (37, 53, 3), dtype=np.uint8))
+
+    assert probe_image_header(gray_png).channels == 1
+    assert probe_image_header(color_jpg).channels == 3
+    for path in (gray_png, color_jpg):
+        expected_bgr, expected_gray, expected_warnings = load_image_for_analysis(path)
+        image = load_image(path, LoaderSettings(mode="decode_once"))
+        assert np.array_equal(image.segmentation_gray, expected_gray)
+        assert np.array_equal(image.gray, expected_gray)
+        assert np.array_equal(image.original_bgr, expected_bgr)
+        assert image.warnings == expected_warnings
+        assert image.stats()["decodes"] == 1
+
+
+def test_reduced_mode_defers_full_resolution_decode(tmp_path: Path) -> None:
+    path = tmp_path / "large.jpg"
+    full = np.tile(np.linspace(0, 255, 1200, dtype=np.uint8), (1000, 1))
+    assert cv2.imwrite(str(path), cv2.cvtColor(full, cv2.COLOR_GRAY2BGR))
+
+    image = load_image(path, LoaderSettings(mode="reduced", reduced_min_side=256))
+
+    assert image.shape == (1000, 1200)
+    assert image.reduction == 2
+    assert image.segmentation_gray.shape == (500, 600)
+    assert image.stats()["decodes"] == 1
+    assert image.original_bgr.shape == (1000, 1200, 3)
+    assert image.gray.shape == (1000, 1200)
+    assert image.stats()["decodes"] == 2
+
+
+def test_tiled_non_nir_check_matches_dense_reference() -> None:
+    rng = np.random.default_rng(11)
+    decisions = set()
+    for _ in range(120):
+        height, width = (int(value) for value in rng.integers(1, 400, 2))
+        spread = int(rng.integers(1, 40))
+        base = rng.integers(0, 256, (height, width, 1))
+        image = np.clip(base + rng.integers(-spread, spread, (height, width, 3)), 0, 255).astype(np.uint8)
+        expected = _likely_non_nir_dense(image)
+        decisions.add(expected)
+        assert likely_non_nir(image) == expected
+
+    assert decisions == {True, False}
+    gray_bgr = np.repeat(rng.integers(0, 256, (512, 512, 1), dtype=np.uint8), 3, axis=2)
+    assert likely_non_nir(gray_bgr, sample_budget=4096) is False
+    gray_bgr[::8, ::8, 0] = 255
+    gray_bgr[::8, ::8, 2] = 0
+    assert likely_non_nir(gray_bgr, sample_budget=4096) is True
+
+
+def test_raw_and_npy_frames_are_memory_mapped(tmp_path: Path) -> None:
+    frame = np.random.default_rng(5).integers(0, 256, (30, 40), dtype=np.uint8)
+    padded = np.zeros((30, 48), dtype=np.uint8)
+    padded[:, :40] = frame
+    raw_path = tmp_path / "frame.raw"
+    raw_path.write_bytes(b"HDR!" * 4 + padded.tobytes())
+    settings = LoaderSettings(raw_format=RawFrameFormat(width=40, height=30, stride=48, offset=16))
+
+    image = load_image(raw_path, settings)
+
+    assert isinstance(image.segmentation_gray, np.memmap)
+    assert np.array_equal(image.segmentation_gray, frame)
+    assert np.shares_memory(image.segmentation_gray, image.gray)
+    assert np.array_equal(image.original_bgr, cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+
+    npy_path = tmp_path / "frame.npy"
+    np.save(npy_path, frame.astype(np.uint16) << 4)
+    twelve_bit = load_image(npy_path, LoaderSettings(raw_format=RawFrameFormat(bit_depth=12)))
+    assert np.array_equal(twelve_bit.gray, frame)
+    assert twelve_bit.stats()["source_bit_depth"] == 12
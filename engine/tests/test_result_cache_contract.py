@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import errno
+import json
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from engine import run_analysis
+from engine.app.result_cache import ResultCache
+
+
+def _build_config(tmp_path: Path) -> dict:
+    return {
+        "output_dir": str(tmp_path / "out"),
+        "model_hash": "fixed-model-hash",
+        "result_cache": {"enabled": True, "cache_dir": str(tmp_path / "cache")},
+        "model_config": {
+            "model_version": "test_model",
+            "overlay": {"alpha": 0.45, "class_colors_bgr": {"0": [0, 0, 0], "2": [0, 255, 0]}},
+            "class_labels": {
+                "background": 0,
+                "pupil": 1,
+                "iris": 2,
+                "collarette": 3,
+                "scurf_rim": 4,
+                "contraction_furrows": 5,
+            },
+        },
+        "extensions": {
+            "micro_features": {"enabled": False, "version": "1"},
+            "sector_mapping": {"enabled": False, "version": "1"},
+            "interpretation": {"enabled": False, "version": "1"},
+        },
+    }
+
+
+def _patch_counting_runtime(monkeypatch) -> dict:
+    counts = {"constructed": 0, "inferred": 0}
+
+    class CountingSegmenter:
+        def __init__(self, model_config):
+            counts["constructed"] += 1
+
+        def infer(self, gray):
+            counts["inferred"] += 1
+            mask = np.full_like(gray, 2, dtype=np.uint8)
+            mask[:4, :4] = 1
+            return mask
+
+    def fake_measurements(mask):
+        return {
+            "pupil_pixels": int(np.sum(mask == 1)),
+            "iris_pixels": int(np.sum(mask == 2)),
+            "collarette_pixels": 0,
+            "furrow_pixels": 0,
+            "scurf_pixels": 0,
+            "pupil_to_iris": float(np.sum(mask == 1) / np.sum(mask == 2)),
+            "collarette_to_iris": 0.0,
+            "furrow_to_iris": 0.0,
+            "scurf_to_iris": 0.0,
+        }
+
+    def fake_overlay(original_bgr, mask, class_colors, alpha, output_path):
+        cv2.imwrite(str(output_path), original_bgr)
+
+    monkeypatch.setattr(
+        "engine.app.runtime._load_legacy_runtime_components",
+        lambda: (CountingSegmenter, fake_measurements, fake_overlay),
+    )
+    return counts
+
+
+def test_unchanged_input_reuses_cached_mask(tmp_path: Path, monkeypatch) -> None:
+    counts = _patch_counting_runtime(monkeypatch)
+    input_path = tmp_path / "sample.png"
+    assert cv2.imwrite(str(input_path), np.full((16, 16, 3), 90, dtype=np.uint8))
+    config = _build_config(tmp_path)
+    manifest_path = Path(config["output_dir"]) / "manifest.json"
+
+    first = run_analysis(str(input_path), "cpu", config)
+    assert json.loads(manifest_path.read_text(encoding="utf-8"))["result_cache"]["status"] == "miss"
+
+    second = run_analysis(str(input_path), "cpu", config)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["result_cache"]["status"] == "hit"
+    assert (counts["constructed"], counts["inferred"]) == (1, 1)
+    assert second.metrics == first.metrics
+    np.testing.assert_array_equal(
+        cv2.imread(second.mask_path, cv2.IMREAD_UNCHANGED),
+        cv2.imread(first.mask_path, cv2.IMREAD_UNCHANGED),
+    )
+
+    assert cv2.imwrite(str(input_path), np.full((16, 16, 3), 91, dtype=np.uint8))
+    run_analysis(str(input_path), "cpu", config)
+    assert json.loads(manifest_path.read_text(encoding="utf-8"))["result_cache"]["status"] == "miss"
+    assert counts["inferred"] == 2
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ResultCache(cache_dir=tmp_path / "cache", max_bytes=10**9)
+    mask = np.random.default_rng(0).integers(0, 6, size=(64, 64), dtype=np.uint8)
+    keys = [ResultCache.make_key(str(index), "model", [256, 256], "test") for index in range(3)]
+    for key in keys:
+        cache.put(key, mask, {"iris_pixels": 1})
+
+    oldest = cache._entry_dir(keys[0])
+    newest_mtime = cache._entry_dir(keys[2]).stat().st_mtime_ns
+    os.utime(oldest, ns=(newest_mtime + 10, newest_mtime + 10))
+    entry_size = sum(path.stat().st_size for path in oldest.iterdir())
+    cache.max_bytes = entry_size * 2
+    assert cache.evict_to_limit() == 1
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_result_cache_store_failures_do_not_fail_the_run(tmp_path: Path, monkeypatch) -> None:
+    _patch_counting_runtime(monkeypatch)
+    input_path = tmp_path / "sample.png"
+    assert cv2.imwrite(str(input_path), np.full((16, 16, 3), 90, dtype=np.uint8))
+    config = _build_config(tmp_path)
+    # A regular file where the cache directory should be: every store fails.
+    (tmp_path / "cache").write_text("not a directory", encoding="utf-8")
+
+    result = run_analysis(str(input_path), "cpu", config)
+
+    assert result.status == "success"
+    manifest = json.loads((Path(config["output_dir"]) / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["result_cache"]["status"] == "store_failed"
+
+
+def test_result_cache_put_tells_a_lost_race_from_a_failed_store(tmp_path: Path, monkeypatch) -> None:
+    cache = ResultCache(cache_dir=tmp_path / "cache")
+    mask = np.zeros((8, 8), dtype=np.uint8)
+    key = ResultCache.make_key("raced", "model", [256, 256], "test")
+    real_replace = os.replace
+
+    def publish_first(source, target):
+        # Another writer lands the same key just before this one.
+        real_replace(source, target)
+        raise FileExistsError(target)
+
+    monkeypatch.setattr("engine.app.result_cache.os.replace", publish_first)
+    cache.put(key, mask, {})
+    assert cache.get(key) is not None
+
+    def disk_full(source, target):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr("engine.app.result_cache.os.replace", disk_full)
+    with pytest.raises(OSError):
+        cache.put(ResultCache.make_key("full", "model", [256, 256], "test"), mask, {})
+    assert not any(path.name.endswith(".tmp") for path in (tmp_path / "cache").rglob("*"))
+
+
+def test_result_cache_tracks_size_without_rescanning(tmp_path: Path, monkeypatch) -> None:
+    cache_dir = tmp_path / "cache"
+    mask = np.zeros((32, 32), dtype=np.uint8)
+    ResultCache(cache_dir=cache_dir).put(ResultCache.make_key("seed", "model", [256, 256], "test"), mask, {})
+
+    scans = {"count": 0}
+    original_glob = Path.glob
+
+    def counting_glob(self, pattern):
+        scans["count"] += 1
+        return original_glob(self, pattern)
+
+    monkeypatch.setattr(Path, "glob", counting_glob)
+    for index in range(5):
+        # A fresh instance per put still shares the running total of its directory.
+        cache = ResultCache(cache_dir=cache_dir)
+        cache.put(ResultCache.make_key(str(index), "model", [256, 256], "test"), mask, {})
+    assert scans["count"] == 0
+    assert cache._state is ResultCache(cache_dir=cache_dir)._state
+
+    cache.max_bytes = 1
+    cache.put(ResultCache.make_key("over", "model", [256, 256], "test"), mask, {})
+    assert scans["count"] == 1
+    assert not any(cache_dir.glob("*/*"))
+
+
+def test_result_cache_key_covers_loader_mode_and_raw_layout(tmp_path: Path, monkeypatch) -> None:
+    counts = _patch_counting_runtime(monkeypatch)
+    config = _build_config(tmp_path)
+    manifest_path = Path(config["output_dir"]) / "manifest.json"
+
+    def cache_status(input_path: Path, image_loader: dict) -> str:
+        run_analysis(str(input_path), "cpu", {**config, "image_loader": image_loader})
+        return json.loads(manifest_path.read_text(encoding="utf-8"))["result_cache"]["status"]
+
+    jpeg = tmp_path / "large.jpg"
+    assert cv2.imwrite(str(jpeg), np.full((600, 800, 3), 90, dtype=np.uint8))
+    assert cache_status(jpeg, {"mode": "decode_once"}) == "miss"
+    assert cache_status(jpeg, {"mode": "decode_once"}) == "hit"
+    # Same bytes, but the reduced decode hands the segmenter a different image.
+    assert cache_status(jpeg, {"mode": "reduced", "reduced_min_side": 128}) == "miss"
+    assert cache_status(jpeg, {"mode": "reduced", "reduced_min_side": 128}) == "hit"
+
+    raw = tmp_path / "capture.raw"
+    raw.write_bytes(np.arange(24 * 32 + 8, dtype="<u2").tobytes())
+    layout = {"width": 32, "height": 24, "dtype": "uint16", "bit_depth": 10}
+    assert cache_status(raw, {"raw": layout}) == "miss"
+    assert cache_status(raw, {"raw": layout}) == "hit"
+    assert cache_status(raw, {"raw": {**layout, "bit_depth": 12}}) == "miss"
+    assert cache_status(raw, {"raw": {**layout, "offset": 16}}) == "miss"
+    assert cache_status(raw, {"raw": {**layout, "dtype": "uint8", "width": 64}}) == "miss"
+    assert counts["inferred"] == 6
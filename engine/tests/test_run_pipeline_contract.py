@@ -148,3 +148,63 @@ def test_deterministic_result_with_mocked_segmentation(
 
     assert result_1 == result_2
     assert json_1 == json_2
+
+
+def test_input_dir_batch_is_resumable(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    mask = np.full((8, 8), 2, dtype=np.uint8)
+    args, output_dir = _prepare_common(tmp_path, monkeypatch, mask)
+    input_dir = tmp_path / "archive"
+    (input_dir / "day2").mkdir(parents=True)
+    (input_dir / "a.png").write_bytes(b"a")
+    (input_dir / "day2" / "b.jpg").write_bytes(b"b")
+    (input_dir / "notes.txt").write_text("ignored", encoding="utf-8")
+    batch_args = argparse.Namespace(**vars(args), input_dir=str(input_dir), glob="**/*", ledger=None)
+
+    first = rp.run(batch_args)
+    assert (first["processed"], first["skipped"], first["failed"]) == (2, 0, 0)
+    assert (output_dir / "a_results.json").exists()
+    assert (output_dir / "day2" / "b_results.json").exists()
+
+    second = rp.run(batch_args)
+    assert (second["processed"], second["skipped"]) == (0, 2)
+
+    (input_dir / "a.png").write_bytes(b"a-recaptured")
+    third = rp.run(batch_args)
+    assert (third["processed"], third["skipped"]) == (1, 1)
+
+    ledger_lines = (output_dir / "results_ledger.jsonl").read_text(encoding="utf-8").splitlines()
+    entries = [json.loads(line) for line in ledger_lines]
+    assert len(entries) == 3
+    assert {entry["status"] for entry in entries} == {"success"}
+
+
+def test_batch_deduplicates_stems_and_fails_fast_on_engine_errors(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mask = np.full((8, 8), 2, dtype=np.uint8)
+    args, output_dir = _prepare_common(tmp_path, monkeypatch, mask)
+    input_dir = tmp_path / "archive"
+    input_dir.mkdir()
+    (input_dir / "a.jpg").write_bytes(b"jpg")
+    (input_dir / "a.png").write_bytes(b"png")
+    batch_args = argparse.Namespace(**vars(args), input_dir=str(input_dir), glob=None, ledger=None)
+
+    first = rp.run(batch_args)
+    assert (first["processed"], first["skipped"]) == (2, 0)
+    assert (output_dir / "a_results.json").exists()
+    assert (output_dir / "a_2_results.json").exists()
+    assert rp.run(batch_args)["skipped"] == 2
+
+    constructed = []
+
+    class BrokenSegmenter:
+        def __init__(self, model_config):
+            constructed.append(model_config)
+            raise RuntimeError("missing checkpoint")
+
+    monkeypatch.setattr(rp, "IrisSegmentationEngine", BrokenSegmenter)
+    (input_dir / "a.jpg").write_bytes(b"jpg-recaptured")
+    (input_dir / "a.png").write_bytes(b"png-recaptured")
+    with pytest.raises(RuntimeError, match="missing checkpoint"):
+        rp.run(batch_args)
+    assert len(constructed) == 1
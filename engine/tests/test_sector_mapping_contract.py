@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import numpy as np
+import pytest
+
+from engine.extensions.sector_mapping import SectorGridCache, SectorMappingExtension
+
+
+def _reference_sector_metrics(
+    mask: np.ndarray,
+    center_x: float,
+    center_y: float,
+    sector_count: int,
+    radius: float,
+    micro_boxes: list[dict[str, Any]],
+) -> dict[str, Any]:
+    # Per-sector loop the vectorized implementation must reproduce exactly.
+    sector_index = SectorMappingExtension._sector_index
+    ys, xs = np.where(mask == 2)
+    sector_idx = sector_index(xs, ys, center_x, center_y, sector_count)
+    metrics: dict[str, Any] = {}
+    for idx in range(sector_count):
+        metrics[f"sector_{idx + 1}"] = {
+            "iris_pixels": 0,
+            "collarette_pixels": 0,
+            "scurf_rim_pixels": 0,
+            "contraction_furrows_pixels": 0,
+            "micro_feature_count": 0,
+            "micro_feature_labels": {},
+            "radius": radius,
+        }
+    for idx in range(sector_count):
+        mask_sector = sector_idx == idx
+        if np.any(mask_sector):
+            labels = mask[ys[mask_sector], xs[mask_sector]]
+            entry = metrics[f"sector_{idx + 1}"]
+            entry["iris_pixels"] = int(np.count_nonzero(labels == 2))
+            entry["collarette_pixels"] = int(np.count_nonzero(labels == 3))
+            entry["scurf_rim_pixels"] = int(np.count_nonzero(labels == 4))
+            entry["contraction_furrows_pixels"] = int(np.count_nonzero(labels == 5))
+    for box in micro_boxes:
+        x1, y1, x2, y2 = box.get("bbox", [0, 0, 0, 0])
+        cx = np.array([0.5 * (float(x1) + float(x2))], dtype=np.float64)
+        cy = np.array([0.5 * (float(y1) + float(y2))], dtype=np.float64)
+        entry = metrics[f"sector_{int(sector_index(cx, cy, center_x, center_y, sector_count)[0]) + 1}"]
+        entry["micro_feature_count"] += 1
+        label = str(box.get("label", "unknown"))
+        entry["micro_feature_labels"][label] = int(entry["micro_feature_labels"].get(label, 0) + 1)
+    return metrics
+
+
+@pytest.mark.parametrize("sector_count", [12, 24])
+def test_sector_metrics_match_reference(sector_count: int) -> None:
+    rng = np.random.default_rng(7)
+    mask = rng.integers(0, 6, size=(96, 128), dtype=np.uint8)
+    boxes = [
+        {"bbox": [int(x), int(y), int(x) + 5, int(y) + 3], "label": label}
+        for x, y, label in zip(
+            rng.integers(0, 120, 40), rng.integers(0, 90, 40), rng.choice(["lacunae", "crypt"], 40), strict=True
+        )
+    ]
+    boxes.append({"bbox": [64, 48, 64, 48]})
+    args = dict(mask=mask, center_x=63.25, center_y=47.5, sector_count=sector_count, radius=40.0, micro_boxes=boxes)
+
+    actual = SectorMappingExtension()._compute_sector_metrics(**args)
+    # json.dumps also pins the insertion order of micro_feature_labels.
+    assert json.dumps(actual) == json.dumps(_reference_sector_metrics(**args))
+
+
+@pytest.mark.parametrize("sector_count", [12, 24])
+def test_sector_grid_lookup_is_bit_exact(sector_count: int) -> None:
+    cache = SectorGridCache(max_entries=2, quantum=4.0)
+    rng = np.random.default_rng(11)
+    selection = rng.random((120, 160)) < 0.8
+    ys, xs = np.nonzero(selection)
+    centers = [(80.0, 60.0), (79.5, 61.75), (81.999, 58.0001), (78.0, 62.0), (40.3, 90.7)]
+    centers += [(float(x), float(y)) for x, y in rng.uniform([70, 50], [90, 70], size=(10, 2))]
+
+    for center_x, center_y in centers:
+        expected = SectorMappingExtension._sector_index(xs, ys, center_x, center_y, sector_count)
+        actual = cache.sector_index(selection, center_x, center_y, sector_count)
+        assert actual.dtype == expected.dtype
+        np.testing.assert_array_equal(actual, expected)
+
+    stats = cache.stats()
+    assert stats["hits"] > 0
+    assert stats["entries"] <= 2
+
+
+def test_sector_grid_covers_only_the_selection_box() -> None:
+    cache = SectorGridCache(max_entries=2, quantum=4.0)
+    yy, xx = np.mgrid[0:600, 0:800]
+    selection = np.hypot(xx - 530.0, yy - 170.0) < 70.0
+    ys, xs = np.nonzero(selection)
+
+    # First sighting is answered directly, the second builds the grid, the third reuses it.
+    for center_x, center_y in [(530.2, 169.7), (531.0, 168.9), (531.9, 168.5)]:
+        expected = SectorMappingExtension._sector_index(xs, ys, center_x, center_y, 12)
+        np.testing.assert_array_equal(cache.sector_index(selection, center_x, center_y, 12), expected)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["builds"]) == (1, 2, 1)
+    # 160x160 aligned box instead of the 600x800 frame.
+    assert stats["total_bytes"] == 160 * 160 * 5
@@ -1,6 +1,16 @@
+import concurrent.futures
+import contextlib
+import sys
+import threading
+import types
+from pathlib import Path
+
+import cv2
 import numpy as np
 import pytest
 
+import engine.core.segmentation as segmentation_module
+from engine.core.predictor_cache import PredictorCache, PredictorKey
 from engine.core.segmentation import IrisSegmentationEngine
 
 
@@ -65,3 +75,240 @@ def test_predictor_initialized_once(monkeypatch: pytest.MonkeyPatch) -> None:
     engine.infer(gray)
 
     assert load_count["count"] == 1
+
+
+def _install_fake_nnunet(monkeypatch: pytest.MonkeyPatch) -> None:
+    predict_module = types.ModuleType("nnunetv2.inference.predict_from_raw_data")
+    predict_module.nnUNetPredictor = object
+    monkeypatch.setitem(sys.modules, "torch", types.ModuleType("torch"))
+    monkeypatch.setitem(sys.modules, "nnunetv2", types.ModuleType("nnunetv2"))
+    monkeypatch.setitem(sys.modules, "nnunetv2.inference", types.ModuleType("nnunetv2.inference"))
+    monkeypatch.setitem(sys.modules, "nnunetv2.inference.predict_from_raw_data", predict_module)
+
+
+def _write_model_folder(root: Path, checkpoint: bytes) -> Path:
+    model_folder = root / "model"
+    (model_folder / "fold_0").mkdir(parents=True)
+    (model_folder / "dataset.json").write_text("{}", encoding="utf-8")
+    (model_folder / "plans.json").write_text("{}", encoding="utf-8")
+    (model_folder / "fold_0" / "checkpoint_final.pth").write_bytes(checkpoint)
+    return model_folder
+
+
+def test_predictor_cache_reuses_weights_across_engines(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _install_fake_nnunet(monkeypatch)
+    monkeypatch.setattr(segmentation_module, "PREDICTOR_CACHE", PredictorCache(max_entries=2))
+    monkeypatch.setattr(IrisSegmentationEngine, "_ensure_nnunet_env_vars", staticmethod(lambda: None))
+    monkeypatch.setattr(IrisSegmentationEngine, "_set_deterministic", staticmethod(lambda: None))
+    build_count = {"count": 0}
+
+    def fake_build(self, model_folder):
+        build_count["count"] += 1
+        return object()
+
+    monkeypatch.setattr(IrisSegmentationEngine, "_build_predictor", fake_build)
+
+    config = _canonical_config()
+    config["model_folder"] = str(_write_model_folder(tmp_path, b"weights-v1"))
+
+    first = IrisSegmentationEngine(dict(config))
+    second = IrisSegmentationEngine(dict(config))
+    assert first._predictor is second._predictor
+    assert build_count["count"] == 1
+
+    (Path(config["model_folder"]) / "fold_0" / "checkpoint_final.pth").write_bytes(b"weights-v2")
+    third = IrisSegmentationEngine(dict(config))
+    assert third._predictor is not first._predictor
+    assert build_count["count"] == 2
+
+
+def test_predictor_cache_lru_eviction_and_memory_accounting() -> None:
+    class SizedPredictor:
+        def __init__(self, nbytes: int) -> None:
+            self.list_of_parameters = [{"weight": np.zeros(nbytes, dtype=np.uint8)}]
+
+    def key(name: str) -> PredictorKey:
+        return PredictorKey(name, "checkpoint_final.pth", ("0",), "cpu", 0.5, None)
+
+    cache = PredictorCache(max_entries=2, max_bytes=250)
+    cache.get_or_load(key("a"), lambda: SizedPredictor(100))
+    cache.get_or_load(key("b"), lambda: SizedPredictor(100))
+    cache.get_or_load(key("a"), lambda: SizedPredictor(100))
+    cache.get_or_load(key("c"), lambda: SizedPredictor(100))
+
+    assert key("b") not in cache
+    assert key("a") in cache and key("c") in cache
+    stats = cache.stats()
+    assert stats["total_bytes"] == 200
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+
+    assert cache.evict(key("a")) is True
+    assert cache.evict(key("a")) is False
+    cache.configure(max_bytes=50)
+    assert cache.stats()["entries"] == 1
+    cache.configure(max_entries=4)
+    assert cache.stats()["max_bytes"] == 50
+
+
+def test_predictor_cache_loads_keys_without_blocking_each_other() -> None:
+    def key(name: str) -> PredictorKey:
+        return PredictorKey(name, "checkpoint_final.pth", ("0",), "cpu", 0.5, None)
+
+    cache = PredictorCache(max_entries=2)
+    release_slow = threading.Event()
+    loads: list[str] = []
+
+    def slow_loader() -> object:
+        loads.append("slow")
+        assert release_slow.wait(5)
+        return object()
+
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        slow = [pool.submit(cache.get_or_load, key("slow"), slow_loader) for _ in range(2)]
+        # A slow load must not hold up loading (or hitting) another predictor.
+        fast = cache.get_or_load(key("fast"), object)
+        assert cache.get_or_load(key("fast"), object) is fast
+        release_slow.set()
+        assert slow[0].result(timeout=5) is slow[1].result(timeout=5)
+
+    assert loads == ["slow"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_infer_batch_matches_per_image_infer(monkeypatch: pytest.MonkeyPatch) -> None:
+    class ThresholdPredictor:
+        def predict_single_npy_array(self, input_image, **kwargs):
+            return np.where(input_image[0, 0] > 0.5, 2, 1).astype(np.uint8)
+
+    monkeypatch.setattr(IrisSegmentationEngine, "_load_predictor", lambda self: ThresholdPredictor())
+    engine = IrisSegmentationEngine(_canonical_config())
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, size=shape, dtype=np.uint8) for shape in [(8, 8), (16, 12), (9, 20)]]
+
+    expected = [engine.infer(image) for image in images]
+    batched = engine.infer_batch(images, batch_size=2)
+
+    assert len(batched) == len(expected)
+    for got, want in zip(batched, expected):
+        np.testing.assert_array_equal(got, want)
+    assert engine.last_batch_stats["images"] == 3
+    assert engine.last_batch_stats["batches"] == 2
+    assert engine.last_batch_stats["mode"] == "per_image"
+
+
+class _FakeTensor(np.ndarray):
+    def to(self, device):
+        return self
+
+    def half(self):
+        return self.astype(np.float16)
+
+    def cpu(self):
+        return self
+
+
+def _install_fake_stacked_nnunet(monkeypatch: pytest.MonkeyPatch) -> None:
+    torch = types.ModuleType("torch")
+    torch.half = np.float16
+    torch.from_numpy = lambda array: np.asarray(array).view(_FakeTensor)
+    torch.stack = lambda tensors: np.stack(tensors).view(_FakeTensor)
+    torch.zeros = lambda shape, dtype, device: np.zeros(shape, dtype=dtype).view(_FakeTensor)
+    torch.div = np.divide
+    torch.no_grad = contextlib.nullcontext
+
+    def pad_nd_image(image, new_shape, mode, kwargs, return_slicer, shape_must_be_divisible_by):
+        leading = image.ndim - len(new_shape)
+        extra = [max(int(new) - old, 0) for new, old in zip(new_shape, image.shape[leading:])]
+        widths = [(0, 0)] * leading + [(pad // 2, pad - pad // 2) for pad in extra]
+        padded = np.pad(np.asarray(image), widths, constant_values=0).view(_FakeTensor)
+        return padded, tuple(slice(low, low + size) for (low, _), size in zip(widths, image.shape))
+
+    def convert(logits, plans_manager, configuration, label_manager, properties, return_probabilities):
+        (y0, y1), (x0, x1) = properties["bbox"]
+        segmentation = np.zeros(properties["shape_before_cropping"], dtype=np.uint8)
+        segmentation[y0:y1, x0:x1] = np.argmax(np.asarray(logits, dtype=np.float32)[:, 0], axis=0)
+        return segmentation
+
+    modules = {
+        "torch": torch,
+        "acvl_utils": types.ModuleType("acvl_utils"),
+        "acvl_utils.cropping_and_padding": types.ModuleType("acvl_utils.cropping_and_padding"),
+        "acvl_utils.cropping_and_padding.padding": types.ModuleType("acvl_utils.cropping_and_padding.padding"),
+        "nnunetv2": types.ModuleType("nnunetv2"),
+        "nnunetv2.inference": types.ModuleType("nnunetv2.inference"),
+        "nnunetv2.inference.export_prediction": types.ModuleType("nnunetv2.inference.export_prediction"),
+        "nnunetv2.inference.sliding_window_prediction": types.ModuleType(
+            "nnunetv2.inference.sliding_window_prediction"
+        ),
+    }
+    modules["acvl_utils.cropping_and_padding.padding"].pad_nd_image = pad_nd_image
+    modules["nnunetv2.inference.export_prediction"].convert_predicted_logits_to_segmentation_with_correct_shape = convert
+    modules["nnunetv2.inference.sliding_window_prediction"].compute_gaussian = (
+        lambda size, sigma_scale, value_scaling_factor, device: np.ones(size, dtype=np.float32).view(_FakeTensor)
+    )
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+
+class _CropToNonzeroPreprocessor:
+    """Crops each case to its nonzero bounding box, like nnU-Net's ``crop_to_nonzero``."""
+
+    def __init__(self, verbose: bool = False) -> None:
+        pass
+
+    def run_case_npy(self, data, seg, properties, plans_manager, configuration, dataset_json):
+        rows = np.flatnonzero(data[0, 0].any(axis=1))
+        cols = np.flatnonzero(data[0, 0].any(axis=0))
+        bbox = [(int(rows[0]), int(rows[-1]) + 1), (int(cols[0]), int(cols[-1]) + 1)]
+        cropped = data[:, :, bbox[0][0] : bbox[0][1], bbox[1][0] : bbox[1][1]]
+        return cropped, None, {"bbox": bbox, "shape_before_cropping": data.shape[2:]}
+
+
+def test_stacked_forward_pads_cases_with_different_crop_boxes(monkeypatch: pytest.MonkeyPatch) -> None:
+    _install_fake_stacked_nnunet(monkeypatch)
+    forward_shapes: list[tuple[int, ...]] = []
+
+    class ThresholdNetwork:
+        def load_state_dict(self, parameters):
+            pass
+
+        def eval(self):
+            pass
+
+        def __call__(self, data):
+            forward_shapes.append(data.shape)
+            values = np.asarray(data, dtype=np.float32)[:, 0]
+            return np.stack([np.full_like(values, -10.0), 0.5 - values, values - 0.5], axis=1).view(_FakeTensor)
+
+    predictor = types.SimpleNamespace(
+        network=ThresholdNetwork(),
+        list_of_parameters=[{}],
+        use_mirroring=False,
+        device=types.SimpleNamespace(type="cpu"),
+        configuration_manager=types.SimpleNamespace(patch_size=[8, 8], preprocessor_class=_CropToNonzeroPreprocessor),
+        plans_manager=None,
+        dataset_json={},
+        label_manager=None,
+    )
+    monkeypatch.setattr(IrisSegmentationEngine, "_load_predictor", lambda self: predictor)
+    monkeypatch.setattr(IrisSegmentationEngine, "_set_deterministic", staticmethod(lambda: None))
+    config = _canonical_config()
+    config["batched_forward"] = True
+    engine = IrisSegmentationEngine(config)
+
+    rng = np.random.default_rng(1)
+    images = []
+    for border in (0, 2, 4):
+        image = np.zeros((16, 16), dtype=np.uint8)
+        image[border : 16 - border, border : 16 - border] = rng.integers(1, 256, size=(16 - 2 * border,) * 2)
+        images.append(image)
+
+    masks = engine.infer_batch(images, batch_size=3)
+
+    assert engine.last_batch_stats["mode"] == "batched_forward"
+    assert forward_shapes == [(3, 1, 8, 8)]
+    for image, mask in zip(images, masks):
+        resized = cv2.resize(image, (8, 8), interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+        expected = np.where(resized == 0, 0, np.where(resized > 0.5, 2, 1)).astype(np.uint8)
+        np.testing.assert_array_equal(mask, cv2.resize(expected, (16, 16), interpolation=cv2.INTER_NEAREST))
@@ -1,12 +1,22 @@
 """Utility helpers for file, image, and dataset consistency checks."""
 
 from engine.utils.data_consistency import validate_data_consistency
-from engine.utils.file_utils import ensure_dir, load_json, validate_image_extension
+from engine.utils.file_utils import (
+    atomic_write_json,
+    cached_sha256_file,
+    ensure_dir,
+    load_json,
+    sha256_file,
+    validate_image_extension,
+)
 from engine.utils.image_utils import load_nir_image
 
 __all__ = [
+    "atomic_write_json",
+    "cached_sha256_file",
     "ensure_dir",
     "load_json",
+    "sha256_file",
     "validate_image_extension",
     "load_nir_image",
     "validate_data_consistency",
@@ -2,12 +2,22 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 
 SUPPORTED_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+HASH_CACHE_DIR = Path.home() / ".irisatlasai" / "hash_cache"
+
+_HASH_MEMO: OrderedDict[Tuple[str, int, int, int], str] = OrderedDict()
+_HASH_MEMO_LOCK = threading.Lock()
+_HASH_MEMO_MAX_ENTRIES = 256
 
 
 def load_json(path: str | Path) -> Dict[str, Any]:
@@ -30,3 +40,90 @@ def validate_image_extension(path: str | Path) -> None:
         raise ValueError(
             f"Unsupported input extension '{ext}'. Supported: {sorted(SUPPORTED_EXTENSIONS)}"
         )
+
+
+def atomic_write_json(path: str | Path, payload: Dict[str, Any], fsync: bool = True) -> None:
+    """Write JSON through a temp file and ``os.replace``; ``fsync`` the data first when asked."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(target.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+        handle.flush()
+        if fsync:
+            os.fsync(handle.fileno())
+    os.replace(tmp_path, target)
+
+
+def fsync_file(path: str | Path) -> None:
+    """Flush an already written file to stable storage."""
+    with Path(path).open("rb") as handle:
+        os.fsync(handle.fileno())
+
+
+def sha256_file(path: str | Path) -> str:
+    """Stream a file through SHA-256 and return the hex digest."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        while True:
+            chunk = handle.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_sha256_file(path: str | Path, cache_dir: str | Path | None = None) -> Tuple[str, bool]:
+    """Return ``(sha256, was_cached)`` for a file, reusing a persistent digest sidecar.
+
+    Digests are keyed by resolved path, size, ``st_mtime_ns``, and inode, and kept
+    both in a small in-process LRU and as JSON records under ``cache_dir``
+    (default ``~/.irisatlasai/hash_cache``) so other processes reuse them too.
+    The file is re-read only when any of those attributes changed. Meant for
+    model checkpoints; hash per-run inputs with :func:`sha256_file` so they do
+    not leave sidecars behind.
+    """
+    resolved = Path(path).resolve()
+    stat = resolved.stat()
+    memo_key = (str(resolved), int(stat.st_size), int(stat.st_mtime_ns), int(stat.st_ino))
+
+    with _HASH_MEMO_LOCK:
+        memoized = _HASH_MEMO.get(memo_key)
+        if memoized is not None:
+            _HASH_MEMO.move_to_end(memo_key)
+    if memoized is not None:
+        return memoized, True
+
+    record_path = Path(cache_dir or HASH_CACHE_DIR) / (
+        hashlib.sha256(str(resolved).encode("utf-8")).hexdigest() + ".json"
+    )
+    expected = {"path": memo_key[0], "size": memo_key[1], "mtime_ns": memo_key[2], "inode": memo_key[3]}
+    digest = None
+    try:
+        record = json.loads(record_path.read_text(encoding="utf-8"))
+        if all(record.get(key) == value for key, value in expected.items()):
+            digest = str(record["sha256"])
+    except (OSError, ValueError, KeyError, AttributeError):
+        digest = None
+
+    was_cached = digest is not None
+    if digest is None:
+        digest = sha256_file(resolved)
+        _write_hash_record(record_path, {**expected, "sha256": digest})
+
+    with _HASH_MEMO_LOCK:
+        _HASH_MEMO[memo_key] = digest
+        while len(_HASH_MEMO) > _HASH_MEMO_MAX_ENTRIES:
+            _HASH_MEMO.popitem(last=False)
+    return digest, was_cached
+
+
+def _write_hash_record(record_path: Path, record: Dict[str, Any]) -> None:
+    # The sidecar is an optimization; an unwritable cache dir must not fail a run.
+    try:
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = record_path.with_name(f".{record_path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps(record, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, record_path)
+    except OSError:
+        return
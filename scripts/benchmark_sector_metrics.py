@@ -0,0 +1,120 @@
+"""Benchmark sector statistics: per-sector loop vs single-pass histogram over cached sector grids.
+
+``cold`` times a lookup that misses the grid cache (the grid is built), ``warm``
+one that reuses a cached grid.
+
+Usage: python scripts/benchmark_sector_metrics.py [--size 2048] [--repeats 5]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from engine.extensions.sector_mapping import SECTOR_GRID_CACHE, SectorMappingExtension  # noqa: E402
+
+
+def legacy_sector_metrics(mask, center_x, center_y, sector_count, radius, micro_boxes):
+    sector_index = SectorMappingExtension._sector_index
+    ys, xs = np.where(mask == 2)
+    sector_idx = sector_index(xs, ys, center_x, center_y, sector_count)
+    metrics = {}
+    for idx in range(sector_count):
+        metrics[f"sector_{idx + 1}"] = {
+            "iris_pixels": 0,
+            "collarette_pixels": 0,
+            "scurf_rim_pixels": 0,
+            "contraction_furrows_pixels": 0,
+            "micro_feature_count": 0,
+            "micro_feature_labels": {},
+            "radius": radius,
+        }
+    for idx in range(sector_count):
+        mask_sector = sector_idx == idx
+        if np.any(mask_sector):
+            labels = mask[ys[mask_sector], xs[mask_sector]]
+            entry = metrics[f"sector_{idx + 1}"]
+            entry["iris_pixels"] = int(np.count_nonzero(labels == 2))
+            entry["collarette_pixels"] = int(np.count_nonzero(labels == 3))
+            entry["scurf_rim_pixels"] = int(np.count_nonzero(labels == 4))
+            entry["contraction_furrows_pixels"] = int(np.count_nonzero(labels == 5))
+    for box in micro_boxes:
+        x1, y1, x2, y2 = box.get("bbox", [0, 0, 0, 0])
+        cx = np.array([0.5 * (float(x1) + float(x2))], dtype=np.float64)
+        cy = np.array([0.5 * (float(y1) + float(y2))], dtype=np.float64)
+        entry = metrics[f"sector_{int(sector_index(cx, cy, center_x, center_y, sector_count)[0]) + 1}"]
+        entry["micro_feature_count"] += 1
+        label = str(box.get("label", "unknown"))
+        entry["micro_feature_labels"][label] = int(entry["micro_feature_labels"].get(label, 0) + 1)
+    return metrics
+
+
+def build_inputs(size, box_count, seed=0):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size]
+    center = size / 2.0 - 0.5
+    dist = np.hypot(xx - center, yy - center)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    mask[dist < size * 0.45] = 2
+    mask[dist < size * 0.15] = 1
+    boxes = [
+        {"bbox": [int(x), int(y), int(x) + 12, int(y) + 9], "label": str(label)}
+        for x, y, label in zip(
+            rng.integers(0, size - 12, box_count),
+            rng.integers(0, size - 9, box_count),
+            rng.choice(["lacunae", "crypt", "structural_patch"], box_count),
+        )
+    ]
+    return mask, center, boxes
+
+
+def best_of(repeats, fn, setup=None):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--boxes", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    mask, center, boxes = build_inputs(args.size, args.boxes)
+    extension = SectorMappingExtension()
+    for sector_count in (12, 24):
+        kwargs = dict(
+            mask=mask,
+            center_x=center,
+            center_y=center,
+            sector_count=sector_count,
+            radius=args.size * 0.45,
+            micro_boxes=boxes,
+        )
+        legacy_s, legacy = best_of(args.repeats, lambda: legacy_sector_metrics(**kwargs))
+        cold_s, cold = best_of(
+            args.repeats, lambda: extension._compute_sector_metrics(**kwargs), setup=SECTOR_GRID_CACHE.clear
+        )
+        warm_s, warm = best_of(args.repeats, lambda: extension._compute_sector_metrics(**kwargs))
+        identical = json.dumps(legacy) == json.dumps(cold) == json.dumps(warm)
+        print(
+            f"schema={sector_count:2d} size={args.size} legacy={legacy_s * 1000:.1f}ms "
+            f"cold={cold_s * 1000:.1f}ms ({legacy_s / cold_s:.2f}x) "
+            f"warm={warm_s * 1000:.1f}ms ({legacy_s / warm_s:.2f}x) identical={identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()